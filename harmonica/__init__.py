@@ -8,4 +8,10 @@ import os.path
 config = {
 	'pre_existing_data_dir': '', # ignored if empty string
     'data_dir': os.path.join(os.path.dirname(__file__), 'data'),
+    'cache_dir': '', # generated tables (e.g. nodal), $XDG_CACHE_HOME/harmonica or ~/.cache/harmonica if empty string
+    'packed': False, # use the packed (int16) model resources when available, see ResourceManager.pack_model
+    'tile_cache_bytes': 256 * 2**20, # byte budget of the decoded grid tile cache, 0 disables caching
+    'basis_cache_bytes': 64 * 2**20, # byte budget of the cache of reused harmonic basis matrices, 0 disables it
+    'nodal_policy': 'partition', # node factor updates: 'partition' (every 240 h, as pytides), 'sample', 'day' or 'year'
+    'numba': True, # use the compiled kernels when numba is installed, see kernels
 }
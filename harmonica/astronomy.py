@@ -0,0 +1,411 @@
+import numpy as np
+
+d2r, r2d = np.pi / 180., 180. / np.pi
+
+# J2000 epoch (Julian date 2451545.0)
+J2000 = np.datetime64('2000-01-01T12:00:00', 'ns')
+
+
+# Polynomial coefficients (in Julian centuries T since J2000) of the astronomical arguments, as in pytides
+# (based on Meeus, Astronomical Algorithms)
+def _s2d(degrees, arcmins=0, arcsecs=0):
+    return degrees + arcmins / 60. + arcsecs / 3600.
+
+
+_POLYNOMIALS = {
+    # Meeus formula 45.1 (the last two terms are combined in pytides)
+    's': (218.3164591, 481267.88134236, -0.0013268, 1 / 538841.0 - 1 / 65194000.0),
+    # Meeus formula 24.2
+    'h': (280.46645, 36000.76983, 0.0003032),
+    # Meeus, unnumbered formula directly preceded by 45.7
+    'p': (83.3532430, 4069.0137111, -0.0103238, -1 / 80053.0, 1 / 18999000.0),
+    # Meeus formula 45.7
+    'N': (125.0445550, -1934.1361849, 0.0020762, 1 / 467410.0, -1 / 60616000.0),
+    # difference between Meeus formulae 24.2 and 24.3
+    'pp': (280.46645 - 357.52910, 36000.76932 - 35999.05030, 0.0003032 + 0.0001559, 0.00000048),
+    '90': (90.,),
+    # Meeus formula 21.3, adjusted for T rather than U
+    'omega': tuple(c * 1e-2 ** i for i, c in enumerate((
+        _s2d(23, 26, 21.448), -_s2d(0, 0, 4680.93), -_s2d(0, 0, 1.55), _s2d(0, 0, 1999.25), -_s2d(0, 0, 51.38),
+        -_s2d(0, 0, 249.67), -_s2d(0, 0, 39.05), _s2d(0, 0, 7.12), _s2d(0, 0, 27.87), _s2d(0, 0, 5.79),
+        _s2d(0, 0, 2.45)))),
+    # lunar inclination, essentially constant (JPL Horizon)
+    'i': (5.145,),
+}
+
+
+# coefficients of the polynomials (rows) and of their derivatives, by power of T (columns)
+_POLYNOMIAL_MATRIX = np.zeros((len(_POLYNOMIALS), max(len(c) for c in _POLYNOMIALS.values())))
+for _n, _c in enumerate(_POLYNOMIALS.values()):
+    _POLYNOMIAL_MATRIX[_n, :len(_c)] = _c
+_DERIVATIVE_MATRIX = np.zeros_like(_POLYNOMIAL_MATRIX)
+_DERIVATIVE_MATRIX[:, :-1] = _POLYNOMIAL_MATRIX[:, 1:] * np.arange(1, _POLYNOMIAL_MATRIX.shape[1])
+del _n, _c
+
+
+def datetime64(times):
+    """Convert times to a datetime64 array without creating Python objects for datetime64 or integer input.
+
+    Args:
+        times (array-like): Times as numpy datetime64 values, integer nanoseconds since the Unix epoch
+            (1970-01-01T00:00:00), datetime objects or pandas timestamps.
+
+    Returns:
+        An ndarray(datetime64[ns]) of the times.
+
+    """
+    times = np.asarray(times)
+    if times.dtype.kind in 'iu':
+        return times.astype(np.int64).view('datetime64[ns]')
+    return times.astype('datetime64[ns]', copy=False)
+
+
+def _days(times):
+    """Convert an array of times (any format accepted by datetime64) to days since J2000."""
+    return (datetime64(times) - J2000).astype(np.int64) / 86400e9
+
+
+def astro(times):
+    """Compute the astronomical arguments at each of an array of times in one vectorized call.
+
+    Args:
+        times (ndarray(datetime64)): Times, as datetime64 values, int64 nanoseconds since the Unix epoch or datetime
+            objects.
+
+    Returns:
+        A dictionary of (value, speed) ndarray tuples indexed by argument name: the mean longitudes s, h, p, N and pp
+            (p1) and the constant 90 and omega and i (degrees and degrees/hour), the hour angle T+h-s, and Schureman's
+            I, xi, nu, nup, nupp and P (degrees, without speed).
+
+    """
+    return _astro(_days(times))
+
+
+def _astro(days):
+    """Vectorized astronomical arguments (degrees) and speeds (degrees/hour) at days since J2000."""
+    days = np.asarray(days, dtype=float)
+    T = days / 36525.
+    dT_dHour = 1. / (24. * 36525.)
+    # evaluate all the polynomials and their derivatives at once as products with the powers of T
+    powers = T[np.newaxis] ** np.arange(_POLYNOMIAL_MATRIX.shape[1]).reshape((-1,) + (1,) * T.ndim)
+    values = np.mod(np.tensordot(_POLYNOMIAL_MATRIX, powers, axes=1), 360.)
+    speeds = np.tensordot(_DERIVATIVE_MATRIX, powers, axes=1) * dT_dHour
+    a = dict((name, (values[n], speeds[n])) for n, name in enumerate(_POLYNOMIALS))
+
+    # Schureman's I, xi, nu, nu' and 2nu'' (see notes on Table 6) depend on N, i and omega
+    N, i, omega = d2r * a['N'][0], d2r * a['i'][0], d2r * a['omega'][0]
+    I = np.arccos(np.cos(i) * np.cos(omega) - np.sin(i) * np.sin(omega) * np.cos(N))
+    e1 = np.arctan(np.cos(0.5 * (omega - i)) / np.cos(0.5 * (omega + i)) * np.tan(0.5 * N)) - 0.5 * N
+    e2 = np.arctan(np.sin(0.5 * (omega - i)) / np.sin(0.5 * (omega + i)) * np.tan(0.5 * N)) - 0.5 * N
+    xi = -(e1 + e2)
+    nu = e1 - e2
+    # Schureman equations 224 and 232
+    nup = np.arctan(np.sin(2 * I) * np.sin(nu) / (np.sin(2 * I) * np.cos(nu) + 0.3347))
+    nupp = 0.5 * np.arctan(np.sin(I) ** 2 * np.sin(2 * nu) / (np.sin(I) ** 2 * np.cos(2 * nu) + 0.0727))
+    for name, value in (('I', I), ('xi', xi), ('nu', nu), ('nup', nup), ('nupp', nupp)):
+        a[name] = (np.mod(r2d * value, 360.), None)
+
+    # the spanning set of the equilibrium arguments is T+h-s, s, h, p, N, pp, 90
+    hour = (days - np.floor(days)) * 360.
+    a['T+h-s'] = (hour + a['h'][0] - a['s'][0], 15. + a['h'][1] - a['s'][1])
+    # Schureman's P
+    a['P'] = (np.mod(a['p'][0] - a['xi'][0], 360.), None)
+    return a
+
+
+# Node factors f (Schureman equations 65-78, 195-235) and u (Schureman Table 2) of the base constituents
+def _value(a, name):
+    return d2r * a[name][0]
+
+
+def _f_unity(a):
+    return np.ones_like(a['N'][0])
+
+
+def _f_Mm(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = (2 / 3. - np.sin(omega) ** 2) * (1 - 3 / 2. * np.sin(i) ** 2)
+    return (2 / 3. - np.sin(I) ** 2) / mean
+
+
+def _f_Mf(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = np.sin(omega) ** 2 * np.cos(0.5 * i) ** 4
+    return np.sin(I) ** 2 / mean
+
+
+def _f_O1(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = np.sin(omega) * np.cos(0.5 * omega) ** 2 * np.cos(0.5 * i) ** 4
+    return (np.sin(I) * np.cos(0.5 * I) ** 2) / mean
+
+
+def _f_J1(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = np.sin(2 * omega) * (1 - 3 / 2. * np.sin(i) ** 2)
+    return np.sin(2 * I) / mean
+
+
+def _f_OO1(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = np.sin(omega) * np.sin(0.5 * omega) ** 2 * np.cos(0.5 * i) ** 4
+    return np.sin(I) * np.sin(0.5 * I) ** 2 / mean
+
+
+def _f_M2(a):
+    omega, i, I = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I')
+    mean = np.cos(0.5 * omega) ** 4 * np.cos(0.5 * i) ** 4
+    return np.cos(0.5 * I) ** 4 / mean
+
+
+def _f_K1(a):
+    omega, i, I, nu = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I'), _value(a, 'nu')
+    mean = 0.5023 * np.sin(2 * omega) * (1 - 3 / 2. * np.sin(i) ** 2) + 0.1681
+    return (0.2523 * np.sin(2 * I) ** 2 + 0.1689 * np.sin(2 * I) * np.cos(nu) + 0.0283) ** 0.5 / mean
+
+
+def _f_L2(a):
+    P, I = _value(a, 'P'), _value(a, 'I')
+    R_a_inv = (1 - 12 * np.tan(0.5 * I) ** 2 * np.cos(2 * P) + 36 * np.tan(0.5 * I) ** 4) ** 0.5
+    return _f_M2(a) * R_a_inv
+
+
+def _f_K2(a):
+    omega, i, I, nu = _value(a, 'omega'), _value(a, 'i'), _value(a, 'I'), _value(a, 'nu')
+    mean = 0.5023 * np.sin(omega) ** 2 * (1 - 3 / 2. * np.sin(i) ** 2) + 0.0365
+    return (0.2533 * np.sin(I) ** 4 + 0.0367 * np.sin(I) ** 2 * np.cos(2 * nu) + 0.0013) ** 0.5 / mean
+
+
+def _f_M1(a):
+    P, I = _value(a, 'P'), _value(a, 'I')
+    Q_a_inv = (0.25 + 1.5 * np.cos(I) * np.cos(2 * P) * np.cos(0.5 * I) ** (-0.5) +
+        2.25 * np.cos(I) ** 2 * np.cos(0.5 * I) ** (-4)) ** 0.5
+    return _f_O1(a) * Q_a_inv
+
+
+def _f_M3(a):
+    return _f_M2(a) ** 1.5
+
+
+def _u_zero(a):
+    return np.zeros_like(a['N'][0])
+
+
+def _u_Mf(a):
+    return -2. * a['xi'][0]
+
+
+def _u_O1(a):
+    return 2. * a['xi'][0] - a['nu'][0]
+
+
+def _u_J1(a):
+    return -a['nu'][0]
+
+
+def _u_OO1(a):
+    return -2. * a['xi'][0] - a['nu'][0]
+
+
+def _u_M2(a):
+    return 2. * a['xi'][0] - 2. * a['nu'][0]
+
+
+def _u_K1(a):
+    return -a['nup'][0]
+
+
+def _u_L2(a):
+    I, P = _value(a, 'I'), _value(a, 'P')
+    R = r2d * np.arctan(np.sin(2 * P) / (1 / 6. * np.tan(0.5 * I) ** (-2) - np.cos(2 * P)))
+    return 2. * a['xi'][0] - 2. * a['nu'][0] - R
+
+
+def _u_K2(a):
+    return -2. * a['nupp'][0]
+
+
+def _u_M1(a):
+    I, P = _value(a, 'I'), _value(a, 'P')
+    Q = r2d * np.arctan((5 * np.cos(I) - 1) / (7 * np.cos(I) + 1) * np.tan(P))
+    return a['xi'][0] - a['nu'][0] + Q
+
+
+def _u_M3(a):
+    return 1.5 * _u_M2(a)
+
+
+def _xdo(xdo):
+    """Convert an extended Doodson number (letters A-Q for 1 to 17, R-Z for -8 to 0) to coefficients."""
+    return [ord(c) - ord('A') + 1 if c <= 'Q' else ord(c) - ord('Z') for c in xdo.replace(' ', '')]
+
+
+# Base constituents: extended Doodson number, u function, f function
+BASE_CONSTITUENTS = {
+    # Long Term
+    'Z0': ('Z ZZZ ZZZ', _u_zero, _f_unity),
+    'SA': ('Z ZAZ ZZZ', _u_zero, _f_unity),
+    'SSA': ('Z ZBZ ZZZ', _u_zero, _f_unity),
+    'MM': ('Z AZY ZZZ', _u_zero, _f_Mm),
+    'MF': ('Z BZZ ZZZ', _u_Mf, _f_Mf),
+    # Diurnals
+    'Q1': ('A XZA ZZA', _u_O1, _f_O1),
+    'O1': ('A YZZ ZZA', _u_O1, _f_O1),
+    'K1': ('A AZZ ZZY', _u_K1, _f_K1),
+    'J1': ('A BZY ZZY', _u_J1, _f_J1),
+    'M1': ('A ZZZ ZZA', _u_M1, _f_M1),
+    'P1': ('A AXZ ZZA', _u_zero, _f_unity),
+    'S1': ('A AYZ ZZZ', _u_zero, _f_unity),
+    'OO1': ('A CZZ ZZY', _u_OO1, _f_OO1),
+    # Semi-Diurnals
+    '2N2': ('B XZB ZZZ', _u_M2, _f_M2),
+    'N2': ('B YZA ZZZ', _u_M2, _f_M2),
+    'NU2': ('B YBY ZZZ', _u_M2, _f_M2),
+    'M2': ('B ZZZ ZZZ', _u_M2, _f_M2),
+    'LAMBDA2': ('B AXA ZZB', _u_M2, _f_M2),
+    'L2': ('B AZY ZZB', _u_L2, _f_L2),
+    'T2': ('B BWZ ZAZ', _u_zero, _f_unity),
+    'S2': ('B BXZ ZZZ', _u_zero, _f_unity),
+    'R2': ('B BYZ ZYB', _u_zero, _f_unity),
+    'K2': ('B BZZ ZZZ', _u_K2, _f_K2),
+    # Third-Diurnals
+    'M3': ('C ZZZ ZZZ', _u_M3, _f_M3),
+}
+
+# Compound constituents: list of (base constituent, multiplier)
+COMPOUND_CONSTITUENTS = {
+    # Long Term
+    'MSF': [('S2', 1), ('M2', -1)],
+    # Diurnal
+    '2Q1': [('N2', 1), ('J1', -1)],
+    'RHO1': [('NU2', 1), ('K1', -1)],
+    # Semi-Diurnal
+    'MU2': [('M2', 2), ('S2', -1)],
+    '2SM2': [('S2', 2), ('M2', -1)],
+    # Third-Diurnal
+    '2MK3': [('M2', 1), ('O1', 1)],
+    'MK3': [('M2', 1), ('K1', 1)],
+    # Quarter-Diurnal
+    'MN4': [('M2', 1), ('N2', 1)],
+    'M4': [('M2', 2)],
+    'MS4': [('M2', 1), ('S2', 1)],
+    'S4': [('S2', 2)],
+    # Sixth-Diurnal
+    'M6': [('M2', 3)],
+    'S6': [('S2', 3)],
+    # Eighth-Diurnals
+    'M8': [('M2', 4)],
+}
+
+
+def _members(constituent):
+    """Return the (base constituent, multiplier) members of a constituent."""
+    if constituent in BASE_CONSTITUENTS:
+        return [(constituent, 1)]
+    if constituent in COMPOUND_CONSTITUENTS:
+        return COMPOUND_CONSTITUENTS[constituent]
+    raise ValueError('Constituent not recognized.')
+
+
+def doodson_coefficients(constituents):
+    """Return the (K x 7) matrix of the multipliers of T+h-s, s, h, p, N, pp and 90 degrees of each constituent."""
+    return np.array([np.sum([n * np.array(_xdo(BASE_CONSTITUENTS[b][0])) for b, n in _members(c)], axis=0)
+        for c in constituents], dtype=float).reshape((-1, 7))
+
+
+def _spanning_set(a):
+    """Stack the values and speeds of the spanning set of the equilibrium arguments."""
+    names = ('T+h-s', 's', 'h', 'p', 'N', 'pp', '90')
+    return np.array([a[n][0] for n in names]), np.array([a[n][1] for n in names])
+
+
+def equilibrium_arguments(constituents, t0):
+    """Return the equilibrium argument V0 (degrees) and speed (degrees/hour) of each constituent at a time.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        t0 (datetime): Time at which the arguments are evaluated.
+
+    Returns:
+        A tuple of two ndarrays (K,) of V0 and speeds.
+
+    """
+    values, speeds = _spanning_set(_astro(_days([t0])))
+    coefficients = doodson_coefficients(constituents)
+    return (coefficients @ values)[:, 0], (coefficients @ speeds)[:, 0]
+
+
+def node_factors(constituents, times):
+    """Return the node factors f and u (degrees) of each constituent at each time.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        times (ndarray(datetime64)): Times at which the node factors are evaluated.
+
+    Returns:
+        A tuple of two ndarrays (K x T) of f and u.
+
+    """
+    return _node_factors(constituents, _astro(_days(times)))
+
+
+def node_multipliers(constituents):
+    """Return the base constituents of a set of constituents and the (K x B) matrix of their multipliers."""
+    members = [_members(c) for c in constituents]
+    bases = [b for b in BASE_CONSTITUENTS if any(b == m for ms in members for m, _ in ms)]
+    multipliers = np.zeros((len(constituents), len(bases)))
+    for k, ms in enumerate(members):
+        for b, n in ms:
+            multipliers[k, bases.index(b)] += n
+    return bases, multipliers
+
+
+def _combine(multipliers, fb, ub):
+    """Combine the node factors f and u (B x T) of base constituents into those (K x T) of the constituents."""
+    f = np.ones((multipliers.shape[0],) + fb.shape[1:])
+    for j in range(multipliers.shape[1]):
+        f *= fb[j] ** np.abs(multipliers[:, j]).reshape((-1,) + (1,) * (fb.ndim - 1))
+    return f, np.tensordot(multipliers, ub, axes=1)
+
+
+def _node_factors(constituents, a, multipliers=None):
+    """Return the node factors f and u (degrees) of each constituent for the astronomical arguments a.
+
+    The base constituents and multipliers of node_multipliers(constituents) may be given to avoid resolving them.
+    """
+    bases, multipliers = multipliers or node_multipliers(constituents)
+    fb = np.array([BASE_CONSTITUENTS[b][2](a) for b in bases]).reshape((len(bases), -1))
+    ub = np.array([BASE_CONSTITUENTS[b][1](a) for b in bases]).reshape((len(bases), -1))
+    return _combine(multipliers, fb, ub)
+
+
+def speeds(constituents, t0):
+    """Return the speed (degrees/hour) of each constituent at a time.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        t0 (datetime64): Time at which the speeds are evaluated.
+
+    Returns:
+        An ndarray (K,) of speeds.
+
+    """
+    return equilibrium_arguments(constituents, t0)[1]
+
+
+def vuf(constituents, times):
+    """Return the equilibrium arguments V, the node factors u and f and the speeds of each constituent at each time.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        times (ndarray(datetime64)): Times at which the terms are evaluated.
+
+    Returns:
+        A tuple of four ndarrays (K x T) of V (degrees), u (degrees), f and speeds (degrees/hour).
+
+    """
+    a = _astro(_days(times))
+    values, rates = _spanning_set(a)
+    coefficients = doodson_coefficients(constituents)
+    f, u = _node_factors(constituents, a)
+    return np.mod(coefficients @ values, 360.), u, f, coefficients @ rates
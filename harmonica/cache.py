@@ -0,0 +1,291 @@
+from harmonica import config
+from collections import OrderedDict
+import threading
+import numpy as np
+
+
+class LRUCache(object):
+    """Thread-safe least-recently-used cache of arrays bounded by a byte budget."""
+
+    def __init__(self, max_bytes):
+        """Create an empty cache.
+
+        Args:
+            max_bytes (int): Byte budget of the cached values; least recently used values are evicted beyond it.
+
+        """
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    def __contains__(self, key):
+        return key in self._items
+
+
+    def get(self, key, default=None):
+        """Return the cached value of key (marking it as most recently used) or default, counting hits and misses."""
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    def put(self, key, value):
+        """Cache a value, evicting least recently used values until the cache fits its byte budget."""
+        size = getattr(value, 'nbytes', 0)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= getattr(self._items.pop(key), 'nbytes', 0)
+            if size > self.max_bytes:
+                return value
+            self._items[key] = value
+            self.nbytes += size
+            self._evict()
+        return value
+
+
+    def resize(self, max_bytes):
+        """Change the byte budget, evicting least recently used values if the cache no longer fits."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.nbytes -= getattr(evicted, 'nbytes', 0)
+            self.evictions += 1
+
+
+    def clear(self):
+        """Remove all cached values and reset the counters."""
+        with self._lock:
+            self._items.clear()
+            self.nbytes = self.hits = self.misses = self.evictions = 0
+
+
+    def stats(self):
+        """Return a dictionary of the cache counters."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'items': len(self._items),
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class TileCache(LRUCache):
+    """Cache of decoded model grid tiles keyed by (file, constituent, tile).
+
+    The file is the absolute path of the model file (see ResourceManager.constituent_path), so tiles are never served
+    for another data directory. A tile is one storage chunk of a gridded variable (e.g. hRe, hIm); the tile part of
+    the key is the tuple (variable, x tile index, y tile index). Tiles missing from a requested block are read together with a single
+    hyperslab read and split into tiles before being cached. A tile being read by one thread (e.g. a prefetch) is
+    waited for by the others instead of being read again.
+    """
+
+    def __init__(self, max_bytes):
+        super(TileCache, self).__init__(max_bytes)
+        self._pending = {}
+
+
+    def cached(self, key, xs, ys, tile_shape):
+        """Return True if every tile of a 2-D block is cached, without counting hits or misses.
+
+        Args:
+            key (tuple): (file, constituent, variable) prefix of the tile keys.
+            xs (slice): Block extent along the x dimension.
+            ys (slice): Block extent along the y dimension.
+            tile_shape (tuple(int, int)): Tile (storage chunk) shape along (x, y).
+
+        """
+        tx, ty = tile_shape
+        file, constituent, variable = key
+        with self._lock:
+            return all((file, constituent, (variable, i, j)) in self._items
+                for i in range(xs.start // tx, (xs.stop - 1) // tx + 1)
+                for j in range(ys.start // ty, (ys.stop - 1) // ty + 1))
+
+
+    def block(self, var, key, index, xs, ys, tile_shape):
+        """Return the values of a 2-D block of a gridded variable, reading only the tiles not already cached.
+
+        Args:
+            var (array-like): Variable indexed as [index..., x, y] (e.g. xarray.DataArray).
+            key (tuple): (file, constituent, variable) prefix of the tile keys.
+            index (tuple): Leading indices selecting the 2-D grid (e.g. the constituent).
+            xs (slice): Block extent along the x dimension.
+            ys (slice): Block extent along the y dimension.
+            tile_shape (tuple(int, int)): Tile (storage chunk) shape along (x, y).
+
+        Returns:
+            An ndarray of the block values.
+
+        """
+        tx, ty = tile_shape
+        file, constituent, variable = key
+        tiles = {}
+        missing = []
+        waiting = []
+        for i in range(xs.start // tx, (xs.stop - 1) // tx + 1):
+            for j in range(ys.start // ty, (ys.stop - 1) // ty + 1):
+                tile_key = (file, constituent, (variable, i, j))
+                tile = self.get(tile_key)
+                if tile is not None:
+                    tiles[(i, j)] = tile
+                    continue
+                with self._lock:
+                    event = self._pending.get(tile_key)
+                    if event is None:
+                        self._pending[tile_key] = threading.Event()
+                        missing.append((i, j))
+                    else:
+                        waiting.append((i, j, event))
+
+        if missing:
+            try:
+                tiles.update(self._load(var, key, index, missing, tile_shape))
+            finally:
+                with self._lock:
+                    for i, j in missing:
+                        self._pending.pop((file, constituent, (variable, i, j))).set()
+        for i, j, event in waiting:
+            event.wait()
+            with self._lock:
+                tile = self._items.get((file, constituent, (variable, i, j)))
+            tiles[(i, j)] = tile if tile is not None else self._load(var, key, index, [(i, j)], tile_shape)[(i, j)]
+
+        # assemble the block from the overlapping parts of the tiles
+        block = None
+        for (i, j), tile in tiles.items():
+            if block is None:
+                block = np.empty((xs.stop - xs.start, ys.stop - ys.start), dtype=tile.dtype)
+            x0, x1 = max(xs.start, i * tx), min(xs.stop, i * tx + tile.shape[0])
+            y0, y1 = max(ys.start, j * ty), min(ys.stop, j * ty + tile.shape[1])
+            block[x0 - xs.start:x1 - xs.start, y0 - ys.start:y1 - ys.start] = \
+                tile[x0 - i * tx:x1 - i * tx, y0 - j * ty:y1 - j * ty]
+        return block
+
+
+    def _load(self, var, key, index, tiles, tile_shape):
+        """Read the bounding box of the given tiles at once, split it into tiles and cache them."""
+        tx, ty = tile_shape
+        file, constituent, variable = key
+        nx, ny = var.shape[-2:]
+        i0, i1 = min(i for i, _ in tiles), max(i for i, _ in tiles)
+        j0, j1 = min(j for _, j in tiles), max(j for _, j in tiles)
+        data = np.asarray(var[tuple(index) + (np.s_[i0 * tx:min((i1 + 1) * tx, nx)],
+            np.s_[j0 * ty:min((j1 + 1) * ty, ny)])])
+        loaded = {}
+        for i, j in tiles:
+            tile = np.ascontiguousarray(data[(i - i0) * tx:(i - i0 + 1) * tx, (j - j0) * ty:(j - j0 + 1) * ty])
+            loaded[(i, j)] = self.put((file, constituent, (variable, i, j)), tile)
+        return loaded
+
+
+_tile_cache = None
+
+
+def default_tile_cache():
+    """Return the shared tile cache of the extraction layer, sized by config['tile_cache_bytes'].
+
+    Returns:
+        The shared TileCache, or None if config['tile_cache_bytes'] is zero (caching disabled).
+
+    """
+    global _tile_cache
+    max_bytes = config.get('tile_cache_bytes', 0)
+    if not max_bytes:
+        return None
+    if _tile_cache is None:
+        _tile_cache = TileCache(max_bytes)
+    elif _tile_cache.max_bytes != max_bytes:
+        _tile_cache.resize(max_bytes)
+    return _tile_cache
+
+
+class BasisCache(LRUCache):
+    """Cache of harmonic basis matrices (with node factors applied) keyed by time vector fingerprint and constituents.
+
+    A basis is only computed and cached the second time its key is requested: one-off time vectors keep the direct
+    evaluation, which is cheaper than building a basis, while repeated ones reduce to a matrix product.
+    """
+
+    # Number of keys requested once that are remembered
+    SEEN = 4096
+
+    def __init__(self, max_bytes):
+        super(BasisCache, self).__init__(max_bytes)
+        self._seen = OrderedDict()
+
+
+    def basis(self, key, build):
+        """Return the cached basis of key, build and cache it if the key was requested before, or None.
+
+        Args:
+            key (tuple): Key of the basis.
+            build (callable): Function without arguments returning the basis.
+
+        Returns:
+            The read-only basis, or None the first time a key is requested.
+
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            if key not in self._seen:
+                self._seen[key] = True
+                if len(self._seen) > self.SEEN:
+                    self._seen.popitem(last=False)
+                return None
+            del self._seen[key]
+        value = build()
+        value.flags.writeable = False
+        return self.put(key, value)
+
+
+    def clear(self):
+        """Remove all cached values, forget the keys requested once and reset the counters."""
+        with self._lock:
+            super(BasisCache, self).clear()
+            self._seen.clear()
+
+
+_basis_cache = None
+
+
+def default_basis_cache():
+    """Return the shared harmonic basis cache, sized by config['basis_cache_bytes'].
+
+    Returns:
+        The shared BasisCache, or None if config['basis_cache_bytes'] is zero (caching disabled).
+
+    """
+    global _basis_cache
+    max_bytes = config.get('basis_cache_bytes', 0)
+    if not max_bytes:
+        return None
+    if _basis_cache is None:
+        _basis_cache = BasisCache(max_bytes)
+    elif _basis_cache.max_bytes != max_bytes:
+        _basis_cache.resize(max_bytes)
+    return _basis_cache
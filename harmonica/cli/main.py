@@ -2,6 +2,7 @@ from .. import __version__
 from .common import add_common_args
 from .main_constituents import config_parser as config_parser_constituents
 from .main_deconstruct import config_parser as config_parser_deconstruct
+from .main_detide import config_parser as config_parser_detide
 from .main_reconstruct import config_parser as config_parser_reconstruct
 from .main_resources import config_parser as config_parser_resources
 from importlib import import_module
@@ -21,6 +22,7 @@ def main():
     sps.required = True
     config_parser_constituents(sps, True)
     config_parser_deconstruct(sps, True)
+    config_parser_detide(sps, True)
     config_parser_reconstruct(sps, True)
     config_parser_resources(sps, True)
 
@@ -24,6 +24,13 @@ def config_parser(p, sub=False):
     add_common_args(p)
     add_loc_model_args(p)
     add_const_out_args(p)
+    p.add_argument(
+        '-R', '--level',
+        type=int,
+        default=0,
+        help='Level of detail of the model grids (0 for full resolution, n for a pyramid level built with ' \
+            '"harmonica resources pyramid"), default: 0',
+    )
 
 
 def parse_args(args):
@@ -38,7 +45,7 @@ def parse_args(args):
 
 def execute(args):
     cons = Constituents().get_components([args.lat, args.lon], model=args.model, cons=args.cons,
-        positive_ph=args.positive_phase)
+        positive_ph=args.positive_phase, level=args.level)
     out = cons.data.to_csv(args.output, sep='\t', header=True, index=True, index_label='constituent')
     if args.output is None:
         print(out)
@@ -106,7 +106,7 @@ def execute(args):
     wl = args.dt_cols[-1]
     wl = df.columns[wl] if isinstance(wl, int) else wl
     try:
-        tide = harmonica.Tide().deconstruct_tide(df[wl], df['datetimes'], cons=args.cons,
+        tide = harmonica.Tide().deconstruct_tide(df[wl].values, df['datetimes'].values, cons=args.cons,
             n_period=args.num_periods, positive_ph=args.positive_phase)
     except RuntimeWarning as w:
         if 'Number of calls to function has reached maxfev' in str(w):
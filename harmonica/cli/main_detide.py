@@ -0,0 +1,140 @@
+from .. import detide
+from ..predictor import TidePredictor
+from ..resource import ResourceManager
+from ..tidal_constituents import Constituents
+from .common import add_common_args
+import argparse
+import pandas as pd
+import sys
+
+DESCR = 'Compute the non-tidal residuals (observed minus predicted water levels) of an observation file.'
+EXAMPLE = """
+Example:
+
+    harmonica detide CO-OPS__8760922__wl.csv --loc 38.375789 -74.943915 --columns "Date Time" "Water Level" \
+        --datetime_format '%Y-%m-%d %H:%M' -O residuals.tsv
+"""
+
+def config_parser(p, sub=False):
+    # Subparser info
+    if sub:
+        p = p.add_parser(
+            'detide',
+            description=DESCR,
+            help=DESCR,
+            epilog=EXAMPLE,
+            add_help=False,
+        )
+
+    # Required positional arguments
+    p.add_argument(
+        'signal',
+        type=str,
+        help='File to read the observed water levels from (CSV formatted)',
+        metavar='SIGNAL',
+    )
+
+    add_common_args(p)
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '--loc',
+        type=float,
+        nargs=2,
+        help='Location [latitude, longitude] of the observations, to extract the constituents from the model',
+        metavar=('LAT', 'LON'),
+    )
+    source.add_argument(
+        '--constituents',
+        help='File of supplied constituents (tab separated, as written by the constituents and deconstruct commands)',
+        dest='cons_file',
+        metavar='FILE',
+    )
+    p.add_argument(
+        '-M', '--model',
+        choices=ResourceManager.RESOURCES.keys(),
+        default=ResourceManager.DEFAULT_RESOURCE,
+        help='Optional constituent model specification, default: {}'.format(ResourceManager.DEFAULT_RESOURCE),
+    )
+    p.add_argument(
+        '-C', '--cons',
+        nargs='+',
+        default=None,
+        help='Optional list of constituents to retrieve; retrieves all by default',
+    )
+    p.add_argument(
+        '--datetime_format',
+        default=None,
+        help="Format of 'datetime' values in signal file (used by Pandas datetime parser), default: inferred",
+        dest='dt_format',
+    )
+    p.add_argument(
+        '--columns',
+        nargs='+',
+        default=[0, 1],
+        help="Name or index of columns in signal file to extract times and water levels; multiple columns can be " \
+            "specified to combine and parse as a datetime; the last column specified is assumed to be water levels, " \
+            "default: '0 1'",
+        dest='dt_cols',
+        metavar='COL',
+    )
+    p.add_argument(
+        '--header',
+        default=0,
+        help="Row number that contains the column names (specify 'None' if no column names), default: '0'",
+    )
+    p.add_argument(
+        '--sep',
+        default=',',
+        help="Field delimiter of the signal file, default: ',' (comma)",
+    )
+    p.add_argument(
+        '--chunk_rows',
+        type=int,
+        default=detide.CHUNK_ROWS,
+        help='Number of observations read, predicted and written at once, default: {}'.format(detide.CHUNK_ROWS),
+    )
+    p.add_argument(
+        '-O', '--output',
+        default=None,
+        help='Write output to specified file',
+    )
+
+
+def parse_args(args):
+    p = argparse.ArgumentParser(
+        description=DESCR,
+        epilog=EXAMPLE,
+        add_help=False,
+    )
+    config_parser(p)
+    return p.parse_args(args)
+
+
+def execute(args):
+    columns = [int(x) if isinstance(x, str) and x.isdigit() else x for x in args.dt_cols]
+    header = None if args.header in (None, 'None') else int(args.header)
+    constituents = Constituents()
+    if args.cons_file is not None:
+        constituents.data = pd.read_csv(args.cons_file, sep='\t', index_col=0)
+    else:
+        constituents.get_components(args.loc, model=args.model, cons=args.cons)
+    predictor = TidePredictor.from_constituents(constituents)
+    try:
+        detide.detide(args.signal, predictor, args.output if args.output is not None else sys.stdout, columns,
+            args.dt_format, args.sep, header, args.chunk_rows)
+    except ValueError as e:
+        print('\n{}\n\nFailed.\n'.format(e), file=sys.stdout if args.output is not None else sys.stderr)
+        return
+    # keep the residuals written to stdout free of messages
+    print('\nComplete.\n', file=sys.stdout if args.output is not None else sys.stderr)
+
+
+def main(args=None):
+    if not args:
+        args = sys.argv[1:]
+    try:
+        execute(parse_args(args))
+    except RuntimeError as e:
+        print(str(e))
+        sys.exit(1)
+    return
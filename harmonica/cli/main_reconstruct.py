@@ -1,11 +1,9 @@
 from ..tidal_constituents import Constituents
 from ..harmonica import Tide
+from .. import reconstruction
 from .common import add_common_args, add_loc_model_args, add_const_out_args
-from pytides.tide import Tide as pyTide
 from datetime import date, datetime
 import argparse
-import numpy as np
-import pandas as pd
 import sys
 
 DESCR = 'Reconstruct the tides at specified location and times.'
@@ -18,7 +16,7 @@ Example:
 def validate_date(value):
     try:
         # return date.fromisoformat(value) # python 3.7
-        return pd.datetime.strptime(value, '%Y-%m-%d')
+        return datetime.strptime(value, '%Y-%m-%d')
     except ValueError:
         msg = "Not a valid date: '{0}'.".format(value)
         raise argparse.ArgumentTypeError(msg)
@@ -56,6 +54,19 @@ def config_parser(p, sub=False):
         default=7.,
         help='Length of series in days [positive non-zero], default: 7'
     )
+    p.add_argument(
+        '--stream',
+        action='store_true',
+        default=False,
+        help='Write the series in chunks as it is computed, in constant memory (for very long series)',
+    )
+    p.add_argument(
+        '-W', '--workers',
+        type=int,
+        default=None,
+        help='Number of processes computing partitions of the series in parallel (0 for one per processor), '
+            'default: serial',
+    )
     add_loc_model_args(p)
     add_const_out_args(p)
 
@@ -70,14 +81,31 @@ def parse_args(args):
     return p.parse_args(args)
 
 
+def stream(args):
+    start = datetime.fromordinal(args.start_date.toordinal())
+    chunks = Tide().reconstruct_tide_stream(loc=[args.lat, args.lon], start=start, hours=args.length * 24.,
+        model=args.model, cons=args.cons, positive_ph=args.positive_phase)
+    out = open(args.output, 'w') if args.output is not None else sys.stdout
+    try:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(out, sep='\t', header=i == 0, index=False)
+    finally:
+        if args.output is not None:
+            out.close()
+    # keep the series written to stdout free of messages
+    print('\nComplete.\n', file=sys.stdout if args.output is not None else sys.stderr)
+
+
 def execute(args):
-    times = pyTide._times(datetime.fromordinal(args.start_date.toordinal()), np.arange(args.length * 24., dtype=float))
+    if args.stream:
+        return stream(args)
+    times = reconstruction.time_range(datetime.fromordinal(args.start_date.toordinal()), args.length * 24.)
     tide = Tide().reconstruct_tide(loc=[args.lat, args.lon], times=times, model=args.model, cons=args.cons,
-        positive_ph=args.positive_phase)
+        positive_ph=args.positive_phase, workers=args.workers)
     out = tide.data.to_csv(args.output, sep='\t', header=True, index=False)
     if args.output is None:
         print(out)
-    print('\nComplete.\n')
+    print('\nComplete.\n', file=sys.stdout if args.output is not None else sys.stderr)
 
 
 def main(args=None):
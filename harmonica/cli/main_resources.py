@@ -10,6 +10,8 @@ Example:
 """
 actions = {
     'download': 'download_model',
+    'pack': 'pack_model',
+    'pyramid': 'build_pyramid',
     'remove': 'remove_model',
 }
 
@@ -0,0 +1,74 @@
+from .extrema import COARSE_STEP
+from .reconstruction import BASIS_BYTES
+import numpy as np
+
+# Current National Tidal Datum Epoch (19 years, 1983 to 2001)
+NTDE_START = np.datetime64('1983-01-01T00:00:00', 'ns')
+NTDE_END = np.datetime64('2002-01-01T00:00:00', 'ns')
+
+# Length of a tidal (mean lunar) day in hours
+LUNAR_DAY = 24.8412
+
+# Maximum number of tidal days of the periods predicted at once
+MAX_CHUNK_DAYS = 353
+
+DATUMS = ('MHHW', 'MHW', 'MTL', 'MLW', 'MLLW')
+
+
+def tidal_datums(predictor, start=NTDE_START, end=NTDE_END, step=COARSE_STEP, max_bytes=BASIS_BYTES):
+    """Compute the tidal datums of one or more locations over a tidal datum epoch.
+
+    The high and low waters of the epoch are located from the derivative of the tide (see extrema.extrema) over
+    successive periods of whole tidal days, and only running sums are kept between periods, so the memory footprint
+    depends on the number of locations but not on the length of the epoch. Tidal days are counted from the start of
+    the epoch.
+
+    MHW and MLW are the means of all the high and low waters, MHHW and MLLW the means of the highest high water and
+    of the lowest low water of each tidal day having one, and MTL is the mean of MHW and MLW. Datums are relative to
+    the zero of the harmonic model (e.g. mean sea level, or its offset if the model includes one).
+
+    Args:
+        predictor (TidePredictor): Compiled harmonic model of one or more locations.
+        start (datetime64, optional): Start of the epoch, defaults to the start of the 1983-2001 National Tidal Datum
+            Epoch.
+        end (datetime64, optional): End of the epoch (excluded), defaults to the end of the 1983-2001 National Tidal
+            Datum Epoch.
+        step (float, optional): Spacing in hours of the samples bracketing the extrema, defaults to 0.5.
+        max_bytes (int, optional): Memory budget of the intermediate arrays of a period, defaults to 64 MiB.
+
+    Returns:
+        A dictionary of the datums (DATUMS) of the locations, floats for one location or ndarrays (N) for N locations.
+
+    """
+    start = np.datetime64(start, 'ns')
+    end = np.datetime64(end, 'ns')
+    shape = predictor.amplitudes.shape[:-1]
+    N = int(np.prod(shape))
+    K = len(predictor.constituents)
+    day = int(round(LUNAR_DAY * 3600e9))
+    # about 4 extrema per tidal day, each with a few work arrays of K values
+    chunk = day * max(1, min(MAX_CHUNK_DAYS, int(max_bytes // (128 * N * max(K, 1)))))
+
+    # sums and counts of the high waters, low waters, higher high waters and lower low waters
+    sums = np.zeros((4, N))
+    counts = np.zeros((4, N))
+    total = (end - start).astype(np.int64)
+    for offset in range(0, total, chunk):
+        hours = min(chunk, total - offset) / 3600e9
+        times, heights, highs, model = predictor.high_low(start + np.timedelta64(offset, 'ns'), hours, step)
+        days = (times - start).astype(np.int64) // day
+        for i, (select, reduce) in enumerate(((highs, np.maximum), (~highs, np.minimum))):
+            m, d, h = model[select], days[select], heights[select]
+            if not h.size:
+                continue
+            sums[i] += np.bincount(m, h, N)
+            counts[i] += np.bincount(m, minlength=N)
+            # extrema are ordered by location and time, so each (location, tidal day) is a run
+            first = np.flatnonzero(np.r_[True, (m[1:] != m[:-1]) | (d[1:] != d[:-1])])
+            sums[i + 2] += np.bincount(m[first], reduce.reduceat(h, first), N)
+            counts[i + 2] += np.bincount(m[first], minlength=N)
+
+    with np.errstate(invalid='ignore'):
+        mhw, mlw, mhhw, mllw = sums / counts
+    datums = {'MHHW': mhhw, 'MHW': mhw, 'MTL': 0.5 * (mhw + mlw), 'MLW': mlw, 'MLLW': mllw}
+    return {name: datums[name].reshape(shape)[()] for name in DATUMS}
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Default number of observations read, predicted and written at once
+CHUNK_ROWS = 2**17
+
+COLUMNS = ['datetimes', 'observed', 'predicted', 'residual']
+
+
+def _column(frame, column):
+    """Select a column of a frame by name, or by position if it is not a name."""
+    return frame[column] if column in frame.columns else frame.iloc[:, column]
+
+
+def read_signal(signal, columns=(0, 1), datetime_format=None, sep=',', header=0, chunk_rows=CHUNK_ROWS):
+    """Read the times and water levels of an observation file in chunks.
+
+    Args:
+        signal (str or file): Path or buffer of the observation file (CSV formatted).
+        columns (list, optional): Names or positions of the columns of the times and water levels; the last column
+            holds the water levels and the others are joined (separated by spaces) and parsed as the times. Defaults
+            to the first two columns.
+        datetime_format (str, optional): strftime format of the times, defaults to None (inferred).
+        sep (str, optional): Field delimiter, defaults to ','.
+        header (int, optional): Row number of the column names, None if the file has none. Defaults to 0.
+        chunk_rows (int, optional): Number of observations per chunk, defaults to 131072.
+
+    Yields:
+        A tuple of the datetime64[ns] times and float water levels of each chunk.
+
+    """
+    columns = list(columns)
+    if len(columns) < 2:
+        raise ValueError('The columns of the times and of the water levels are required.')
+    for chunk in pd.read_csv(signal, sep=sep, header=header, chunksize=chunk_rows):
+        parts = [_column(chunk, c) for c in columns[:-1]]
+        text = parts[0] if len(parts) == 1 else parts[0].astype(str).str.cat([p.astype(str) for p in parts[1:]],
+            sep=' ')
+        times = pd.to_datetime(text, format=datetime_format).values.astype('datetime64[ns]')
+        yield times, pd.to_numeric(_column(chunk, columns[-1]), errors='coerce').values.astype(float)
+
+
+def detide_stream(predictor, chunks):
+    """Compute the non-tidal residuals (observed minus predicted water levels) of chunks of observations.
+
+    Every chunk is predicted at exactly its own times (see TidePredictor.predict), so only one chunk is held in
+    memory at a time, and uniformly spaced chunks take the uniform time step fast path. The equilibrium arguments
+    and node factor partitions of every chunk are those of the first time of the record (the epoch of the
+    predictions), so the residuals are those of a prediction of the whole record and do not depend on the chunk
+    size.
+
+    Args:
+        predictor (TidePredictor): Compiled harmonic model of the location of the observations.
+        chunks (iterable): Tuples of the times and water levels of each chunk (see read_signal).
+
+    Yields:
+        A dataframe of the datetimes, observed and predicted water levels and residual of each chunk.
+
+    """
+    if predictor.amplitudes.ndim != 1:
+        raise ValueError('Observations are detided with the harmonic model of a single location.')
+    epoch = None
+    for times, observed in chunks:
+        observed = np.asarray(observed, dtype=float)
+        if observed.shape != times.shape:
+            raise ValueError('The observations must have one water level per time.')
+        if not times.size:
+            continue
+        if epoch is None:
+            epoch = times[0]
+        predicted = predictor.predict(times, epoch=epoch)
+        yield pd.DataFrame({
+            'datetimes': times,
+            'observed': observed,
+            'predicted': predicted,
+            'residual': observed - predicted,
+        }, columns=COLUMNS)
+
+
+def detide(signal, predictor, output, columns=(0, 1), datetime_format=None, sep=',', header=0,
+        chunk_rows=CHUNK_ROWS, output_sep='\t'):
+    """Detide an observation file into a residual file, in constant memory.
+
+    The observations are read, predicted and written chunk by chunk (see read_signal and detide_stream).
+
+    Args:
+        signal (str or file): Path or buffer of the observation file (CSV formatted).
+        predictor (TidePredictor): Compiled harmonic model of the location of the observations.
+        output (str or file): Path or buffer of the residual file, written with the datetimes, observed, predicted
+            and residual columns.
+        columns (list, optional): Names or positions of the columns of the times and water levels (see read_signal),
+            defaults to the first two columns.
+        datetime_format (str, optional): strftime format of the times, defaults to None (inferred).
+        sep (str, optional): Field delimiter of the observation file, defaults to ','.
+        header (int, optional): Row number of the column names, None if the file has none. Defaults to 0.
+        chunk_rows (int, optional): Number of observations per chunk, defaults to 131072.
+        output_sep (str, optional): Field delimiter of the residual file, defaults to a tab.
+
+    Returns:
+        The number of observations detided.
+
+    """
+    out = open(output, 'w') if isinstance(output, str) else output
+    rows = 0
+    try:
+        chunks = read_signal(signal, columns, datetime_format, sep, header, chunk_rows)
+        for i, residuals in enumerate(detide_stream(predictor, chunks)):
+            residuals.to_csv(out, sep=output_sep, header=i == 0, index=False)
+            rows += len(residuals)
+    finally:
+        if out is not output:
+            out.close()
+    return rows
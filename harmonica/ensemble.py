@@ -0,0 +1,119 @@
+from .predictor import TidePredictor
+from .tidal_constituents import Constituents
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Default models of an ensemble
+MODELS = ('tpxo7', 'tpxo8', 'tpxo9')
+
+
+def extract(locs, models=MODELS, cons=[], positive_ph=False, level=0, dtype=float):
+    """Extract the constants of a batch of locations from several tide models concurrently.
+
+    Each model is read by its own thread (the reads of the different model files overlap) with
+    Constituents.get_batch_components.
+
+    Args:
+        locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+            [0 360] of the requested points.
+        models (list(str), optional): Model names, defaults to tpxo7, tpxo8 and tpxo9.
+        cons (list(str), optional): List of constituents requested, defaults to all constituents of each model if
+            None or empty.
+        positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+            [-180 180] (False, the default).
+        level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+            or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+        dtype (type, optional): Precision of the interpolation, float64 (the default) or float32.
+
+    Returns:
+        A list of the Constituents of each model.
+
+    """
+    models = list(models)
+    if not models:
+        raise ValueError('At least one model is required.')
+
+    def components(model):
+        return Constituents().get_batch_components(locs, model, cons, positive_ph, level, dtype)
+
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        return list(executor.map(components, models))
+
+
+def ensemble_predictor(constituents, offset=None, **kwargs):
+    """Compile the constants of M models at N locations into a single predictor of M x N locations.
+
+    The predictor is built on the union of the constituents of the models, a constituent missing from a model having
+    a zero amplitude in that model, so the astronomy and node factors of the times, and the cos/sin basis, are
+    evaluated once for all the models and all the series are evaluated by the same matrix products. The location
+    j of model m is the location m N + j of the predictor.
+
+    Args:
+        constituents (list(Constituents)): Results of Constituents.get_batch_components of the same N locations for
+            each of the M models (see extract).
+        offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+        **kwargs: Options of TidePredictor.
+
+    Returns:
+        A TidePredictor.
+
+    """
+    constants = [c.harmonic_constants() for c in constituents]
+    names = sorted(set().union(*(n for n, _, _ in constants)))
+    N = constants[0][1].shape[0]
+    amplitudes = np.zeros((len(constants), N, len(names)))
+    phases = np.zeros(amplitudes.shape)
+    for m, (model_names, model_amplitudes, model_phases) in enumerate(constants):
+        if model_amplitudes.shape[0] != N:
+            raise ValueError('The models must have constants at the same locations.')
+        columns = [names.index(n) for n in model_names]
+        amplitudes[m][:, columns] = model_amplitudes
+        phases[m][:, columns] = model_phases
+    if offset is not None:
+        names = names + ['Z0']
+        amplitudes = np.concatenate([amplitudes, np.zeros(amplitudes.shape[:-1] + (1,))], axis=-1)
+        phases = np.concatenate([phases, np.full(phases.shape[:-1] + (1,), float(offset))], axis=-1)
+    return TidePredictor(names, amplitudes.reshape((-1, len(names))), phases.reshape((-1, len(names))), **kwargs)
+
+
+def ensemble_stats(water_levels):
+    """Return the ensemble mean and spread (standard deviation across the models) of (T x M x N) water levels."""
+    return water_levels.mean(axis=1), water_levels.std(axis=1)
+
+
+def predict_ensemble(locs, times, models=MODELS, cons=[], positive_ph=False, offset=None, level=0, dtype=float,
+        **kwargs):
+    """Predict the water levels of several tide models at a batch of locations, with their ensemble mean and spread.
+
+    The constants of the models are extracted concurrently (see extract) and all the series are evaluated by a single
+    predictor sharing the equilibrium arguments and the basis of the times (see ensemble_predictor).
+
+    Example:
+        levels, mean, spread = predict_ensemble([(39.5, -74.)], reconstruction.time_range('2020-01-01', 48.))
+
+    Args:
+        locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+            [0 360] of the requested points.
+        times (ndarray(datetime64)): Times, as datetime64 values, int64 nanoseconds since the Unix epoch or datetime
+            objects.
+        models (list(str), optional): Model names, defaults to tpxo7, tpxo8 and tpxo9.
+        cons (list(str), optional): List of constituents requested, defaults to all constituents of each model if
+            None or empty.
+        positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+            [-180 180] (False, the default).
+        offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+        level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+            or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+        dtype (type, optional): Precision of the constants and the water levels, float64 (the default) or float32.
+        **kwargs: Options of TidePredictor.
+
+    Returns:
+        A tuple of ndarrays of the water levels (T x M x N) of the M models at the N locations and of their ensemble
+            mean (T x N) and spread (T x N).
+
+    """
+    constituents = extract(locs, models, cons, positive_ph, level, dtype)
+    predictor = ensemble_predictor(constituents, offset, dtype=dtype, **kwargs)
+    water_levels = predictor.predict(times)
+    water_levels = water_levels.reshape(water_levels.shape[:1] + (len(constituents), -1))
+    return (water_levels,) + ensemble_stats(water_levels)
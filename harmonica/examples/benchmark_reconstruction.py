@@ -0,0 +1,80 @@
+"""Benchmark the harmonica reconstruction engine against pytides' Tide.at.
+
+Reconstructs a synthetic model of every supported constituent over one-minute series of increasing length and
+reports the run times of both implementations (including building their time arrays: datetime objects for
+pytides, datetime64 for the engine) and their largest difference relative to the sum of the amplitudes. Then
+quantifies the drift of the uniform time step (phasor recurrence) fast path against an extended precision evaluation
+for several anchor intervals.
+
+    python -m harmonica.examples.benchmark_reconstruction
+"""
+from harmonica import astronomy, reconstruction
+from harmonica.harmonica import Tide
+from pytides.tide import Tide as pyTide
+import pytides.constituent as pycons
+from datetime import datetime
+import numpy as np
+import time
+
+
+def pytides_model(names, amplitudes, phases):
+    model = np.zeros(len(names), dtype=pyTide.dtype)
+    for i, c in enumerate(names):
+        model[i]['constituent'] = getattr(pycons, '_{}'.format(Tide.PYTIDES_CON_MAPPER.get(c, c)))
+        model[i]['amplitude'] = amplitudes[i]
+        model[i]['phase'] = phases[i]
+    return model
+
+
+def main():
+    names = list(astronomy.BASE_CONSTITUENTS) + list(astronomy.COMPOUND_CONSTITUENTS)
+    rng = np.random.RandomState(0)
+    amplitudes = rng.uniform(0.01, 1., len(names))
+    phases = rng.uniform(0., 360., len(names))
+    model = pytides_model(names, amplitudes, phases)
+    t0 = datetime(2019, 1, 1)
+
+    print('{:>10} {:>12} {:>12} {:>9} {:>12}'.format('samples', 'pytides [s]', 'engine [s]', 'speedup', 'rel. diff'))
+    for days in (7, 30, 365):
+        hours = np.arange(days * 24 * 60) / 60.
+
+        start = time.perf_counter()
+        times = pyTide._times(t0, hours)
+        expected = pyTide(model=model.copy(), radians=False).at(times)
+        reference = time.perf_counter() - start
+
+        start = time.perf_counter()
+        times = reconstruction.time_range(t0, hours.size / 60., 1. / 60.)
+        actual = reconstruction.reconstruct(names, amplitudes, phases, times)
+        engine = time.perf_counter() - start
+
+        diff = np.abs(actual - expected).max() / amplitudes.sum()
+        print('{:>10} {:>12.3f} {:>12.3f} {:>8.1f}x {:>12.2e}'.format(len(hours), reference, engine,
+            reference / engine, diff))
+
+    print('\n{:>10} {:>8} {:>12} {:>12}'.format('step', 'anchor', 'time [s]', 'rel. error'))
+    for step in (1., 60.):
+        times = np.datetime64(t0, 'ns') + np.arange(60 * 24 * 60) * np.timedelta64(int(step * 60e9), 'ns')
+        expected = extended_precision(names, amplitudes, phases, times)
+        for anchor in (0, 16, reconstruction.ANCHOR_INTERVAL, 4096, 65536):
+            start = time.perf_counter()
+            actual = reconstruction.reconstruct(names, amplitudes, phases, times, anchor_interval=anchor)
+            elapsed = time.perf_counter() - start
+            error = np.abs(actual - expected).max() / amplitudes.sum()
+            print('{:>8.0f} m {:>8} {:>12.3f} {:>12.2e}'.format(step, anchor or 'exact', elapsed, error))
+
+
+def extended_precision(names, amplitudes, phases, times):
+    """Evaluate the engine's model with long double trigonometry, as a reference for its rounding errors."""
+    arguments = reconstruction._Arguments(names, times)
+    ld = np.longdouble
+    water_level = np.empty(times.size)
+    for p, (index, _) in enumerate(arguments.partitions):
+        arg = np.multiply.outer(arguments.hours[index].astype(ld), arguments.speed.astype(ld))
+        arg += arguments.V0.astype(ld) + arguments.u[p].astype(ld) - np.radians(phases.astype(ld))
+        water_level[index] = np.cos(arg) @ (amplitudes * arguments.f[p]).astype(ld)
+    return water_level
+
+
+if __name__ == '__main__':
+    main()
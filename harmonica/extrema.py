@@ -0,0 +1,171 @@
+from . import kernels, nodal
+from .astronomy import d2r
+from .nodal import NODAL_INTERVAL
+from .reconstruction import ANCHOR_INTERVAL, BASIS_BYTES, _Arguments, _evaluate, time_range
+import numpy as np
+
+# Default spacing in hours of the times at which the derivative of the water level is sampled to bracket extrema
+COARSE_STEP = 0.5
+
+# Default tolerance in hours of the extrema times
+TOLERANCE = 1e-6
+
+# Maximum number of refinement steps of an extremum
+MAX_ITERATIONS = 50
+
+
+def _hermite_root(lo, hi, y0, y1, m0, m1, iterations=4):
+    """Return the roots of the cubic Hermite interpolants of brackets of a function from its values and slopes."""
+    width = hi - lo
+    m0 = m0 * width
+    m1 = m1 * width
+    # Newton steps on the cubic from the secant, kept within the bracket
+    s = y0 / (y0 - y1)
+    for _ in range(iterations):
+        s2 = s * s
+        p = (2. * s - 3.) * s2 * (y0 - y1) + y0 + (s2 - 2. * s + 1.) * s * m0 + (s - 1.) * s2 * m1
+        dp = 6. * (s2 - s) * (y0 - y1) + (3. * s2 - 4. * s + 1.) * m0 + (3. * s2 - 2. * s) * m1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.clip(s - p / dp, 0., 1.)
+        s = np.where(np.isnan(s), 0.5, s)
+    return lo + s * width
+
+
+def find_extrema(constituents, amplitudes, phases, start, hours, step=COARSE_STEP, tol=TOLERANCE,
+        nodal_interval=NODAL_INTERVAL, nodal_policy=None, max_bytes=BASIS_BYTES):
+    """Find the times and heights of the high and low waters of harmonic models.
+
+    See extrema for the method.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        amplitudes (ndarray(float)): Amplitude of each constituent (K), or of each constituent for each of N
+            models (N x K).
+        phases (ndarray(float)): Phase (degrees) of each constituent, same shape as amplitudes.
+        start (datetime64): Start of the period (datetime, date or datetime64).
+        hours (float): Length of the period in hours (the end is excluded).
+        step (float, optional): Spacing in hours of the derivative samples bracketing the extrema, defaults to 0.5;
+            it must be shorter than the shortest interval between a high and a low water.
+        tol (float, optional): Tolerance in hours of the extrema times, defaults to 1e-6.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES, defaults to
+            config['nodal_policy'].
+        max_bytes (int, optional): Memory budget of the intermediate arrays of the sampling, defaults to 64 MiB.
+
+    Returns:
+        A tuple of ndarrays of the datetime64[ns] times, heights, high water flags (False for low waters) and model
+            indices (all 0 for a single model) of the extrema, ordered by model and time.
+
+    """
+    times = time_range(start, hours + step, step)
+    arguments = _Arguments(constituents, times, nodal_interval, nodal_policy)
+    return extrema(arguments, np.asarray(amplitudes, dtype=float), d2r * np.asarray(phases, dtype=float), times,
+        hours, tol, max_bytes)
+
+
+def extrema(arguments, amplitudes, phases, times, hours, tol=TOLERANCE, max_bytes=BASIS_BYTES,
+        anchor_interval=ANCHOR_INTERVAL):
+    """Find the extrema of harmonic models from their derivative sampled at uniformly spaced times.
+
+    The time derivative of the water level, h'(t) = -sum_k A_k f_k speed_k sin(V_k(t) + u_k - g_k), is itself a
+    harmonic sum of amplitudes A_k speed_k and phases g_k - 90 degrees, so it is sampled with the reconstruction
+    engine (including its uniform time step fast path), as is the second derivative h''. Every sign change of the
+    samples brackets one extremum, which is first estimated from the cubic Hermite interpolant of h' in the bracket
+    (without any further trigonometry) and refined with Newton steps on h'/h'' (falling back to bisection when a
+    step leaves the bracket), all brackets of all models at once. Newton converging quadratically, a step s leaves
+    an error of about s^2 |h'''/2h''|, and refinement stops once that estimate is below tol: most extrema take a
+    single evaluation of their constituents, from which their heights are extrapolated to second order (with numba
+    installed, the extrema are refined one by one in parallel by kernels.refine, with the same steps). The
+    equilibrium arguments and node factors are those of the samples, so the extrema are those of the reconstruction
+    of the same period.
+
+    Args:
+        arguments (_Arguments): Equilibrium arguments of the samples, uniformly spaced from the start of the period.
+        amplitudes (ndarray(float)): Amplitudes (K) or (N x K).
+        phases (ndarray(float)): Phases (radians), same shape as amplitudes.
+        times (ndarray(datetime64)): datetime64[ns] times of the samples.
+        hours (float): Length of the period in hours; extrema from its end on are dropped.
+        tol (float, optional): Tolerance in hours of the extrema times, defaults to 1e-6.
+        max_bytes (int, optional): Memory budget of the intermediate arrays of the sampling, defaults to 64 MiB.
+        anchor_interval (int, optional): Anchor interval of the uniform time step fast path, defaults to 256.
+
+    Returns:
+        A tuple of ndarrays of the datetime64[ns] times, heights, high water flags and model indices of the
+            extrema, ordered by model and time.
+
+    """
+    amplitudes = np.atleast_2d(amplitudes)
+    phases = np.atleast_2d(phases)
+    T = arguments.days.size
+    if T < 2 or not len(arguments.constituents):
+        return np.array([], dtype='datetime64[ns]'), np.array([]), np.array([], dtype=bool), np.array([], dtype=int)
+    speed = arguments.speed
+    d = _evaluate(arguments, amplitudes * speed, phases - np.pi / 2., times, max_bytes, anchor_interval)
+    dd = _evaluate(arguments, amplitudes * speed**2, phases - np.pi, times, max_bytes, anchor_interval)
+
+    # a high water follows a positive derivative sample and a low water a negative one
+    rising, falling = d[:-1] > 0., d[:-1] < 0.
+    left, model = np.nonzero(rising & (d[1:] <= 0.) | falling & (d[1:] >= 0.))
+    highs = rising[left, model]
+
+    lo, hi = arguments.hours[left], arguments.hours[left + 1]
+    d_lo = d[left, model]
+    x = _hermite_root(lo, hi, d_lo, d[left + 1, model], dd[left, model], dd[left + 1, model])
+
+    # coefficients A f and phase offsets V0 + u - g of the node factors at the left side of every bracket
+    if arguments.f is None:
+        f, u = nodal.default_table().lookup(arguments.constituents, arguments.days[left], True, arguments.multipliers)
+        phase0 = arguments.V0 + d2r * u
+    else:
+        partition = np.empty(T, dtype=np.int64)
+        for p, (index, _) in enumerate(arguments.partitions):
+            partition[index] = p
+        f = arguments.f[partition[left]]
+        phase0 = arguments.phase0[partition[left]]
+    coefficients = amplitudes[model] * f
+    phase0 = phase0 - phases[model]
+    if kernels.enabled():
+        heights = kernels.refine(x, lo, hi, d_lo, coefficients, phase0, speed, tol, MAX_ITERATIONS)
+        return _sorted(times, hours, x, heights, highs, model)
+    heights = np.empty(x.size)
+    active = np.arange(x.size)
+    for _ in range(MAX_ITERATIONS):
+        if not active.size:
+            break
+        xa = x[active]
+        arg = np.multiply.outer(xa, speed)
+        arg += phase0[active]
+        c = coefficients[active]
+        cos = np.cos(arg)
+        h = np.einsum('ij,ij->i', c, cos)
+        c = c * speed
+        sin = np.sin(arg, out=arg)
+        d1 = -np.einsum('ij,ij->i', c, sin)
+        c *= speed
+        d2 = -np.einsum('ij,ij->i', c, cos)
+        c *= speed
+        d3 = np.einsum('ij,ij->i', c, sin)
+        # shrink the bracket to the side of the root
+        same = np.sign(d1) == np.sign(d_lo[active])
+        lo[active] = np.where(same, xa, lo[active])
+        hi[active] = np.where(same, hi[active], xa)
+        d_lo[active] = np.where(same, d1, d_lo[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xn = xa - d1 / d2
+        inside = (xn > lo[active]) & (xn < hi[active])
+        xn = np.where(inside, xn, 0.5 * (lo[active] + hi[active]))
+        x[active] = xn
+        step = xn - xa
+        heights[active] = h + step * (d1 + 0.5 * step * d2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            done = np.where(inside, step * step * np.abs(0.5 * d3 / d2) <= tol, np.abs(step) <= tol)
+        active = active[~done]
+    return _sorted(times, hours, x, heights, highs, model)
+
+
+def _sorted(times, hours, x, heights, highs, model):
+    """Return the extrema within the period ordered by model and time, with their hours converted to times."""
+    keep = (x >= 0.) & (x < hours)
+    order = np.lexsort((x[keep], model[keep]))
+    extrema_times = times[0] + np.rint(x[keep][order] * 3600e9).astype(np.int64).astype('timedelta64[ns]')
+    return extrema_times, heights[keep][order], highs[keep][order], model[keep][order]
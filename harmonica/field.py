@@ -0,0 +1,178 @@
+from .astronomy import datetime64
+from .cache import default_tile_cache
+from .nodal import NODAL_INTERVAL
+from .planner import ReadPlan, chunk_shape
+from .reconstruction import _cached_basis, _float_dtype, harmonic_basis
+from .resource import ResourceManager
+from .tidal_constituents import Constituents
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+# Default number of times of the chunks of a field
+TIME_CHUNK = 24
+
+
+class FieldGrid(object):
+    """Harmonic constants of the model grid nodes within a bounding box, read on demand block by block.
+
+    The nodes are those of the finest grid of the requested constituents; constituents of coarser grids (e.g. the
+    separate files of tpxo8) are bilinearly interpolated at these nodes. Blocks are read through the shared tile
+    cache, so neighbouring blocks and successive time chunks do not read the model files again.
+    """
+
+    def __init__(self, bbox, model=ResourceManager.DEFAULT_RESOURCE, cons=[], level=0, dtype=float):
+        """Locate the grid nodes of a bounding box.
+
+        Args:
+            bbox (tuple(float, float, float, float)): South, west, north and east bounds of the box; latitudes in
+                [-90, 90] and longitudes in [-180 180] or [0 360]. A box whose west bound is east of its east bound
+                crosses the antimeridian (or the prime meridian for [0 360] longitudes). The longitudes of the nodes
+                are in [-180 180] if either bound is negative and in [0 360] otherwise.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+                or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+            dtype (type, optional): Precision of the coefficients, float64 (the default) or float32.
+
+        """
+        south, west, north, east = (float(b) for b in bbox)
+        self.dtype = _float_dtype(dtype)
+        self.resources = ResourceManager(model=Constituents._model_name(model))
+        if cons is None or not len(cons):
+            cons = self.resources.available_constituents()
+        self.layers = []
+        for d in self.resources.get_datasets(cons, level):
+            nc_names = Constituents._prepare_dataset(d)
+            for c in sorted(set(cons) & set(nc_names)):
+                con = nc_names.index(c)
+                self.layers.append((d, con, self.resources.constituent_path(c, level), c,
+                    d.lat_z.values[con], d.lon_z.values[con]))
+        self.constituents = [layer[3] for layer in self.layers]
+        if not self.layers:
+            raise ValueError('No constituent of the model was requested.')
+
+        # nodes of the finest grid within the box
+        finest = min(self.layers, key=lambda layer: np.mean(np.diff(layer[5])))
+        self.lat_grid, self.lon_grid = finest[4], finest[5]
+        self.tile_shape = chunk_shape(finest[0].hRe)
+        self.y = np.flatnonzero((self.lat_grid >= south) & (self.lat_grid <= north))
+        w, e = west % 360., east % 360.
+        if east - west >= 360.:
+            self.x = np.arange(self.lon_grid.size)
+        elif w <= e:
+            self.x = np.flatnonzero((self.lon_grid >= w) & (self.lon_grid <= e))
+        else:
+            self.x = np.r_[np.flatnonzero(self.lon_grid >= w), np.flatnonzero(self.lon_grid <= e)]
+        self.lat = self.lat_grid[self.y]
+        self.lon = self.lon_grid[self.x]
+        if west < 0 or east < 0:
+            # report longitudes in the convention of the box
+            self.lon = np.where(self.lon > 180., self.lon - 360., self.lon)
+
+
+    def coefficients(self, y, x):
+        """Read the basis coefficients [A cos(g), A sin(g)] (see reconstruction.harmonic_coefficients) of a block.
+
+        Args:
+            y (ndarray(int)): Increasing positions of the block rows among the latitudes of the box.
+            x (ndarray(int)): Increasing positions of the block columns among the longitudes of the box.
+
+        Returns:
+            An ndarray (rows x columns x 2K) of the coefficients.
+
+        """
+        K = len(self.constituents)
+        coefficients = np.empty((y.size, x.size, 2 * K), dtype=self.dtype)
+        nodes = None
+        for k, (d, con, path, c, lat_grid, lon_grid) in enumerate(self.layers):
+            if lat_grid is self.lat_grid or (np.array_equal(lat_grid, self.lat_grid) and
+                    np.array_equal(lon_grid, self.lon_grid)):
+                re = self._read(d.hRe, (path, c, 'hRe'), con, self.x[x], self.y[y]).T
+                im = self._read(d.hIm, (path, c, 'hIm'), con, self.x[x], self.y[y]).T
+            else:
+                if nodes is None:
+                    lat, lon = np.meshgrid(self.lat_grid[self.y[y]], self.lon_grid[self.x[x]], indexing='ij')
+                    nodes = (lat.ravel(), lon.ravel())
+                plan = ReadPlan(nodes[0], nodes[1], lat_grid, lon_grid, tile_shape=chunk_shape(d.hRe))
+                cache = default_tile_cache()
+                re = plan.interpolate(d.hRe, (con,), cache, (path, c, 'hRe'), self.dtype).reshape((y.size, x.size))
+                im = plan.interpolate(d.hIm, (con,), cache, (path, c, 'hIm'), self.dtype).reshape((y.size, x.size))
+            # the tide is hRe - i hIm, as in Constituents
+            coefficients[:, :, k] = re
+            coefficients[:, :, K + k] = -im
+        coefficients *= self.resources.get_units_multiplier()
+        return coefficients
+
+
+    def _read(self, var, key, con, xs, ys):
+        """Read the (x, y) values of grid indices (runs of consecutive x, consecutive y) of a constituent grid."""
+        cache = default_tile_cache()
+        ys = np.s_[ys[0]:ys[-1] + 1]
+        blocks = []
+        for run in np.split(xs, np.flatnonzero(np.diff(xs) != 1) + 1):
+            run = np.s_[run[0]:run[-1] + 1]
+            if cache is not None:
+                blocks.append(cache.block(var, key, (con,), run, ys, self.tile_shape))
+            else:
+                blocks.append(np.asarray(var[con, run, ys]))
+        return np.concatenate(blocks, axis=0)
+
+
+def tide_field(bbox, times, model=ResourceManager.DEFAULT_RESOURCE, cons=[], level=0, chunks=None,
+        nodal_interval=NODAL_INTERVAL, nodal_policy=None, dtype=float):
+    """Predict the water level field of a bounding box at a series of times, as a lazily evaluated array.
+
+    The field is a dask-backed xarray.DataArray of dimensions (time, lat, lon) on the model grid nodes of the box
+    (see FieldGrid). Every chunk is evaluated on demand as the product of the cos/sin basis of its times with the
+    coefficients of its nodes, read from the model files when it is computed, so fields of any size can be written
+    incrementally (e.g. with to_netcdf or to_zarr) or reduced without ever being held in memory. The equilibrium
+    arguments and node factors of each time chunk are evaluated from its first time, as in
+    reconstruction.reconstruct_stream; the basis of a time chunk is shared by its spatial chunks through the basis
+    cache. A float32 dtype halves the size of the chunks, bases and written fields; the phases of the basis are
+    evaluated in float64 either way.
+
+    Example:
+        field = tide_field((35., -77., 40., -70.), reconstruction.time_range('2020-01-01', 48.), model='tpxo9')
+        field.to_netcdf('field.nc')
+
+    Args:
+        bbox (tuple(float, float, float, float)): South, west, north and east bounds of the box; latitudes in
+            [-90, 90] and longitudes in [-180 180] or [0 360].
+        times (ndarray(datetime64)): Times of the field, as datetime64 values, int64 nanoseconds since the Unix epoch
+            or datetime objects.
+        model (str, optional): Model name, defaults to 'tpxo9'.
+        cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+        level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+            or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+        chunks (tuple(int, int, int), optional): Chunk sizes along (time, lat, lon), defaults to 24 times and the
+            storage chunks of the model grid.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES, defaults to
+            config['nodal_policy'].
+        dtype (type, optional): Precision of the field, float64 (the default) or float32.
+
+    Returns:
+        An xarray.DataArray named water_level of shape (time, lat, lon).
+
+    """
+    grid = FieldGrid(bbox, model, cons, level, dtype)
+    dtype = grid.dtype
+    times = datetime64(times).ravel()
+    chunks = chunks or (TIME_CHUNK, grid.tile_shape[1], grid.tile_shape[0])
+    constituents = grid.constituents
+
+    def evaluate(times, y, x):
+        basis = _cached_basis(constituents, times, nodal_interval, nodal_policy, dtype)
+        if basis is None:
+            basis = harmonic_basis(constituents, times, nodal_interval, nodal_policy, dtype)
+        coefficients = grid.coefficients(y, x)
+        return (basis @ coefficients.reshape((-1, basis.shape[1])).T).reshape((times.size, y.size, x.size))
+
+    data = da.blockwise(evaluate, 'tyx',
+        da.from_array(times, chunks=chunks[0]), 't',
+        da.arange(grid.lat.size, chunks=chunks[1]), 'y',
+        da.arange(grid.lon.size, chunks=chunks[2]), 'x',
+        dtype=dtype, meta=np.empty((0, 0, 0), dtype=dtype))
+    return xr.DataArray(data, dims=('time', 'lat', 'lon'), coords={'time': times, 'lat': grid.lat, 'lon': grid.lon},
+        name='water_level', attrs={'units': 'm', 'model': grid.resources.model})
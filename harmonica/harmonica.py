@@ -1,6 +1,7 @@
+from . import astronomy, datums, detide, ensemble, extrema, parallel, reconstruction, series, track
+from .predictor import TidePredictor
 from .tidal_constituents import Constituents
 from .resource import ResourceManager
-from pytides.astro import astro
 from pytides.tide import Tide as pyTide
 import pytides.constituent as pycons
 from datetime import datetime
@@ -30,52 +31,314 @@ class Tide:
         #   date_times (year, month, day, hour, minute, second; UTC/GMT)
         self.data = pd.DataFrame(columns=['datetimes', 'water_level'])
         self.constituents = Constituents()
+        self.predictor = None
 
 
     def reconstruct_tide(self, loc, times, model=ResourceManager.DEFAULT_RESOURCE,
-            cons=[], positive_ph=False, offset=None):
+            cons=[], positive_ph=False, offset=None, workers=None, dtype=float, lazy=False):
         """Rescontruct a tide signal water levels at the given location and times
 
         Args:
             loc (tuple(float, float)): latitude [-90, 90] and longitude [-180 180] or [0 360] of the requested point.
-            times (ndarray(datetime)): Array of datetime objects associated with each water level data point.
+            times (ndarray(datetime64)): Times associated with each water level data point, as datetime64 values,
+                int64 nanoseconds since the Unix epoch or datetime objects.
             model (str, optional): Model name, defaults to 'tpxo8'.
             cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
             positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
                 [-180 180] (False, the default).
             offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            workers (int, optional): If not None, number of processes predicting partitions of the times in parallel
+                (0 for one per processor), see parallel.predict_parallel. Defaults to None (serial prediction).
+            dtype (type, optional): Precision of the water levels, float64 (the default) or float32 (see
+                reconstruction.reconstruct).
+            lazy (bool, optional): If True, return a series.TideSeries of the times evaluating the water levels on
+                demand instead of reconstructing them all into data. Defaults to False.
+
+        Returns:
+            The tide itself, whose data holds the datetimes and water_level, or a TideSeries if lazy is True.
 
         """
 
         # get constituent information
         self.constituents.get_components(loc, model, cons, positive_ph)
 
-        ncons = len(self.constituents.data) + (1 if offset is not None else 0)
-        tide_model = np.zeros(ncons, dtype=pyTide.dtype)
-        # load specified model constituent components into pytides model object
-        for i, key in enumerate(self.constituents.data.index.values):
-            tide_model[i]['constituent'] = eval('pycons._{}'.format(self.PYTIDES_CON_MAPPER.get(key, key)))
-            tide_model[i]['amplitude'] = self.constituents.data.loc[key].amplitude
-            tide_model[i]['phase'] = self.constituents.data.loc[key].phase
-        # if an offset is provided then add as spoofed constituent Z0
-        if offset is not None:
-            tide_model[-1]['constituent'] = pycons._Z0
-            tide_model[-1]['amplitude'] = 0.
-            tide_model[-1]['phase'] = offset
+        # compile the constituents (if an offset is provided then add as spoofed constituent Z0)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset, dtype=dtype)
+        if lazy:
+            return series.TideSeries(self.predictor, times)
 
         # reconstruct the tides, store in self
-        self.data['datetimes'] = pd.Series(times)
-        self.data['water_level'] = pd.Series(pyTide(model=tide_model, radians=False).at(times), index=self.data.index)
+        times = reconstruction.datetime64(times)
+        self.data = pd.DataFrame({
+            'datetimes': times,
+            'water_level': self._predict(times, workers),
+        }, columns=['datetimes', 'water_level'])
 
         return self
 
 
+    def reconstruct_tide_stream(self, loc, start, hours, step=1., model=ResourceManager.DEFAULT_RESOURCE, cons=[],
+            positive_ph=False, offset=None, chunk_hours=10 * reconstruction.NODAL_INTERVAL, dtype=float):
+        """Generate the tide signal water levels at the given location in fixed-size chunks of time
+
+        Only one chunk is held in memory at a time, so arbitrarily long series can be written out as they are produced.
+        The equilibrium arguments and node factors are refreshed for every chunk.
+
+        Args:
+            loc (tuple(float, float)): latitude [-90, 90] and longitude [-180 180] or [0 360] of the requested point.
+            start (datetime64): First time of the series (datetime, date or datetime64).
+            hours (float): Length of the series in hours.
+            step (float, optional): Time step in hours, defaults to 1.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            chunk_hours (float, optional): Hours spanned by each chunk, defaults to 2400.
+            dtype (type, optional): Precision of the water levels, float64 (the default) or float32 (see
+                reconstruction.reconstruct).
+
+        Yields:
+            A dataframe of the datetimes and water_level of each chunk.
+
+        """
+        self.constituents.get_components(loc, model, cons, positive_ph)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset)
+        p = self.predictor
+
+        for times, water_level in reconstruction.reconstruct_stream(p.constituents, p.amplitudes, p.phases, start,
+                hours, step, chunk_hours, dtype=dtype):
+            yield pd.DataFrame({'datetimes': times, 'water_level': water_level}, columns=['datetimes', 'water_level'])
+
+
+    def detide_stream(self, signal, loc=None, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False,
+            offset=None, columns=(0, 1), datetime_format=None, sep=',', header=0, chunk_rows=detide.CHUNK_ROWS):
+        """Generate the non-tidal residuals (observed minus predicted water levels) of an observation file in chunks
+
+        The observations are read in chunks and every chunk is predicted at exactly its own times, so arbitrarily long
+        records are detided in constant memory. The constituents are extracted from the model at loc or, if loc is
+        None, are those already held by the tide (e.g. from deconstruct_tide or read from a constituents file).
+
+        Args:
+            signal (str or file): Path or buffer of the observation file (CSV formatted).
+            loc (tuple(float, float), optional): latitude [-90, 90] and longitude [-180 180] or [0 360] of the
+                observations, defaults to None (use the current constituents).
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            columns (list, optional): Names or positions of the columns of the times and water levels; the last column
+                holds the water levels and the others are parsed as the times. Defaults to the first two columns.
+            datetime_format (str, optional): strftime format of the times, defaults to None (inferred).
+            sep (str, optional): Field delimiter of the observation file, defaults to ','.
+            header (int, optional): Row number of the column names, None if the file has none. Defaults to 0.
+            chunk_rows (int, optional): Number of observations per chunk, defaults to 131072.
+
+        Yields:
+            A dataframe of the datetimes, observed and predicted water levels and residual of each chunk.
+
+        """
+        if loc is not None:
+            self.constituents.get_components(loc, model, cons, positive_ph)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset)
+
+        chunks = detide.read_signal(signal, columns, datetime_format, sep, header, chunk_rows)
+        for residuals in detide.detide_stream(self.predictor, chunks):
+            yield residuals
+
+
+    def reconstruct_batch_tide(self, locs, times, model=ResourceManager.DEFAULT_RESOURCE, cons=[],
+            positive_ph=False, offset=None, max_bytes=reconstruction.BASIS_BYTES, workers=None, dtype=float):
+        """Reconstruct the tide signal water levels of a batch of locations at shared times
+
+        The constants of all locations are extracted at once and the water levels are evaluated as a single matrix
+        product of a shared cos/sin basis with the constants of every location, chunked over time. With
+        dtype=float32 the constants, the basis and the water levels are float32, which halves the memory and the
+        memory traffic of large batches.
+
+        Args:
+            locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+                [0 360] of the requested points.
+            times (ndarray(datetime64)): Times associated with each water level data point, as datetime64 values,
+                int64 nanoseconds since the Unix epoch or datetime objects.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            max_bytes (int, optional): Memory budget of the intermediate reconstruction arrays, defaults to 64 MiB.
+            workers (int, optional): If not None, number of processes predicting partitions of the times in parallel
+                (0 for one per processor), see parallel.predict_parallel. Defaults to None (serial prediction).
+            dtype (type, optional): Precision of the constants and the water levels, float64 (the default) or
+                float32.
+
+        Returns:
+            The tide itself, whose data holds the datetimes and one water level column per point (position in locs).
+
+        """
+        self.constituents.get_batch_components(locs, model, cons, positive_ph, dtype=dtype)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset, max_bytes=max_bytes, dtype=dtype)
+
+        times = reconstruction.datetime64(times)
+        water_levels = self._predict(times, workers)
+        self.data = pd.DataFrame(water_levels, columns=range(water_levels.shape[1]))
+        self.data.insert(0, 'datetimes', times)
+
+        return self
+
+
+    def reconstruct_ensemble_tide(self, loc, times, models=ensemble.MODELS, cons=[], positive_ph=False, offset=None,
+            workers=None):
+        """Reconstruct the tide signal water levels of several tide models at a location, with their ensemble statistics
+
+        The constants of the models are extracted concurrently and all the models are evaluated at once on the union of
+        their constituents, sharing the astronomical arguments and node factors of the times (see ensemble).
+
+        Args:
+            loc (tuple(float, float)): latitude [-90, 90] and longitude [-180 180] or [0 360] of the requested point.
+            times (ndarray(datetime64)): Times associated with each water level data point, as datetime64 values,
+                int64 nanoseconds since the Unix epoch or datetime objects.
+            models (list(str), optional): Model names, defaults to tpxo7, tpxo8 and tpxo9.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents of each model if
+                None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            workers (int, optional): If not None, number of processes predicting partitions of the times in parallel
+                (0 for one per processor), see parallel.predict_parallel. Defaults to None (serial prediction).
+
+        Returns:
+            The tide itself, whose data holds the datetimes, one water level column per model, and the ensemble mean
+                and spread (standard deviation across the models).
+
+        """
+        models = list(models)
+        constituents = ensemble.extract([loc], models, cons, positive_ph)
+        self.predictor = ensemble.ensemble_predictor(constituents, offset)
+
+        times = reconstruction.datetime64(times)
+        water_levels = self._predict(times, workers)
+        mean, spread = ensemble.ensemble_stats(water_levels[:, :, np.newaxis])
+        self.data = pd.DataFrame(water_levels, columns=models)
+        self.data.insert(0, 'datetimes', times)
+        self.data['mean'] = mean[:, 0]
+        self.data['spread'] = spread[:, 0]
+
+        return self
+
+
+    def reconstruct_track_tide(self, lat, lon, times, model=ResourceManager.DEFAULT_RESOURCE, cons=[], level=0,
+            dtype=float):
+        """Reconstruct the tide signal water levels along a track, where every sample has its own location and time
+
+        The constants of the model grid cells touched by the track are read once and interpolated along the track
+        while the water levels are evaluated (e.g. altimetry, ship or glider tracks).
+
+        Args:
+            lat (ndarray(float)): Latitude [-90, 90] of each sample.
+            lon (ndarray(float)): Longitude [-180 180] or [0 360] of each sample.
+            times (ndarray(datetime64)): Time of each sample, as datetime64 values, int64 nanoseconds since the Unix
+                epoch or datetime objects.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+                or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+            dtype (type, optional): Precision of the constants and the water levels, float64 (the default) or
+                float32.
+
+        Returns:
+            The tide itself, whose data holds the datetimes, lat, lon and water_level of each sample.
+
+        """
+        constants = track.TrackConstants.extract(lat, lon, model, cons, level, dtype)
+        times = reconstruction.datetime64(times).ravel()
+        self.data = pd.DataFrame({
+            'datetimes': times,
+            'lat': np.asarray(lat, dtype=float).ravel(),
+            'lon': np.asarray(lon, dtype=float).ravel(),
+            'water_level': track.reconstruct_track(constants, times),
+        }, columns=['datetimes', 'lat', 'lon', 'water_level'])
+
+        return self
+
+
+    def high_low_tide(self, loc, start, hours, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False,
+            offset=None, step=extrema.COARSE_STEP):
+        """Find the high and low waters at the given location over a period of time
+
+        The extrema are located from the analytic time derivative of the tide signal, without sampling it densely.
+
+        Args:
+            loc (tuple(float, float)): latitude [-90, 90] and longitude [-180 180] or [0 360] of the requested point.
+            start (datetime64): Start of the period (datetime, date or datetime64).
+            hours (float): Length of the period in hours.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            step (float, optional): Spacing in hours of the samples bracketing the extrema, defaults to 0.5.
+
+        Returns:
+            The tide itself, whose data holds the datetimes, water_level and type ('high' or 'low') of each extremum.
+
+        """
+        self.constituents.get_components(loc, model, cons, positive_ph)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset)
+
+        times, water_level, highs, _ = self.predictor.high_low(start, hours, step)
+        self.data = pd.DataFrame({
+            'datetimes': times,
+            'water_level': water_level,
+            'type': np.where(highs, 'high', 'low'),
+        }, columns=['datetimes', 'water_level', 'type'])
+
+        return self
+
+
+    def tidal_datums(self, locs, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False, offset=None,
+            start=datums.NTDE_START, end=datums.NTDE_END):
+        """Compute the tidal datums of a batch of locations over a tidal datum epoch
+
+        Args:
+            locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+                [0 360] of the requested points.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            start (datetime64, optional): Start of the epoch, defaults to 1983-01-01 (National Tidal Datum Epoch).
+            end (datetime64, optional): End of the epoch (excluded), defaults to 2002-01-01.
+
+        Returns:
+            The tide itself, whose data holds one row per point (position in locs) of its MHHW, MHW, MTL, MLW and
+                MLLW.
+
+        """
+        self.constituents.get_batch_components(locs, model, cons, positive_ph)
+        self.predictor = TidePredictor.from_constituents(self.constituents, offset)
+
+        self.data = pd.DataFrame(datums.tidal_datums(self.predictor, start, end), columns=list(datums.DATUMS))
+
+        return self
+
+
+    def _predict(self, times, workers=None):
+        """Predict the water levels of the compiled predictor, serially or on a pool of processes."""
+        if workers is None:
+            return self.predictor.predict(times)
+        return parallel.predict_parallel(self.predictor, times, workers or None)
+
+
     def deconstruct_tide(self, water_level, times, cons=[], n_period=6, positive_ph=False):
         """Method to use pytides to deconstruct the tides and reorganize results back into the class structure.
 
         Args:
             water_level (ndarray(float)): Array of water levels.
-            times (ndarray(datetime)): Array of datetime objects associated with each water level data point.
+            times (ndarray(datetime64)): Times associated with each water level data point, as datetime64 values,
+                int64 nanoseconds since the Unix epoch or datetime objects.
             cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
             n_period(int): Number of periods a constituent must complete during times to be considered in analysis.
             positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
@@ -91,8 +354,11 @@ class Tide:
         else:
             cons = [eval('pycons._{}'.format(self.PYTIDES_CON_MAPPER.get(c, c))) for c in cons
                 if c in self.constituents.NOAA_SPEEDS]
-        self.model_to_dataframe(pyTide.decompose(water_level, times, constituents=cons, n_period=n_period),
-            times[0], positive_ph=positive_ph)
+        # pytides accepts hours since a single datetime, avoiding one datetime object per sample
+        hours, t0 = reconstruction.hours_since(times)
+        t0 = pd.Timestamp(t0).to_pydatetime()
+        self.model_to_dataframe(pyTide.decompose(np.asarray(water_level, dtype=float), hours, t0=t0,
+            constituents=cons, n_period=n_period), t0, positive_ph=positive_ph)
         return self
 
 
@@ -110,14 +376,14 @@ class Tide:
             A dataframe of constituents information in Constituents class
 
         """
-        # helper function to extract constituent information from Tide model
-        def extractor(c):
-            # info: name, amplitude, phase, speed
-            return (c[0].name.upper(), c[1], c[2], c[0].speed(astro(t0)))
-        # create a filtered array of constituent information
-        cons = np.asarray(np.vectorize(extractor)(tide.model[tide.model['constituent'] != pycons._Z0])).T
-        # convert into dataframe
-        df = pd.DataFrame(cons[:,1:], index=cons[:,0], columns=['amplitude', 'phase', 'speed'], dtype=float)
+        # filter out the mean water level and evaluate the speeds of all constituents at once
+        model = tide.model[tide.model['constituent'] != pycons._Z0]
+        names = [c.name.upper() for c in model['constituent']]
+        df = pd.DataFrame({
+            'amplitude': model['amplitude'].astype(float),
+            'phase': model['phase'].astype(float),
+            'speed': astronomy.speeds(names, t0),
+        }, index=names, columns=['amplitude', 'phase', 'speed'])
         self.constituents.data = pd.concat([self.constituents.data, df], axis=0, join='inner')
         # convert phase if necessary
         if not positive_ph:
@@ -0,0 +1,268 @@
+from harmonica import config
+import threading
+import time
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def enabled():
+    """Return whether the compiled kernels are used: numba is installed, config['numba'] is not False and the caller
+    is the main thread.
+
+    Other threads (e.g. the workers of dask or of a ThreadPoolExecutor) evaluate the NumPy expressions instead: with
+    numba's default (TBB) threading layer, a process that launched a parallel kernel from another thread hangs at
+    exit, and the workqueue layer aborts on concurrent launches. Such threads already run in parallel anyway.
+    """
+    return numba is not None and config.get('numba', True) and threading.current_thread() is threading.main_thread()
+
+
+if numba is not None:
+    _jit = numba.njit(parallel=True, cache=True, error_model='numpy')
+
+    @_jit
+    def _harmonic_sum(arg, phases, f, weights, out):
+        K = arg.shape[1]
+        for i in numba.prange(arg.shape[0]):
+            fi = np.int64(i) if f.shape[0] > 1 else np.int64(0)
+            h = 0.
+            for k in range(K):
+                h += weights[k] * f[fi, k] * np.cos(arg[i, k] - phases[k])
+            out[i] = h
+
+    @_jit
+    def _cos_sin(arg, f, out):
+        K = arg.shape[1]
+        for i in numba.prange(arg.shape[0]):
+            fi = np.int64(i) if f.shape[0] > 1 else np.int64(0)
+            for k in range(K):
+                out[i, k] = f[fi, k] * np.cos(arg[i, k])
+                out[i, K + k] = f[fi, k] * np.sin(arg[i, k])
+
+    @_jit
+    def _track_sum(arg, f, coefficients, out):
+        K = arg.shape[1]
+        for i in numba.prange(arg.shape[0]):
+            fi = np.int64(i) if f.shape[0] > 1 else np.int64(0)
+            h = 0.
+            for k in range(K):
+                h += f[fi, k] * (coefficients[i, k] * np.cos(arg[i, k]) + coefficients[i, K + k] * np.sin(arg[i, k]))
+            out[i] = h
+
+    @_jit
+    def _bilinear(values, weights, out):
+        for i in numba.prange(values.shape[0]):
+            out[i] = (values[i, 0, 0] * weights[i, 0, 0] + values[i, 0, 1] * weights[i, 0, 1] +
+                values[i, 1, 0] * weights[i, 1, 0] + values[i, 1, 1] * weights[i, 1, 1])
+
+    @_jit
+    def _stencil_interpolate(weights, stencils, cells, out):
+        for i in numba.prange(cells.shape[0]):
+            c = cells[i]
+            for j in range(stencils.shape[2]):
+                out[i, j] = (weights[i, 0] * stencils[c, 0, j] + weights[i, 1] * stencils[c, 1, j] +
+                    weights[i, 2] * stencils[c, 2, j] + weights[i, 3] * stencils[c, 3, j])
+
+    @_jit
+    def _refine(x, lo, hi, d_lo, coefficients, phase0, speed, tol, max_iterations, heights):
+        K = speed.size
+        for r in numba.prange(x.size):
+            xa, left, right, dl = x[r], lo[r], hi[r], d_lo[r]
+            for _ in range(max_iterations):
+                h = d1 = d2 = d3 = 0.
+                for k in range(K):
+                    a = xa * speed[k] + phase0[r, k]
+                    cos, sin = np.cos(a), np.sin(a)
+                    c = coefficients[r, k]
+                    h += c * cos
+                    c = c * speed[k]
+                    d1 -= c * sin
+                    c = c * speed[k]
+                    d2 -= c * cos
+                    c = c * speed[k]
+                    d3 += c * sin
+                # shrink the bracket to the side of the root
+                if np.sign(d1) == np.sign(dl):
+                    left, dl = xa, d1
+                else:
+                    right = xa
+                xn = xa - d1 / d2
+                inside = xn > left and xn < right
+                if not inside:
+                    xn = 0.5 * (left + right)
+                step = xn - xa
+                heights[r] = h + step * (d1 + 0.5 * step * d2)
+                xa = xn
+                if inside:
+                    done = step * step * np.abs(0.5 * d3 / d2) <= tol
+                else:
+                    done = np.abs(step) <= tol
+                if done:
+                    break
+            x[r] = xa
+
+
+def _factors(f):
+    """Return node factors (K) or (rows x K) as a 2-D array of one row per time, or a single row for all times."""
+    return np.ascontiguousarray(np.atleast_2d(f), dtype=float)
+
+
+def harmonic_sum(arg, phases, f, weights, out):
+    """Evaluate out = sum_k weights_k f_k cos(arg_k - phases_k) of every row of the phases arg (rows x K).
+
+    The node factors f are (K) for all rows or (rows x K); out is an array of one value per row.
+    """
+    _harmonic_sum(arg, np.ascontiguousarray(phases, dtype=float), _factors(f),
+        np.ascontiguousarray(weights, dtype=float), out)
+    return out
+
+
+def cos_sin(arg, f, out):
+    """Fill the (rows x 2K) basis out with [f cos(arg), f sin(arg)] of the phases arg (rows x K), f = 1 if None."""
+    _cos_sin(arg, _factors(f) if f is not None else np.ones((1, arg.shape[1])), out)
+    return out
+
+
+def track_sum(arg, f, coefficients, out):
+    """Evaluate out = sum_k f_k (a_k cos(arg_k) + b_k sin(arg_k)) of every row, for coefficients (rows x 2K) [a, b]."""
+    _track_sum(arg, _factors(f), np.ascontiguousarray(coefficients), out)
+    return out
+
+
+def bilinear(values, weights, out):
+    """Fill out with the sums of the (rows x 2 x 2) stencil values weighted by the (rows x 2 x 2) weights."""
+    _bilinear(np.ascontiguousarray(values), np.ascontiguousarray(weights), out)
+    return out
+
+
+def stencil_interpolate(weights, stencils, cells, out):
+    """Fill out (rows x M) with the sums of the (4 x M) stencils of the cells of the rows weighted by (rows x 4)."""
+    _stencil_interpolate(np.ascontiguousarray(weights), np.ascontiguousarray(stencils),
+        np.ascontiguousarray(cells, dtype=np.int64), out)
+    return out
+
+
+def refine(x, lo, hi, d_lo, coefficients, phase0, speed, tol, max_iterations):
+    """Refine brackets of extrema with safeguarded Newton steps, see extrema.extrema.
+
+    Every root is refined independently (and in parallel) with the same steps and stopping criterion as the NumPy
+    implementation; x is updated in place.
+
+    Returns:
+        An ndarray of the heights at the refined roots.
+
+    """
+    heights = np.empty(x.size)
+    _refine(x, lo, hi, d_lo, np.ascontiguousarray(coefficients), np.ascontiguousarray(phase0),
+        np.ascontiguousarray(speed, dtype=float), float(tol), int(max_iterations), heights)
+    return heights
+
+
+def _timed(function, repeat):
+    """Return the result and the best time in seconds of repeated calls of a function."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def benchmark(repeat=3, times=2**20, locations=256, roots=2**16, constituents=37):
+    """Compare the compiled kernels with the NumPy implementation on random inputs.
+
+    Every kernel is checked against its NumPy equivalent (the maximum absolute difference is reported, relative to
+    the sum of the amplitudes for the harmonic sums) and timed after a first compiling call.
+
+    Args:
+        repeat (int, optional): Number of timed calls of each implementation, the best is reported. Defaults to 3.
+        times (int, optional): Number of times of the harmonic sums, defaults to 1048576.
+        locations (int, optional): Number of locations of the batch prediction, defaults to 256.
+        roots (int, optional): Number of extrema refined, defaults to 65536.
+        constituents (int, optional): Number of constituents, defaults to 37.
+
+    Returns:
+        A dictionary of (NumPy seconds, kernel seconds, maximum difference) per kernel.
+
+    """
+    if numba is None:
+        raise RuntimeError('numba is not installed.')
+    from . import extrema, reconstruction
+
+    rng = np.random.default_rng(0)
+    K = constituents
+    speed = rng.uniform(0.001, 0.5, K)
+    amplitudes = rng.uniform(0., 1., K)
+    phases = rng.uniform(-np.pi, np.pi, K)
+    f = rng.uniform(0.8, 1.2, K)
+    arg = np.multiply.outer(np.arange(times) * 0.25, speed) + rng.uniform(-np.pi, np.pi, K)
+    out = np.empty(times)
+    results = {}
+
+    def numpy_sum():
+        return np.cos(arg - phases) @ (amplitudes * f)
+    expected, t_numpy = _timed(numpy_sum, repeat)
+    harmonic_sum(arg[:1], phases, f, amplitudes, out[:1])
+    actual, t_kernel = _timed(lambda: harmonic_sum(arg, phases, f, amplitudes, out), repeat)
+    results['harmonic_sum'] = (t_numpy, t_kernel, np.abs(actual - expected).max() / amplitudes.sum())
+
+    rows = times // 4
+    coefficients = reconstruction.harmonic_coefficients(rng.uniform(0., 1., (locations, K)),
+        rng.uniform(-180., 180., (locations, K)))
+    basis = np.empty((rows, 2 * K))
+
+    def numpy_batch():
+        return np.concatenate([np.cos(arg[:rows]), np.sin(arg[:rows])], axis=1) * np.r_[f, f] @ coefficients.T
+    expected, t_numpy = _timed(numpy_batch, repeat)
+    cos_sin(arg[:1], f, basis[:1])
+    actual, t_kernel = _timed(lambda: cos_sin(arg[:rows], f, basis) @ coefficients.T, repeat)
+    results['batch_basis'] = (t_numpy, t_kernel, np.abs(actual - expected).max() / coefficients.sum(axis=1).max())
+
+    track_coefficients = np.ascontiguousarray(coefficients[rng.integers(0, locations, times)])
+
+    def numpy_track():
+        return np.einsum('ij,ij->i', track_coefficients * np.r_[f, f],
+            np.concatenate([np.cos(arg), np.sin(arg)], axis=1))
+    expected, t_numpy = _timed(numpy_track, repeat)
+    track_sum(arg[:1], f, track_coefficients[:1], out[:1])
+    actual, t_kernel = _timed(lambda: track_sum(arg, f, track_coefficients, out), repeat)
+    results['track_sum'] = (t_numpy, t_kernel, np.abs(actual - expected).max() / amplitudes.sum())
+
+    cells = rng.integers(0, locations, times)
+    weights = rng.uniform(0., 0.5, (times, 4))
+    stencils = rng.uniform(-1., 1., (locations, 4, 2 * K))
+    interpolated = np.empty((times, 2 * K))
+    expected, t_numpy = _timed(lambda: np.einsum('ij,ijk->ik', weights, stencils[cells]), repeat)
+    stencil_interpolate(weights[:1], stencils, cells[:1], interpolated[:1])
+    actual, t_kernel = _timed(lambda: stencil_interpolate(weights, stencils, cells, interpolated), repeat)
+    results['stencil_interpolate'] = (t_numpy, t_kernel, np.abs(actual - expected).max())
+
+    # extrema of random models of the M2/S2 band over a year, from the reconstruction's own brackets
+    models = max(1, roots // 1400)
+    start = np.datetime64('2020-01-01', 'ns')
+    amp = rng.uniform(0.1, 1., (models, 4)) * [1., 0.3, 0.2, 0.1]
+    pha = rng.uniform(-180., 180., (models, 4))
+    names = ['M2', 'S2', 'N2', 'K1']
+    previous = config.get('numba', True)
+    try:
+        config['numba'] = False
+        expected, t_numpy = _timed(lambda: extrema.find_extrema(names, amp, pha, start, 8766.), repeat)
+        config['numba'] = True
+        extrema.find_extrema(names, amp[:1], pha[:1], start, 24.)
+        actual, t_kernel = _timed(lambda: extrema.find_extrema(names, amp, pha, start, 8766.), repeat)
+    finally:
+        config['numba'] = previous
+    same = actual[0].size == expected[0].size
+    difference = np.abs(actual[1] - expected[1]).max() if same else np.inf
+    results['extrema'] = (t_numpy, t_kernel, difference)
+    return results
+
+
+if __name__ == '__main__':
+    print('{:<20} {:>10} {:>10} {:>8} {:>12}'.format('kernel', 'numpy (s)', 'numba (s)', 'speedup', 'max diff'))
+    for name, (t_numpy, t_kernel, difference) in benchmark().items():
+        print('{:<20} {:>10.4f} {:>10.4f} {:>8.1f} {:>12.3g}'.format(name, t_numpy, t_kernel, t_numpy / t_kernel,
+            difference))
@@ -0,0 +1,192 @@
+from harmonica import config
+from .astronomy import BASE_CONSTITUENTS, J2000, _astro, _combine, _days, node_multipliers
+import json
+import os
+import numpy as np
+
+# Hours over which the node factors are considered constant (evaluated at the middle of each period)
+NODAL_INTERVAL = 240.
+
+# Update policies of the node factors: constant over nodal_interval hours from the first time (as pytides), exact
+# at every sample (interpolated from the nodal table), constant per UTC day or per calendar year (table values at
+# noon of the day or at mid-year)
+POLICIES = ('partition', 'sample', 'day', 'year')
+
+
+class NodalTable(object):
+    """Daily node factors f and u of the base constituents, generated once into the cache directory and memory-mapped.
+
+    The node factors are tabulated at noon UTC of every day from START to END. They are looked up (and linearly
+    interpolated between days) instead of being recomputed from the astronomical arguments; compound constituents
+    combine the node factors of their members. Times outside of the table are evaluated directly.
+    """
+
+    START = np.datetime64('1900-01-01T12:00:00', 'ns')
+    END = np.datetime64('2100-12-31T12:00:00', 'ns')
+    VERSION = 1
+
+    def __init__(self, path=None):
+        """Open the nodal table, generating it first if it does not exist or is out of date.
+
+        Args:
+            path (str, optional): Directory of the table files, defaults to nodal in the cache directory (see
+                cache_dir).
+
+        """
+        self.path = path or os.path.join(cache_dir(), 'nodal')
+        self.constituents = list(BASE_CONSTITUENTS)
+        self.start = (self.START - J2000) // np.timedelta64(1, 'D')
+        self.size = int((self.END - self.START) // np.timedelta64(1, 'D')) + 1
+        self.f, self.u = self._load()
+
+
+    def _meta(self):
+        return {
+            'version': self.VERSION,
+            'start': str(self.START),
+            'size': self.size,
+            'constituents': self.constituents,
+        }
+
+
+    def _load(self):
+        """Memory-map the table files, generating them if missing or out of date."""
+        meta_path = os.path.join(self.path, 'meta.json')
+        try:
+            with open(meta_path) as f:
+                valid = json.load(f) == self._meta()
+        except (IOError, ValueError):
+            valid = False
+        if not valid:
+            self.build()
+        return (np.load(os.path.join(self.path, 'f.npy'), mmap_mode='r'),
+            np.load(os.path.join(self.path, 'u.npy'), mmap_mode='r'))
+
+
+    def build(self):
+        """Compute the node factors of every day of the table and write them to the table directory."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        a = _astro(self.start + np.arange(self.size, dtype=float))
+        f = np.column_stack([BASE_CONSTITUENTS[c][2](a) for c in self.constituents])
+        u = np.column_stack([BASE_CONSTITUENTS[c][1](a) for c in self.constituents])
+        # write to temporary files first so concurrent readers never see a partial table
+        for name, values in (('f', f), ('u', u)):
+            tmp = os.path.join(self.path, '{}.{}.npy'.format(name, os.getpid()))
+            np.save(tmp, values)
+            os.replace(tmp, os.path.join(self.path, name + '.npy'))
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self._meta(), f)
+
+
+    def lookup(self, constituents, days, interpolate=True, multipliers=None):
+        """Return the node factors f and u (degrees) of each constituent at each time.
+
+        Args:
+            constituents (list(str)): Constituent names.
+            days (ndarray(float)): Times in days since J2000.
+            interpolate (bool, optional): Linearly interpolate between the daily values (True, the default) or use
+                the value of the nearest day.
+            multipliers (tuple, optional): Base constituents and multipliers of the constituents, as returned by
+                astronomy.node_multipliers, defaults to resolving them.
+
+        Returns:
+            A tuple of two ndarrays (T x K) of f and u.
+
+        """
+        days = np.atleast_1d(np.asarray(days, dtype=float))
+        bases, multipliers = multipliers or node_multipliers(constituents)
+        columns = [self.constituents.index(b) for b in bases]
+
+        x = days - self.start
+        inside = (x >= 0) & (x <= self.size - 1)
+        fb = np.empty((days.size, len(bases)))
+        ub = np.empty_like(fb)
+        if inside.any():
+            x = x[inside]
+            if interpolate:
+                i = np.minimum(np.floor(x).astype(np.int64), self.size - 2)
+                w = (x - i)[:, np.newaxis]
+                fb[inside] = (1. - w) * self.f[i][:, columns] + w * self.f[i + 1][:, columns]
+                # interpolate u along the shortest arc, as some u jump by 180 degrees (e.g. M1)
+                u0 = self.u[i][:, columns]
+                ub[inside] = u0 + w * (np.mod(self.u[i + 1][:, columns] - u0 + 180., 360.) - 180.)
+            else:
+                i = np.rint(x).astype(np.int64)
+                fb[inside] = self.f[i][:, columns]
+                ub[inside] = self.u[i][:, columns]
+        if not inside.all():
+            a = _astro(days[~inside])
+            fb[~inside] = np.column_stack([BASE_CONSTITUENTS[b][2](a) for b in bases])
+            ub[~inside] = np.column_stack([BASE_CONSTITUENTS[b][1](a) for b in bases])
+
+        f, u = _combine(multipliers, fb.T, ub.T)
+        return f.T, u.T
+
+
+_tables = {}
+
+
+def cache_dir():
+    """Return the directory of generated tables: config['cache_dir'], or harmonica in the user cache directory."""
+    if config.get('cache_dir'):
+        return config['cache_dir']
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')),
+        'harmonica')
+
+
+def default_table():
+    """Return the shared nodal table of the cache directory, generating it on first use."""
+    path = os.path.join(cache_dir(), 'nodal')
+    if path not in _tables:
+        _tables[path] = NodalTable(path)
+    return _tables[path]
+
+
+def _group(keys):
+    """Group times by key; return (index, position of the first time) of each group, in key order.
+
+    The indices are slices if the keys are sorted and index arrays otherwise.
+    """
+    if np.all(keys[1:] >= keys[:-1]):
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        stops = np.r_[starts[1:], keys.size]
+        return [(np.s_[start:stop], start) for start, stop in zip(starts, stops)]
+    order = np.argsort(keys, kind='stable')
+    starts = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1]])
+    return list(zip(np.split(order, starts[1:]), order[starts]))
+
+
+def partitions(times, days, policy='partition', nodal_interval=NODAL_INTERVAL, origin=None):
+    """Split times into the partitions over which their node factors are constant.
+
+    Args:
+        times (ndarray(datetime64)): datetime64[ns] times.
+        days (ndarray(float)): The same times in days since J2000.
+        policy (str, optional): Node factor update policy, one of POLICIES, defaults to 'partition'.
+        nodal_interval (float, optional): Partition length in hours of the 'partition' policy, defaults to 240.
+        origin (float, optional): Start in days since J2000 of the first partition of the 'partition' policy,
+            defaults to the first time.
+
+    Returns:
+        A list of (index, time in days since J2000 at which the node factors are evaluated) of the non-empty
+            partitions, where index is a slice if the times are sorted and an index array otherwise. The 'sample'
+            policy returns a single partition of all times, without an evaluation time.
+
+    """
+    if policy == 'partition':
+        origin = days[0] if origin is None else origin
+        keys = np.floor((days - origin) * 24. / nodal_interval).astype(np.int64)
+        mids = lambda key: origin + (key + 0.5) * nodal_interval / 24.
+    elif policy == 'day':
+        # J2000 is at noon, so days since J2000 rounded down after half a day are UTC days
+        keys = np.floor(days + 0.5).astype(np.int64)
+        mids = lambda key: float(key)
+    elif policy == 'year':
+        keys = times.astype('datetime64[Y]').astype(np.int64)
+        mids = lambda key: _days(np.array([key], dtype='datetime64[Y]'))[0] + 182.5
+    elif policy == 'sample':
+        return [(np.s_[0:days.size], None)]
+    else:
+        raise ValueError('Nodal policy not recognized.')
+    return [(index, mids(keys[first])) for index, first in _group(keys)]
@@ -0,0 +1,197 @@
+from . import kernels
+import numpy as np
+
+
+def morton_code(x, y, bits=21):
+    """Interleave the bits of non-negative integer grid coordinates into a Z-order (Morton) curve index.
+
+    Args:
+        x (ndarray(int)): First grid coordinate of each cell.
+        y (ndarray(int)): Second grid coordinate of each cell.
+        bits (int, optional): Number of bits of each coordinate to interleave, defaults to 21.
+
+    Returns:
+        An array of uint64 curve indices; cells that are close on the grid tend to be close on the curve.
+
+    """
+    x = np.asarray(x).astype(np.uint64)
+    y = np.asarray(y).astype(np.uint64)
+    code = np.zeros(np.broadcast(x, y).shape, dtype=np.uint64)
+    one = np.uint64(1)
+    for b in range(bits):
+        b = np.uint64(b)
+        code |= ((x >> b) & one) << (np.uint64(2) * b)
+        code |= ((y >> b) & one) << (np.uint64(2) * b + one)
+    return code
+
+
+def chunk_shape(var, default=None):
+    """Return the storage chunk shape of the two trailing (x, y) dimensions of a gridded variable.
+
+    Args:
+        var (xarray.DataArray): Gridded variable opened from a netCDF/HDF5 file.
+        default (tuple(int, int), optional): Shape to use if the variable is contiguous or the chunking is unknown,
+            defaults to ReadPlan.DEFAULT_TILE.
+
+    Returns:
+        A tuple of the chunk extent along the x and y dimensions.
+
+    """
+    chunks = getattr(var, 'encoding', {}).get('chunksizes')
+    if chunks is None or len(chunks) < 2:
+        return tuple(default or ReadPlan.DEFAULT_TILE)
+    return tuple(int(c) for c in chunks[-2:])
+
+
+def bilinear_stencils(lat, lon, lat_grid, lon_grid):
+    """Locate the grid cell of every point and compute its bilinear interpolation weights.
+
+    Args:
+        lat (ndarray(float)): Latitude [-90, 90] of each point.
+        lon (ndarray(float)): Longitude [0 360] of each point.
+        lat_grid (ndarray(float)): Sorted latitudes of the grid (y dimension).
+        lon_grid (ndarray(float)): Sorted longitudes of the grid (x dimension).
+
+    Returns:
+        A tuple of the x (left) and y (bottom) indices of the lower corner of the cell of each point and of the
+            (npoints, 2, 2) weights of the cell corners, indexed as [x offset, y offset].
+
+    """
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))
+    lat_grid = np.asarray(lat_grid, dtype=float)
+    lon_grid = np.asarray(lon_grid, dtype=float)
+    # bounding indices of each point, equivalent to bisect on the grid vectors
+    right = np.clip(np.searchsorted(lon_grid, lon, side='right'), 1, lon_grid.size - 1)
+    top = np.clip(np.searchsorted(lat_grid, lat, side='right'), 1, lat_grid.size - 1)
+    left = right - 1
+    bottom = top - 1
+    # distance from the bottom left to the requested point and bilinear weights
+    dx = (lon - lon_grid[left]) / (lon_grid[right] - lon_grid[left])
+    dy = (lat - lat_grid[bottom]) / (lat_grid[top] - lat_grid[bottom])
+    weights = np.stack([
+        (1. - dx) * (1. - dy),  # w00 :: bottom left
+        (1. - dx) * dy,         # w01 :: bottom right
+        dx * (1. - dy),         # w10 :: top left
+        dx * dy                 # w11 :: top right
+    ], axis=-1).reshape((-1, 2, 2))
+    return left, bottom, weights / weights.sum(axis=(1, 2), keepdims=True)
+
+
+class ReadPlan(object):
+    """Locality-aware plan for reading the bilinear interpolation stencils of a batch of points from a grid.
+
+    Points are sorted along a Morton curve of the storage chunks (tiles) their stencils fall in, grouped by tile,
+    and neighbouring groups are coalesced into bounding-box hyperslab reads. Values read for each point are
+    scattered back to the original point order.
+    """
+
+    # Tile shape used when the storage chunking of a variable is unknown
+    DEFAULT_TILE = (256, 256)
+    # Fewest points of a plan whose reads load whole tiles into a tile cache; smaller plans read their stencils only
+    MIN_TILED_POINTS = 64
+
+    def __init__(self, lat, lon, lat_grid, lon_grid, tile_shape=None, min_fill=0.5, max_tiles=4):
+        """Plan the reads for a batch of points.
+
+        Args:
+            lat (ndarray(float)): Latitude [-90, 90] of each requested point.
+            lon (ndarray(float)): Longitude [0 360] of each requested point.
+            lat_grid (ndarray(float)): Sorted latitudes of the grid (y dimension).
+            lon_grid (ndarray(float)): Sorted longitudes of the grid (x dimension).
+            tile_shape (tuple(int, int), optional): Storage chunk shape along (x, y), defaults to DEFAULT_TILE.
+            min_fill (float, optional): Minimum fraction of a coalesced read that must be covered by the bounding
+                boxes of its tile groups for neighbouring groups to be merged, defaults to 0.5.
+            max_tiles (int, optional): Maximum area of a coalesced read, in tiles, defaults to 4.
+
+        """
+        self.left, self.bottom, self.weights = bilinear_stencils(lat, lon, lat_grid, lon_grid)
+        self.size = self.left.size
+        self.tile_shape = tuple(tile_shape or self.DEFAULT_TILE)
+
+        # sort the points along the curve of their tiles, then along the curve of their cells within a tile
+        tile_x = self.left // self.tile_shape[0]
+        tile_y = self.bottom // self.tile_shape[1]
+        tiles = morton_code(tile_x, tile_y)
+        self.order = np.lexsort((morton_code(self.left, self.bottom), tiles))
+        self.reads = self._coalesce(tiles[self.order], min_fill, max_tiles)
+
+
+    def _coalesce(self, sorted_tiles, min_fill, max_tiles):
+        """Group the sorted points by tile and merge neighbouring groups into bounding-box reads."""
+        if not self.size:
+            return []
+        starts = np.flatnonzero(np.r_[True, sorted_tiles[1:] != sorted_tiles[:-1]])
+        stops = np.r_[starts[1:], self.size]
+        max_area = max_tiles * self.tile_shape[0] * self.tile_shape[1]
+
+        reads = []
+        current = None
+        for start, stop in zip(starts, stops):
+            idx = self.order[start:stop]
+            box = [self.left[idx].min(), self.left[idx].max() + 2, self.bottom[idx].min(), self.bottom[idx].max() + 2]
+            area = (box[1] - box[0]) * (box[3] - box[2])
+            if current is not None:
+                merged = [min(current[0][0], box[0]), max(current[0][1], box[1]),
+                    min(current[0][2], box[2]), max(current[0][3], box[3])]
+                merged_area = (merged[1] - merged[0]) * (merged[3] - merged[2])
+                if merged_area <= max_area and (current[1] + area) >= min_fill * merged_area:
+                    current = (merged, current[1] + area, current[2] + [idx])
+                    continue
+                reads.append(current)
+            current = (box, area, [idx])
+        reads.append(current)
+
+        return [(np.s_[b[0]:b[1]], np.s_[b[2]:b[3]], np.concatenate(idx)) for b, _, idx in reads]
+
+
+    def bounds(self):
+        """Return the (x slice, y slice) hyperslab of every coalesced read."""
+        return [(xs, ys) for xs, ys, _ in self.reads]
+
+
+    def read(self, var, index=(), cache=None, key=None, dtype=float):
+        """Read the 2x2 interpolation stencil of every point from a gridded variable.
+
+        With a cache, plans of at least MIN_TILED_POINTS points read whole tiles through it. Smaller plans (e.g. a
+        single location) use the tiles already cached but read the stencils of the others directly, since loading a
+        whole tile would cost far more than their few values.
+
+        Args:
+            var (array-like): Variable indexed as [index..., x, y] (e.g. xarray.DataArray or netCDF4.Variable).
+            index (tuple, optional): Leading indices selecting the 2-D grid (e.g. the constituent), defaults to ().
+            cache (TileCache, optional): Cache of decoded tiles to serve the reads from, defaults to None (no cache).
+            key (tuple, optional): (file, constituent, variable) prefix of the tile keys, required with a cache.
+            dtype (type, optional): Type of the returned values, defaults to float64.
+
+        Returns:
+            An ndarray of shape (npoints, 2, 2) with the stencil values in the original point order.
+
+        """
+        values = np.empty((self.size, 2, 2), dtype=dtype)
+        tiled = self.size >= self.MIN_TILED_POINTS
+        for xs, ys, idx in self.reads:
+            if cache is not None and (tiled or cache.cached(key, xs, ys, self.tile_shape)):
+                block = cache.block(var, key, index, xs, ys, self.tile_shape)
+            else:
+                block = np.asarray(var[tuple(index) + (xs, ys)])
+            self._scatter(values, block, xs, ys, idx)
+        return values
+
+
+    def _scatter(self, values, block, xs, ys, idx):
+        """Copy the stencils of the points idx from a block read at (xs, ys) into values."""
+        i = self.left[idx] - xs.start
+        j = self.bottom[idx] - ys.start
+        values[idx, 0, 0] = block[i, j]
+        values[idx, 0, 1] = block[i, j + 1]
+        values[idx, 1, 0] = block[i + 1, j]
+        values[idx, 1, 1] = block[i + 1, j + 1]
+
+
+    def interpolate(self, var, index=(), cache=None, key=None, dtype=float):
+        """Bilinearly interpolate a gridded variable at every point, in the original point order, in dtype."""
+        values = self.read(var, index, cache, key, dtype)
+        if kernels.enabled():
+            return kernels.bilinear(values, self.weights, np.empty(self.size, dtype=values.dtype))
+        return (values * self.weights.astype(values.dtype, copy=False)).sum(axis=(1, 2))
@@ -0,0 +1,133 @@
+from . import extrema, reconstruction
+from .astronomy import d2r, datetime64, doodson_coefficients, equilibrium_arguments, node_multipliers
+from .nodal import NODAL_INTERVAL
+import numpy as np
+
+
+class TidePredictor(object):
+    """Compiled harmonic model of one or more locations, built once and evaluated at any times.
+
+    The constituents are resolved once into contiguous arrays of Doodson numbers, node factor multipliers and
+    amplitudes and phases, so a prediction only evaluates the astronomy of its times. Predictors hold only numpy
+    arrays and plain values (their work buffers are not pickled), so they pickle cheaply (e.g. to ship them to worker
+    processes).
+
+    Example:
+        predictor = TidePredictor.from_constituents(Constituents().get_components(loc, model='tpxo9'))
+        water_level = predictor.predict(times)
+    """
+
+    def __init__(self, constituents, amplitudes, phases, nodal_interval=NODAL_INTERVAL, nodal_policy=None,
+            anchor_interval=reconstruction.ANCHOR_INTERVAL, max_bytes=reconstruction.BASIS_BYTES, dtype=float):
+        """Compile a harmonic model.
+
+        Args:
+            constituents (list(str)): Constituent names.
+            amplitudes (ndarray(float)): Amplitude of each constituent (K), or of each constituent for each of N
+                locations (N x K).
+            phases (ndarray(float)): Phase (degrees) of each constituent, same shape as amplitudes.
+            nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+            nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES, defaults to
+                config['nodal_policy'].
+            anchor_interval (int, optional): Number of steps between exact evaluations of the phases of uniformly
+                spaced times, defaults to 256; 0 disables the uniform time step fast path.
+            max_bytes (int, optional): Memory budget of the intermediate arrays of a prediction, defaults to 64 MiB.
+            dtype (type, optional): Precision of the predicted water levels, float64 (the default) or float32 (see
+                reconstruction.reconstruct); extrema are always found in float64.
+
+        """
+        self.constituents = list(constituents)
+        self.amplitudes = np.ascontiguousarray(amplitudes, dtype=float)
+        self.phases = np.ascontiguousarray(phases, dtype=float)
+        if self.amplitudes.shape != self.phases.shape or self.amplitudes.shape[-1:] != (len(self.constituents),):
+            raise ValueError('Amplitudes and phases must have one value per constituent.')
+        self.nodal_interval = nodal_interval
+        self.nodal_policy = nodal_policy
+        self.anchor_interval = anchor_interval
+        self.max_bytes = max_bytes
+        self.dtype = reconstruction._float_dtype(dtype)
+        self.doodson = np.ascontiguousarray(doodson_coefficients(self.constituents))
+        self.bases, self.multipliers = node_multipliers(self.constituents)
+        self._phases = d2r * self.phases
+        self._coefficients = reconstruction.harmonic_coefficients(self.amplitudes, self.phases)
+        # work buffers reused by successive predictions
+        self.scratch = reconstruction.Scratch()
+
+
+    @classmethod
+    def from_constituents(cls, constituents, offset=None, **kwargs):
+        """Compile the harmonic model of a Constituents query result.
+
+        Args:
+            constituents (Constituents): Result of Constituents.get_components (one location) or
+                Constituents.get_batch_components (N locations).
+            offset (float, optional): If not None, includes a generic constituent with a phase of the given value.
+            **kwargs: Options of TidePredictor.
+
+        Returns:
+            A TidePredictor.
+
+        """
+        names, amplitudes, phases = constituents.harmonic_constants()
+        if offset is not None:
+            names = names + ['Z0']
+            amplitudes = np.concatenate([amplitudes, np.zeros(amplitudes.shape[:-1] + (1,))], axis=-1)
+            phases = np.concatenate([phases, np.full(phases.shape[:-1] + (1,), float(offset))], axis=-1)
+        return cls(names, amplitudes, phases, **kwargs)
+
+
+    def speeds(self, t0):
+        """Return the speed (degrees/hour) of each constituent at a time."""
+        return equilibrium_arguments(self.constituents, t0)[1]
+
+
+    def predict(self, times, out=None, epoch=None):
+        """Predict the water levels at the given times.
+
+        Args:
+            times (ndarray(datetime64)): Times, as datetime64 values, int64 nanoseconds since the Unix epoch or
+                datetime objects.
+            out (ndarray(float), optional): Array of shape (T) for one location or (T x N) for N locations, of the
+                predictor's dtype, to store the water levels in (e.g. a view into shared memory or a memory-mapped
+                file), defaults to a new array. With a contiguous output array, repeated predictions of the same
+                number of times reuse all their work arrays.
+            epoch (datetime64, optional): Time from which the equilibrium arguments are advanced and the node factor
+                partitions start, defaults to the first time. The predictions of consecutive chunks of a series
+                sharing the epoch of the series (e.g. its first time) are those of the whole series.
+
+        Returns:
+            An ndarray of the water levels, of shape (T) for one location or (T x N) for N locations (out if given).
+
+        """
+        times = datetime64(times)
+        # times predicted repeatedly reduce to a product with their cached basis
+        basis = reconstruction._cached_basis(self.constituents, times, self.nodal_interval, self.nodal_policy,
+            self.dtype, epoch)
+        if basis is not None:
+            return reconstruction._project(basis, self._coefficients, out)
+        arguments = reconstruction._Arguments(self.constituents, times, self.nodal_interval, self.nodal_policy,
+            self.doodson, (self.bases, self.multipliers), self.scratch, epoch)
+        return reconstruction._evaluate(arguments, self.amplitudes, self._phases, times, self.max_bytes,
+            self.anchor_interval, out, self.dtype)
+
+
+    def high_low(self, start, hours, step=extrema.COARSE_STEP, tol=extrema.TOLERANCE):
+        """Find the times and heights of the high and low waters of a period, see extrema.extrema.
+
+        Args:
+            start (datetime64): Start of the period (datetime, date or datetime64).
+            hours (float): Length of the period in hours (the end is excluded).
+            step (float, optional): Spacing in hours of the derivative samples bracketing the extrema, defaults to
+                0.5; it must be shorter than the shortest interval between a high and a low water.
+            tol (float, optional): Tolerance in hours of the extrema times, defaults to 1e-6.
+
+        Returns:
+            A tuple of ndarrays of the datetime64[ns] times, heights, high water flags (False for low waters) and
+                location indices (all 0 for one location) of the extrema, ordered by location and time.
+
+        """
+        times = reconstruction.time_range(start, hours + step, step)
+        arguments = reconstruction._Arguments(self.constituents, times, self.nodal_interval, self.nodal_policy,
+            self.doodson, (self.bases, self.multipliers), self.scratch)
+        return extrema.extrema(arguments, self.amplitudes, self._phases, times, hours, tol, self.max_bytes,
+            self.anchor_interval)
@@ -0,0 +1,130 @@
+from .cache import default_tile_cache
+from .planner import ReadPlan, chunk_shape
+from .resource import ResourceManager
+from .tidal_constituents import Constituents
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
+
+
+def readahead(path):
+    """Advise the operating system that a file will be read soon so it starts loading it into the page cache.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        True if the advice was given, False if the platform does not support posix_fadvise.
+
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+class Prefetcher(object):
+    """Warm the extraction tile cache for a planned batch workload on background threads.
+
+    The tiles needed by a batch of locations are read into the tile cache while the caller is still interpolating
+    earlier ones, so I/O and computation overlap instead of alternating. Extraction calls made meanwhile wait for
+    tiles being prefetched rather than reading them again.
+
+    Example:
+        with Prefetcher().prefetch(locs, model='tpxo8'):
+            cons = Constituents().get_batch_components(locs, model='tpxo8')
+    """
+
+    def __init__(self, max_workers=4, cache=None):
+        """Create a prefetcher.
+
+        Args:
+            max_workers (int, optional): Number of background threads, defaults to 4.
+            cache (TileCache, optional): Cache to warm, defaults to the shared extraction tile cache.
+
+        """
+        self.cache = cache if cache is not None else default_tile_cache()
+        if self.cache is None:
+            raise ValueError("Prefetching requires a tile cache, but config['tile_cache_bytes'] is 0.")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = []
+        # keep the resources (and their open datasets) alive until their reads complete
+        self._resources = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=exc[0] is None)
+
+
+    def prefetch(self, locs, model=ResourceManager.DEFAULT_RESOURCE, cons=[], readahead=False, level=0):
+        """Start warming the tile cache for the reads of a batch of locations; returns immediately.
+
+        Args:
+            locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+                [0 360] of the planned points.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of planned constituents, defaults to all constituents if None or empty.
+            readahead (bool, optional): If True, also advise the operating system to read the whole model files
+                into the page cache (posix_fadvise), defaults to False.
+            level (int, optional): Pyramid level of the planned queries, defaults to 0 (full resolution).
+
+        Returns:
+            The prefetcher itself.
+
+        """
+        locs = np.asarray(locs, dtype=float).reshape((-1, 2))
+        model = Constituents._model_name(model)
+        self.futures.append(self.executor.submit(self._plan, locs, model, cons, readahead, level))
+        return self
+
+
+    def _plan(self, locs, model, cons, advise, level):
+        """Open the model files, plan the reads and submit one cache warming task per read."""
+        lat = locs[:, 0]
+        lon = np.where(locs[:, 1] < 0, locs[:, 1] + 360., locs[:, 1])
+        resources = ResourceManager(model=model)
+        self._resources.append(resources)
+        if cons is None or not len(cons):
+            cons = resources.available_constituents()
+
+        futures = []
+        for d, paths in zip(resources.get_datasets(cons, level), resources.paths):
+            if advise:
+                futures.extend(self.executor.submit(readahead, p) for p in paths)
+            nc_names = Constituents._prepare_dataset(d)
+            plan = None
+            for c in sorted(set(cons) & set(nc_names)):
+                con = nc_names.index(c)
+                if plan is None:
+                    plan = ReadPlan(lat, lon, d.lat_z.values[con], d.lon_z.values[con], tile_shape=chunk_shape(d.hRe))
+                for var in ('hRe', 'hIm'):
+                    key = (resources.constituent_path(c, level), c, var)
+                    futures.extend(self.executor.submit(self.cache.block, d[var], key, (con,), xs, ys,
+                        plan.tile_shape) for xs, ys in plan.bounds())
+        return futures
+
+
+    def wait(self):
+        """Block until every submitted prefetch has completed, re-raising the first error encountered."""
+        pending, self.futures = self.futures, []
+        while pending:
+            result = pending.pop(0).result()
+            if isinstance(result, list):
+                pending.extend(result)
+        self._resources = []
+
+
+    def shutdown(self, wait=True):
+        """Wait for the prefetches (if requested) and release the background threads."""
+        if wait:
+            self.wait()
+        self.executor.shutdown(wait=wait)
+        self._resources = []
@@ -0,0 +1,505 @@
+from harmonica import config
+from . import kernels, nodal
+from .astronomy import J2000, d2r, datetime64, doodson_coefficients, node_multipliers, _astro, _node_factors, \
+    _spanning_set
+from .cache import default_basis_cache
+from .nodal import NODAL_INTERVAL
+import hashlib
+import threading
+import numpy as np
+
+# Default memory budget (bytes) of the intermediate arrays of a reconstruction
+BASIS_BYTES = 64 * 2**20
+
+# Default number of time steps between exact evaluations of the phases of uniformly spaced times
+ANCHOR_INTERVAL = 256
+
+_J2000_NS = J2000.astype(np.int64)
+
+
+def hours_since(times, t0=None):
+    """Return the hours elapsed from a reference time to each time.
+
+    Args:
+        times (array-like): Times, in any format accepted by datetime64.
+        t0 (datetime64, optional): Reference time, defaults to the first time.
+
+    Returns:
+        A tuple of the ndarray(float) of hours and the datetime64[ns] reference time.
+
+    """
+    times = datetime64(times)
+    t0 = times[0] if t0 is None else np.datetime64(t0, 'ns')
+    return (times - t0).astype(np.int64) / 3600e9, t0
+
+
+def time_range(start, hours, step=1.):
+    """Return regularly spaced times.
+
+    Args:
+        start (datetime64): First time (datetime, date or datetime64).
+        hours (float): Length of the range in hours (the end is excluded).
+        step (float, optional): Time step in hours, defaults to 1.
+
+    Returns:
+        An ndarray(datetime64[ns]) of the times.
+
+    """
+    # integer steps keep the spacing exactly uniform
+    return np.datetime64(start, 'ns') + np.arange(int(np.ceil(hours / step))) * _timedelta(step)
+
+
+def _timedelta(hours):
+    """Return a timedelta64[ns] of the given hours, rounded to the nanosecond."""
+    return np.timedelta64(int(round(hours * 3600e9)), 'ns')
+
+
+class Scratch(object):
+    """Work arrays of reconstructions, kept between calls so that steady-state predictions do not reallocate them.
+
+    Buffers grow on demand and are private to each thread, so a Scratch may be shared between threads. Pickling a
+    Scratch drops its buffers.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+
+    def __getstate__(self):
+        return {}
+
+
+    def __setstate__(self, state):
+        self._local = threading.local()
+
+
+    def array(self, name, shape, dtype=float):
+        """Return an uninitialized array of the given shape backed by the named buffer (overwritten by its next use)."""
+        buffers = self._local.__dict__
+        size = int(np.prod(shape))
+        buffer = buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = buffers[name] = np.empty(max(size, 1), dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+
+class _Arguments(object):
+    """Equilibrium arguments and node factors of a set of constituents for the partitions of a time series."""
+
+    def __init__(self, constituents, times, nodal_interval=NODAL_INTERVAL, nodal_policy=None, coefficients=None,
+            multipliers=None, scratch=None, epoch=None):
+        # the equilibrium arguments are advanced and the node factor partitions start from the epoch, by default the
+        # first time
+        times = datetime64(times)
+        self.constituents = constituents
+        self.scratch = scratch if scratch is not None else Scratch()
+        # Doodson numbers and node factor multipliers may be resolved once by the caller (see TidePredictor)
+        self.multipliers = multipliers or node_multipliers(constituents)
+        self.policy = nodal_policy or config.get('nodal_policy', 'partition')
+        self.f = self.u = None
+        # days since J2000 and elapsed hours from the integer times, which are exact where differences of days
+        # would be rounded
+        ns = times.view(np.int64)
+        elapsed = self.scratch.array('elapsed', ns.shape, np.int64)
+        self.days = np.divide(np.subtract(ns, _J2000_NS, out=elapsed), 86400e9,
+            out=self.scratch.array('days', ns.shape))
+        self.hours = None
+        self.partitions = []
+        if not self.days.size:
+            return
+        t0 = ns[0] if epoch is None else int(datetime64(epoch).view(np.int64))
+        day0 = np.divide(np.array([t0 - _J2000_NS]), 86400e9)
+        self.hours = np.divide(np.subtract(ns, t0, out=elapsed), 3600e9, out=self.scratch.array('hours', ns.shape))
+        # node factors are constant over each partition: computed at its middle (as pytides) or looked up in the
+        # nodal table, except with the 'sample' policy where they are looked up for every time
+        self.partitions = nodal.partitions(times, self.days, self.policy, nodal_interval, day0[0])
+        mids = np.array([mid for _, mid in self.partitions])
+        # the astronomy of the epoch and of the middles of the partitions is evaluated at once
+        a = _astro(np.r_[day0, mids] if self.policy == 'partition' else day0)
+        # equilibrium arguments are advanced linearly from their value and speed at the epoch
+        values, speeds = _spanning_set(a)
+        if coefficients is None:
+            coefficients = doodson_coefficients(constituents)
+        self.V0 = d2r * (coefficients @ values)[:, 0]
+        self.speed = d2r * (coefficients @ speeds)[:, 0]
+        if self.policy == 'partition':
+            f, u = _node_factors(constituents, a, self.multipliers)
+            self.f, self.u = f[:, 1:].T, d2r * u[:, 1:].T
+        elif self.policy != 'sample':
+            f, u = nodal.default_table().lookup(constituents, mids, False, self.multipliers)
+            self.f, self.u = f, d2r * u
+        # phase of each partition at its first time offset, V0 + u
+        self.phase0 = self.V0 + self.u if self.u is not None else None
+
+
+    def __iter__(self):
+        return self.blocks()
+
+
+    def blocks(self, max_rows=None):
+        """Yield the index, phase (radians, rows x K) and node factors f of every partition.
+
+        Partitions longer than max_rows times are split into blocks of at most max_rows times. The node factors are
+        of shape (K) for a partition, or (rows x K) with the 'sample' policy. The phase array is a scratch buffer
+        overwritten by the next block.
+        """
+        for p, (index, _) in enumerate(self.partitions):
+            if isinstance(index, slice):
+                step = max_rows or (index.stop - index.start)
+                chunks = (np.s_[i:min(i + step, index.stop)] for i in range(index.start, index.stop, step))
+            else:
+                step = max_rows or index.size
+                chunks = (index[i:i + step] for i in range(0, index.size, step))
+            for chunk in chunks:
+                hours = self.hours[chunk]
+                arg = np.multiply.outer(hours, self.speed, out=self.scratch.array('arg', (hours.size, self.speed.size)))
+                if self.f is None:
+                    f, u = nodal.default_table().lookup(self.constituents, self.days[chunk], True, self.multipliers)
+                    arg += self.V0 + d2r * u
+                    yield chunk, arg, f
+                else:
+                    arg += self.phase0[p]
+                    yield chunk, arg, self.f[p]
+
+
+def _float_dtype(dtype):
+    """Return the numpy dtype of a precision option, which must be float64 or float32."""
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float64, np.float32):
+        raise ValueError('The precision must be float64 or float32.')
+    return dtype
+
+
+def harmonic_basis(constituents, times, nodal_interval=NODAL_INTERVAL, nodal_policy=None, dtype=float, epoch=None):
+    """Build the (T x 2K) harmonic basis [f cos(V + u), f sin(V + u)] of the constituents at the given times.
+
+    The equilibrium arguments V are advanced linearly from their value and speed at the first time (or the epoch)
+    and the node factors f, u are by default held constant over partitions of nodal_interval hours (evaluated at the
+    middle of each partition), which reproduces pytides.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        times (ndarray(datetime64)): Times of the basis rows.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES ('partition', 'sample', 'day'
+            or 'year'), defaults to config['nodal_policy'].
+        dtype (type, optional): Precision of the basis, float64 (the default) or float32; the phases are computed in
+            float64 either way.
+        epoch (datetime64, optional): Time from which the equilibrium arguments are advanced and the node factor
+            partitions start, defaults to the first time. The rows of times sharing an epoch match those of a basis
+            of all the times from the epoch.
+
+    Returns:
+        An ndarray of shape (T, 2K).
+
+    """
+    arguments = _Arguments(constituents, times, nodal_interval, nodal_policy, epoch=epoch)
+    K = len(constituents)
+    basis = np.empty((arguments.days.size, 2 * K), dtype=_float_dtype(dtype))
+    for index, arg, f in arguments:
+        if kernels.enabled() and isinstance(index, slice):
+            kernels.cos_sin(arg, f, basis[index])
+            continue
+        basis[index, :K] = f * np.cos(arg)
+        basis[index, K:] = f * np.sin(arg)
+    return basis
+
+
+def harmonic_coefficients(amplitudes, phases):
+    """Return the basis coefficients [A cos(g), A sin(g)] of amplitudes and phases (degrees) along the last axis."""
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    phases = d2r * np.asarray(phases, dtype=float)
+    return np.concatenate([amplitudes * np.cos(phases), amplitudes * np.sin(phases)], axis=-1)
+
+
+def _cached_basis(constituents, times, nodal_interval=NODAL_INTERVAL, nodal_policy=None, dtype=float, epoch=None):
+    """Return the (T x 2K) harmonic basis of times from the shared basis cache, or None.
+
+    The basis is keyed by a fingerprint of the times, the epoch, the constituents, the node factor options and the
+    precision.
+    It is built and cached the second time the same key is requested; None is returned the first time, when the
+    cache is disabled or when the basis does not fit the cache budget, and the caller evaluates the water levels
+    directly.
+    """
+    cache = default_basis_cache()
+    dtype = _float_dtype(dtype)
+    if cache is None or not times.size or 2 * dtype.itemsize * times.size * len(constituents) > cache.max_bytes:
+        return None
+    policy = nodal_policy or config.get('nodal_policy', 'partition')
+    ns = np.ascontiguousarray(times.view(np.int64))
+    epoch = None if epoch is None else int(datetime64(epoch).view(np.int64))
+    key = (hashlib.blake2b(ns, digest_size=16).digest(), ns.size, epoch, tuple(constituents), float(nodal_interval),
+        policy, dtype.str)
+    return cache.basis(key, lambda: harmonic_basis(constituents, times, nodal_interval, policy, dtype, epoch))
+
+
+def _output(out, shape, dtype=float):
+    """Check the shape and precision of an output array and return whether the water levels can be written into it
+    directly (it is contiguous)."""
+    if out is None:
+        return False
+    if out.shape != shape:
+        raise ValueError('The output array must be of shape {}.'.format(shape))
+    if out.dtype != dtype:
+        raise ValueError('The output array must be of type {}.'.format(np.dtype(dtype).name))
+    return out.flags.c_contiguous
+
+
+def _project(basis, coefficients, out=None):
+    """Return the water levels of a (T x 2K) harmonic basis for basis coefficients (2K) or (N x 2K).
+
+    The product is evaluated in the precision of the basis.
+    """
+    shape = basis.shape[:1] + coefficients.shape[:-1]
+    coefficients = coefficients.astype(basis.dtype, copy=False)
+    if _output(out, shape, basis.dtype):
+        return np.dot(basis, coefficients.T, out=out)
+    water_level = basis @ coefficients.T
+    if out is None:
+        return water_level
+    out[...] = water_level
+    return out
+
+
+def _uniform_step(times):
+    """Return the time step in hours of increasing, uniformly spaced datetime64[ns] times, or None."""
+    if times.size < 2:
+        return None
+    steps = np.diff(times.view(np.int64))
+    if steps[0] <= 0 or np.any(steps != steps[0]):
+        return None
+    return steps[0] / 3600e9
+
+
+def _reconstruct_uniform(arguments, amplitudes, phases, step, anchor_interval, max_bytes, water_level):
+    """Evaluate water levels of uniformly spaced times by rotating the constituent phasors step by step.
+
+    The phasor exp(i (V + u)) of every constituent is evaluated exactly every anchor_interval steps (the anchors)
+    and advanced in between by powers of its rotation per step exp(i speed step), which are computed once by
+    recurrence. The real part of the rotations is a (B x 2K) cos/sin basis of the step offsets shared by all
+    blocks, so all the blocks of a partition are evaluated with a single matrix product against their anchored
+    coefficients. The recurrence error grows linearly with the offset: after j steps it is about j * 1e-16 times the
+    sum of the amplitudes, so the default anchor interval of 256 steps keeps the drift below 1e-13. The recurrence
+    and the anchor phases are evaluated in float64, the basis, the anchored coefficients and the product in the
+    precision of water_level.
+    """
+    scratch = arguments.scratch
+    K = arguments.speed.size
+    T = arguments.days.size
+    B = max(1, min(int(anchor_interval), T))
+    rotations = scratch.array('rotations', (B, K), complex)
+    rotations[0] = 1.
+    rotations[1:] = np.exp(1j * step * arguments.speed)
+    np.cumprod(rotations, axis=0, out=rotations)
+    dtype = water_level.dtype
+    basis = scratch.array('rotation_basis', (B, 2 * K), dtype)
+    basis[:, :K] = rotations.real
+    np.negative(rotations.imag, out=basis[:, K:])
+
+    amplitudes2 = np.atleast_2d(amplitudes)
+    phasors = amplitudes2 * np.exp(-1j * np.atleast_2d(phases))
+    N = amplitudes2.shape[0]
+    water_level = water_level.reshape((T, N))
+    # anchor phases, cosines and sines (3K), anchored coefficients (3K N) and levels (B N) per block
+    blocks = max(1, int(max_bytes // (8 * (3 * K + 3 * K * N + B * N))))
+    for p, (index, _) in enumerate(arguments.partitions):
+        coefficients = (arguments.f[p] * phasors).T
+        cr = coefficients.real[:, np.newaxis, :]
+        ci = coefficients.imag[:, np.newaxis, :]
+        for start in range(index.start, index.stop, B * blocks):
+            stop = min(start + B * blocks, index.stop)
+            hours = arguments.hours[start:stop:B]
+            nb = hours.size
+            phase = np.multiply.outer(hours, arguments.speed, out=scratch.array('anchor_phase', (nb, K)))
+            phase += arguments.phase0[p]
+            ar = np.cos(phase, out=scratch.array('anchor_cos', (nb, K))).T[:, :, np.newaxis]
+            ai = np.sin(phase, out=scratch.array('anchor_sin', (nb, K))).T[:, :, np.newaxis]
+            # real and imaginary parts of the anchored coefficients (anchor * coefficient)
+            x = scratch.array('anchored', (2 * K, nb, N), dtype)
+            tmp = scratch.array('anchored_tmp', (K, nb, N), dtype)
+            np.multiply(ar, cr, out=x[:K])
+            x[:K] -= np.multiply(ai, ci, out=tmp)
+            np.multiply(ar, ci, out=x[K:])
+            x[K:] += np.multiply(ai, cr, out=tmp)
+            # rows are step offsets within the blocks and columns are (block, model) pairs
+            levels = np.dot(basis, x.reshape((2 * K, nb * N)), out=scratch.array('levels', (B, nb * N), dtype))
+            levels = levels.reshape((B, nb, N))
+            full = (stop - start) // B
+            water_level[start:start + full * B].reshape((full, B, N))[...] = levels[:, :full].transpose(1, 0, 2)
+            rest = stop - start - full * B
+            if rest:
+                water_level[start + full * B:stop] = levels[:rest, full]
+
+
+def reconstruct(constituents, amplitudes, phases, times, nodal_interval=NODAL_INTERVAL, max_bytes=BASIS_BYTES,
+        anchor_interval=ANCHOR_INTERVAL, nodal_policy=None, out=None, scratch=None, dtype=float):
+    """Evaluate the water levels of harmonic models at the given times.
+
+    h(t) = sum_k A_k f_k(t) cos(V_k(t) + u_k(t) - g_k). The astronomical arguments and node factors are computed
+    once for all models. A single model is evaluated as a matrix-vector product of the cosines of the phases with
+    the amplitudes; N models (e.g. N locations) share one (T x 2K) cos/sin basis and are evaluated with a single
+    matrix product per block of times, the blocks being sized to respect max_bytes. Results match pytides' Tide.at
+    to within 1e-10 times the sum of the amplitudes.
+
+    Uniformly spaced increasing times take a fast path that advances the phasor of every constituent by a constant
+    rotation per step, re-anchored with an exact evaluation every anchor_interval steps, which replaces almost all
+    trigonometric evaluations by multiply-adds. The recurrence adds at most about anchor_interval * 1e-16 times the
+    sum of the amplitudes to the error. The node factors are constant per partition of nodal_interval hours, as in
+    pytides, unless nodal_policy requests them per UTC day, per calendar year or per sample from the nodal table.
+
+    The (T x 2K) basis of times requested repeatedly is kept in the shared basis cache (config['basis_cache_bytes']),
+    so that repeated reconstructions of the same times skip all astronomy and trigonometry and reduce to a matrix
+    product.
+
+    With numba installed (see kernels), the cos/sin evaluations and the sums over the constituents of the
+    non-uniform paths are compiled, parallel loops over the times instead of NumPy array expressions.
+
+    With dtype=float32, the cos/sin basis, the coefficients and the water levels are float32, which halves the memory
+    traffic of the products and the size of the outputs and cached bases of memory-bound (e.g. many locations)
+    reconstructions. The equilibrium arguments and the phases are still evaluated in float64 (an hour count times a
+    speed loses its precision in float32 within days), so the error is that of the float32 cosines and products:
+    a few 1e-7 times the sum of the amplitudes, well below the accuracy of the tide models.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        amplitudes (ndarray(float)): Amplitude of each constituent (K), or of each constituent for each of N
+            models (N x K).
+        phases (ndarray(float)): Phase (degrees) of each constituent, same shape as amplitudes.
+        times (ndarray(datetime64)): Times of the water levels.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        max_bytes (int, optional): Memory budget of the intermediate phase and basis arrays, defaults to 64 MiB.
+        anchor_interval (int, optional): Number of steps between exact evaluations of the phases of uniformly
+            spaced times, defaults to 256; 0 disables the uniform time step fast path.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES ('partition', 'sample', 'day'
+            or 'year'), defaults to config['nodal_policy'].
+        out (ndarray(float), optional): Array of shape (T) or (T x N) and type dtype to store the water levels in (e.g.
+            a view into shared memory or a memory-mapped file), defaults to a new array.
+        scratch (Scratch, optional): Work buffers to reuse between calls, defaults to buffers private to the call.
+        dtype (type, optional): Precision of the basis and the water levels, float64 (the default) or float32.
+
+    Returns:
+        An ndarray of the water levels, of shape (T) for a single model or (T x N) for N models (out if given).
+
+    """
+    times = datetime64(times)
+    basis = _cached_basis(constituents, times, nodal_interval, nodal_policy, dtype)
+    if basis is not None:
+        return _project(basis, harmonic_coefficients(amplitudes, phases), out)
+    arguments = _Arguments(constituents, times, nodal_interval, nodal_policy, scratch=scratch)
+    return _evaluate(arguments, np.asarray(amplitudes, dtype=float), d2r * np.asarray(phases, dtype=float), times,
+        max_bytes, anchor_interval, out, dtype)
+
+
+def _evaluate(arguments, amplitudes, phases, times, max_bytes, anchor_interval, out=None, dtype=float):
+    """Evaluate the water levels of amplitudes and phases (radians) for the equilibrium arguments of times.
+
+    The phases are evaluated in float64 and the basis, the coefficients and the water levels in dtype.
+    """
+    scratch = arguments.scratch
+    K = len(arguments.constituents)
+    T = arguments.days.size
+    dtype = _float_dtype(dtype)
+    shape = (T,) + amplitudes.shape[:-1]
+    if _output(out, shape, dtype):
+        water_level = out
+    elif out is None:
+        water_level = np.empty(shape, dtype=dtype)
+    else:
+        # e.g. a strided view: evaluate into a work buffer and copy
+        water_level = scratch.array('water_level', shape, dtype)
+
+    # node factors changing at every sample cannot be folded into the anchored coefficients
+    step = _uniform_step(times) if anchor_interval and K and arguments.policy != 'sample' else None
+    if step is not None:
+        _reconstruct_uniform(arguments, amplitudes, phases, step, anchor_interval, max_bytes, water_level)
+    elif amplitudes.ndim == 1:
+        # phases (K) per time
+        rows = max(1, int(max_bytes // (K * 8))) if K else None
+        weights = scratch.array('weights', (K,), dtype)
+        for index, arg, f in arguments.blocks(rows):
+            if kernels.enabled():
+                # fused phase offset, cosine and weighted sum of every row
+                if isinstance(index, slice):
+                    kernels.harmonic_sum(arg, phases, f, amplitudes, water_level[index])
+                else:
+                    water_level[index] = kernels.harmonic_sum(arg, phases, f, amplitudes,
+                        scratch.array('row_levels', index.shape, dtype))
+                continue
+            arg -= phases
+            cos = arg if dtype == arg.dtype else scratch.array('cos', arg.shape, dtype)
+            np.cos(arg, out=cos)
+            if f.ndim == 2:
+                cos *= f
+                weights[:] = amplitudes
+            else:
+                np.multiply(amplitudes, f, out=weights)
+            if isinstance(index, slice):
+                np.dot(cos, weights, out=water_level[index])
+            else:
+                water_level[index] = cos @ weights
+    else:
+        # phases (K) and basis (2K) per time
+        rows = max(1, int(max_bytes // (3 * K * 8))) if K else None
+        coefficients = harmonic_coefficients(amplitudes, np.rad2deg(phases)).T
+        scaled = scratch.array('scaled_coefficients', coefficients.shape, dtype)
+        for index, arg, f in arguments.blocks(rows):
+            b = scratch.array('basis', (arg.shape[0], 2 * K), dtype)
+            if kernels.enabled():
+                kernels.cos_sin(arg, f if f.ndim == 2 else None, b)
+            else:
+                np.cos(arg, out=b[:, :K])
+                np.sin(arg, out=b[:, K:])
+                if f.ndim == 2:
+                    b[:, :K] *= f
+                    b[:, K:] *= f
+            if f.ndim == 2:
+                scaled[...] = coefficients
+            else:
+                # apply the node factors of the partition to the coefficients rather than to every row of the basis
+                np.multiply(coefficients[:K], f[:, np.newaxis], out=scaled[:K])
+                np.multiply(coefficients[K:], f[:, np.newaxis], out=scaled[K:])
+            if isinstance(index, slice):
+                np.dot(b, scaled, out=water_level[index])
+            else:
+                water_level[index] = b @ scaled
+
+    if out is not None and water_level is not out:
+        out[...] = water_level
+        return out
+    return water_level
+
+
+def reconstruct_stream(constituents, amplitudes, phases, start, hours, step=1., chunk_hours=10 * NODAL_INTERVAL,
+        nodal_interval=NODAL_INTERVAL, max_bytes=BASIS_BYTES, nodal_policy=None, dtype=float):
+    """Generate the water levels of regularly spaced times in fixed-size chunks, in constant memory.
+
+    Each chunk is reconstructed independently, so its equilibrium arguments and node factors are refreshed at the
+    start of the chunk. Chunks spanning a multiple of nodal_interval hours keep the node factor partitions aligned.
+
+    Args:
+        constituents (list(str)): Constituent names.
+        amplitudes (ndarray(float)): Amplitude of each constituent (K), or of each constituent for each of N
+            models (N x K).
+        phases (ndarray(float)): Phase (degrees) of each constituent, same shape as amplitudes.
+        start (datetime64): First time (datetime, date or datetime64).
+        hours (float): Length of the series in hours (the end is excluded).
+        step (float, optional): Time step in hours, defaults to 1.
+        chunk_hours (float, optional): Hours spanned by each chunk, defaults to 2400.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        max_bytes (int, optional): Memory budget of the intermediate phase and basis arrays, defaults to 64 MiB.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES ('partition', 'sample', 'day'
+            or 'year'), defaults to config['nodal_policy'].
+        dtype (type, optional): Precision of the basis and the water levels, float64 (the default) or float32.
+
+    Yields:
+        A tuple of the ndarray(datetime64[ns]) times and the water levels, of shape (T) or (T x N), of each chunk.
+
+    """
+    start = np.datetime64(start, 'ns')
+    samples = int(np.ceil(hours / step))
+    chunk = max(1, int(round(chunk_hours / step)))
+    scratch = Scratch()
+    for i in range(0, samples, chunk):
+        times = start + np.arange(i, min(i + chunk, samples)) * _timedelta(step)
+        yield times, reconstruct(constituents, amplitudes, phases, times, nodal_interval, max_bytes,
+            nodal_policy=nodal_policy, scratch=scratch, dtype=dtype)
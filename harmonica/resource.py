@@ -1,5 +1,6 @@
 from harmonica import config
 from urllib.request import urlopen
+import numpy as np
 import os.path
 import string
 import xarray as xr
@@ -89,6 +90,12 @@ class ResourceManager(object):
         },
     }
     DEFAULT_RESOURCE = 'tpxo9'
+    # Subdirectory of a model's data directory holding its packed resources
+    PACKED_DIR = 'packed'
+    # Largest quantized magnitude of the packed int16 grids
+    PACKED_MAX = 32766
+    # Subdirectory of a model's data directory holding its downsampled pyramid levels
+    PYRAMID_DIR = 'pyramid'
 
     def __init__(self, model=DEFAULT_RESOURCE):
         if model not in self.RESOURCES:
@@ -96,11 +103,16 @@ class ResourceManager(object):
         self.model = model
         self.model_atts = self.RESOURCES[self.model]
         self.datasets = []
+        self.paths = []
 
 
     def __del__(self):
         for d in self.datasets:
-            d.close()
+            try:
+                d.close()
+            except Exception:
+                # e.g. at interpreter exit, when the netCDF library may already be finalized
+                pass
 
 
     def available_constituents(self):
@@ -108,6 +120,24 @@ class ResourceManager(object):
         return [c for sl in [grp.keys() for grp in self.model_atts['consts']] for c in sl]
 
 
+    def constituent_path(self, const, level=0):
+        """Return the absolute path of the file a constituent is read from by get_datasets.
+
+        The path identifies the data of the constituent (e.g. in the keys of the tile cache): it follows
+        config['data_dir'], config['pre_existing_data_dir'], config['packed'] and the pyramid level.
+        """
+        for grp in self.model_atts['consts']:
+            if const in grp:
+                if level:
+                    path = self.pyramid_path(grp[const], level)
+                elif config.get('packed') and os.path.exists(self.packed_path(grp[const])):
+                    path = self.packed_path(grp[const])
+                else:
+                    path = self._resource_path(grp[const])
+                return os.path.abspath(path)
+        raise ValueError('Constituent not recognized.')
+
+
     def get_units_multiplier(self):
         return self.model_atts['dataset_atts']['units_multiplier']
     
@@ -154,6 +184,119 @@ class ResourceManager(object):
                 self.download(r, resource_dir)
 
 
+    def packed_path(self, resource):
+        """Return the path of the packed copy of a model resource."""
+        return os.path.join(config['data_dir'], self.model, self.PACKED_DIR, resource)
+
+
+    def pack_model(self, tile_shape=(256, 256), complevel=1):
+        """Write a packed copy of the model's resources with hRe/hIm stored as scaled int16 tiles.
+
+        Each variable is quantized to int16 with scale_factor = max(|h|) / 32766 and stored in deflate compressed
+        (level complevel, byte shuffled) chunks of tile_shape. The packed files are used in place of the original
+        ones when config['packed'] is True and are decoded transparently (CF scale_factor) when read.
+
+        The quantization error of each hRe/hIm value is bounded by scale_factor / 2. Bilinear interpolation is a
+        convex combination, so the interpolated components keep that bound, the complex tide is off by at most
+        scale_factor / sqrt(2), and the amplitude error is at most scale_factor / sqrt(2) * units multiplier (about
+        2.2e-5 of the largest amplitude of the grid).
+
+        Args:
+            tile_shape (tuple(int, int), optional): Chunk shape of the packed grids along (x, y), defaults to
+                (256, 256).
+            complevel (int, optional): Deflate level, defaults to 1 (fastest).
+
+        Returns:
+            A dictionary per resource of the original and packed file sizes (bytes) and the quantization error bound
+                of hRe and hIm (in model units).
+
+        """
+        resources = set(r for sl in [grp.values() for grp in self.model_atts['consts']] for r in sl)
+        stats = {}
+        for r in sorted(resources):
+            src = self._resource_path(r)
+            dst = self.packed_path(r)
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            with xr.open_dataset(src, engine='netcdf4') as ds:
+                encoding = {}
+                for var in ('hRe', 'hIm'):
+                    vmax = float(abs(ds[var]).max())
+                    ndim = ds[var].ndim
+                    encoding[var] = {
+                        'dtype': 'int16',
+                        'scale_factor': (vmax / self.PACKED_MAX) or 1.,
+                        'add_offset': 0.,
+                        '_FillValue': np.iinfo(np.int16).min,
+                        'zlib': True,
+                        'complevel': complevel,
+                        'shuffle': True,
+                        'chunksizes': (1,) * (ndim - 2) + tuple(min(t, n) for t, n in
+                            zip(tile_shape, ds[var].shape[-2:])),
+                    }
+                ds.to_netcdf(dst, engine='netcdf4', encoding=encoding)
+            stats[r] = {
+                'bytes': os.path.getsize(src),
+                'packed_bytes': os.path.getsize(dst),
+                'hRe_error': encoding['hRe']['scale_factor'] / 2.,
+                'hIm_error': encoding['hIm']['scale_factor'] / 2.,
+            }
+        return stats
+
+
+    def pyramid_path(self, resource, level):
+        """Return the path of a downsampled pyramid level of a model resource."""
+        return os.path.join(config['data_dir'], self.model, self.PYRAMID_DIR, str(level), resource)
+
+
+    def build_pyramid(self, levels=3, factor=2):
+        """Build downsampled pyramid levels of every constituent grid for fast approximate queries.
+
+        Level n averages blocks of factor**n by factor**n grid cells of the full resolution grid (level 0). Land
+        cells (hRe and hIm both zero) are excluded from the averages; blocks without any water cell are land.
+
+        Args:
+            levels (int, optional): Number of downsampled levels to build, defaults to 3.
+            factor (int, optional): Downsampling factor between consecutive levels, defaults to 2.
+
+        Returns:
+            A dictionary per resource of the grid shape (nx, ny) of every level.
+
+        """
+        resources = set(r for sl in [grp.values() for grp in self.model_atts['consts']] for r in sl)
+        shapes = {}
+        for r in sorted(resources):
+            with xr.open_dataset(self._resource_path(r), engine='netcdf4') as ds:
+                wet = (ds.hRe != 0) | (ds.hIm != 0)
+                shapes[r] = [ds.hRe.shape[-2:]]
+                for level in range(1, levels + 1):
+                    window = {dim: factor ** level for dim in ('nx', 'ny') if dim in ds.dims}
+                    coarse = ds.drop_vars(['hRe', 'hIm']).coarsen(window, boundary='trim').mean()
+                    count = wet.coarsen(window, boundary='trim').sum()
+                    for var in ('hRe', 'hIm'):
+                        total = ds[var].where(wet, 0.).coarsen(window, boundary='trim').sum()
+                        coarse[var] = (total / count.where(count > 0)).fillna(0.).astype(np.float32)
+                    path = self.pyramid_path(r, level)
+                    if not os.path.isdir(os.path.dirname(path)):
+                        os.makedirs(os.path.dirname(path))
+                    coarse.to_netcdf(path, engine='netcdf4')
+                    shapes[r].append(coarse.hRe.shape[-2:])
+        return shapes
+
+
+    def _resource_path(self, resource):
+        """Return the path of an original model resource, downloading it if necessary."""
+        if config['pre_existing_data_dir']:
+            path = os.path.join(config['pre_existing_data_dir'], self.model, resource)
+            if os.path.exists(path):
+                return path
+        resource_dir = os.path.join(config['data_dir'], self.model)
+        path = os.path.join(resource_dir, resource)
+        if not os.path.exists(path):
+            self.download(resource, resource_dir)
+        return path
+
+
     def remove_model(self):
         """Remove all of the model's resources."""
         resource_dir = os.path.join(config['data_dir'], self.model)
@@ -163,17 +306,37 @@ class ResourceManager(object):
             shutil.rmtree(resource_dir, ignore_errors=True)
 
 
-    def get_datasets(self, constituents):
-        """Returns a list of xarray datasets."""
+    def get_datasets(self, constituents, level=0):
+        """Returns a list of xarray datasets; the files opened for each dataset are listed in self.paths.
+
+        Args:
+            constituents (list(str)): Constituents to open.
+            level (int, optional): Pyramid level of the grids, 0 (the default) for the full resolution grids and n
+                for the grids downsampled by build_pyramid.
+
+        """
         available = self.available_constituents()
         if any(const not in available for const in constituents):
             raise ValueError('Constituent not recognized.')
         # handle compatiable files together
         self.datasets = []
+        self.paths = []
         for const_group in self.model_atts['consts']:
             rsrcs = set(const_group[const] for const in set(constituents) & set(const_group))
 
+            if level and rsrcs:
+                paths = sorted(self.pyramid_path(r, level) for r in rsrcs)
+                if not all(os.path.exists(p) for p in paths):
+                    raise ValueError('Pyramid level {} of model {} has not been built.'.format(level, self.model))
+                self.datasets.append(xr.open_mfdataset(paths, engine='netcdf4', combine='nested', concat_dim='nc'))
+                self.paths.append(paths)
+                continue
+
             paths = set()
+            if config.get('packed'):
+                packed = set(r for r in rsrcs if os.path.exists(self.packed_path(r)))
+                paths.update(self.packed_path(r) for r in packed)
+                rsrcs = rsrcs - packed
             if (config['pre_existing_data_dir']):
                 missing = set()
                 for r in rsrcs:
@@ -181,7 +344,9 @@ class ResourceManager(object):
                     paths.add(path) if os.path.exists(path) else missing.add(r)
                 rsrcs = missing
                 if not rsrcs and paths:
-                    self.datasets.append(xr.open_mfdataset(paths, engine='netcdf4', concat_dim='nc'))
+                    paths = sorted(paths)
+                    self.datasets.append(xr.open_mfdataset(paths, engine='netcdf4', combine='nested', concat_dim='nc'))
+                    self.paths.append(paths)
                     continue
 
             resource_dir = os.path.join(config['data_dir'], self.model)
@@ -192,6 +357,8 @@ class ResourceManager(object):
                 paths.add(path)
 
             if paths:
-                self.datasets.append(xr.open_mfdataset(paths, engine='netcdf4', concat_dim='nc'))
+                paths = sorted(paths)
+                self.datasets.append(xr.open_mfdataset(paths, engine='netcdf4', combine='nested', concat_dim='nc'))
+                self.paths.append(paths)
 
         return self.datasets
\ No newline at end of file
@@ -0,0 +1,221 @@
+from . import nodal
+from .astronomy import datetime64
+from .cache import LRUCache
+from .reconstruction import _timedelta
+import numpy as np
+
+# Default number of samples of the blocks computed at once
+BLOCK_SIZE = 4096
+
+# Default byte budget of the computed blocks kept by a series
+CACHE_BYTES = 16 * 2**20
+
+# Fraction of the samples of a block below which the requested samples are evaluated alone
+SPARSE_FRACTION = 1 / 16.
+
+
+class TideSeries(object):
+    """Water levels of a predictor at a series of times, computed on demand.
+
+    Nothing is evaluated up front: indexing the series (with an integer, a slice, an integer or boolean array, or
+    timestamps) evaluates the blocks of block_size samples holding the requested positions, and keeps the most recently
+    used blocks in a small LRU cache, so that a long series (e.g. ten years of minutes) can be sliced arbitrarily for
+    the cost of the samples actually read. Samples requested sparsely (less than 1/16 of a block not already cached) are
+    evaluated alone. Every block is predicted from its own first time (see parallel.predict_parallel), sparse samples
+    included, so the values of a position do not depend on the order of the requests (beyond the 1e-13 relative
+    differences of the reconstruction paths).
+
+    Example:
+        series = TideSeries.regular(predictor, '2020-01-01', 10 * 8766., 1 / 60.)
+        values = series[positions]
+        time, height = series.max('2024-03-01', '2024-03-08')
+    """
+
+    def __init__(self, predictor, times, block_size=BLOCK_SIZE, cache_bytes=CACHE_BYTES):
+        """Create the series of a predictor at arbitrary times.
+
+        Args:
+            predictor (TidePredictor): Compiled harmonic model of one or more locations.
+            times (ndarray(datetime64)): Times of the series, as datetime64 values, int64 nanoseconds since the Unix
+                epoch or datetime objects.
+            block_size (int, optional): Number of samples computed at once, defaults to 4096.
+            cache_bytes (int, optional): Byte budget of the cached blocks, defaults to 16 MiB.
+
+        """
+        if block_size < 1:
+            raise ValueError('The block size must be positive.')
+        self.predictor = predictor
+        self.block_size = int(block_size)
+        self.cache = LRUCache(cache_bytes)
+        self._times = datetime64(times).ravel()
+        self._start = self._step = None
+        self.size = self._times.size
+
+
+    @classmethod
+    def regular(cls, predictor, start, hours, step=1., block_size=BLOCK_SIZE, cache_bytes=CACHE_BYTES):
+        """Create the series of a predictor at regularly spaced times, without storing the times.
+
+        Args:
+            predictor (TidePredictor): Compiled harmonic model of one or more locations.
+            start (datetime64): First time (datetime, date or datetime64).
+            hours (float): Length of the series in hours (the end is excluded).
+            step (float, optional): Time step in hours, defaults to 1.
+            block_size (int, optional): Number of samples computed at once, defaults to 4096.
+            cache_bytes (int, optional): Byte budget of the cached blocks, defaults to 16 MiB.
+
+        Returns:
+            A TideSeries.
+
+        """
+        series = cls(predictor, np.array([], dtype='datetime64[ns]'), block_size, cache_bytes)
+        series._times = None
+        series._start = np.datetime64(start, 'ns')
+        series._step = _timedelta(step)
+        series.size = int(np.ceil(hours / step))
+        return series
+
+
+    def __len__(self):
+        return self.size
+
+
+    def __getitem__(self, key):
+        """Return the water levels at positions (integer, slice, integer or boolean array) or at timestamps.
+
+        Timestamps (datetime64 values, datetime objects or ISO 8601 strings such as '2020-01-01T06:00', alone or in a
+        list or array) are points in time, predicted directly (see at); they need not be times of the series.
+        """
+        if not isinstance(key, slice) and np.asarray(key).dtype.kind in 'MOSU':
+            return self.at(key)[()]
+        positions = self._positions(key)
+        return self._values(positions.ravel()).reshape(positions.shape + self.predictor.amplitudes.shape[:-1])[()]
+
+
+    def _positions(self, key):
+        """Return the positions of an index as an int64 array (a 0-d array for an integer)."""
+        if isinstance(key, slice):
+            return np.arange(*key.indices(self.size), dtype=np.int64)
+        key = np.asarray(key)
+        if key.dtype == bool:
+            if key.shape != (self.size,):
+                raise IndexError('A boolean index must have one value per sample.')
+            return np.flatnonzero(key)
+        if key.dtype.kind not in 'iu':
+            raise IndexError('Series are indexed by integers, slices, integer or boolean arrays, or timestamps.')
+        positions = key.astype(np.int64)
+        if np.any((positions < -self.size) | (positions >= self.size)):
+            raise IndexError('Index out of range for a series of {} samples.'.format(self.size))
+        return np.where(positions < 0, positions + self.size, positions)
+
+
+    def timestamps(self, key=np.s_[:]):
+        """Return the datetime64[ns] times of positions (integer, slice, integer or boolean array) of the series."""
+        positions = self._positions(key)
+        if self._times is not None:
+            return self._times[positions]
+        return self._start + positions * self._step
+
+
+    def block(self, number):
+        """Return the water levels of a block of samples, from the cache or computed and cached.
+
+        Args:
+            number (int): Block number; block n holds the samples n block_size to (n + 1) block_size - 1.
+
+        Returns:
+            A read-only ndarray of the water levels of the block.
+
+        """
+        values = self.cache.get(number)
+        if values is None:
+            start = number * self.block_size
+            values = self.predictor.predict(self.timestamps(np.s_[start:min(start + self.block_size, self.size)]))
+            values.flags.writeable = False
+            self.cache.put(number, values)
+        return values
+
+
+    def _values(self, positions):
+        """Gather the water levels of positions from their blocks."""
+        values = np.empty(positions.shape + self.predictor.amplitudes.shape[:-1], dtype=self.predictor.dtype)
+        if not positions.size:
+            return values
+        blocks = positions // self.block_size
+        for index, first in nodal._group(blocks):
+            number = blocks[first]
+            offsets = positions[index] - number * self.block_size
+            if offsets.size < SPARSE_FRACTION * self.block_size and number not in self.cache:
+                # evaluate the samples alone, from the first time of their block
+                values[index] = self.predictor.predict(self.timestamps(positions[index]),
+                    epoch=self.timestamps(number * self.block_size))
+            else:
+                values[index] = self.block(number)[offsets]
+        return values
+
+
+    def at(self, times):
+        """Return the water levels at arbitrary timestamps, predicted directly (without the block cache).
+
+        Args:
+            times (ndarray(datetime64)): Times, as datetime64 values, int64 nanoseconds since the Unix epoch,
+                datetime objects or ISO 8601 strings.
+
+        Returns:
+            An ndarray of the water levels, of shape times.shape for one location or times.shape + (N,) for N
+                locations.
+
+        """
+        times = datetime64(times)
+        values = self.predictor.predict(times.ravel())
+        return values.reshape(times.shape + values.shape[1:])
+
+
+    def max(self, start=None, end=None):
+        """Return the time and height of the highest water of a window, see extreme."""
+        return self.extreme(start, end, True)
+
+
+    def min(self, start=None, end=None):
+        """Return the time and height of the lowest water of a window, see extreme."""
+        return self.extreme(start, end, False)
+
+
+    def extreme(self, start=None, end=None, high=True):
+        """Return the time and height of the highest or lowest water of a window.
+
+        The extremum is that of the continuous tide over [start, end], found among the high (or low) waters of the
+        window (see TidePredictor.high_low) and the water levels at its two ends, without evaluating the samples of
+        the series within the window.
+
+        Args:
+            start (datetime64, optional): Start of the window, defaults to the first time of the series.
+            end (datetime64, optional): End of the window, defaults to the last time of the series.
+            high (bool, optional): Whether to find the highest (True, the default) or the lowest water.
+
+        Returns:
+            A tuple of the time and height of the extremum, datetime64 and float for one location or ndarrays (N) for
+                N locations.
+
+        """
+        if start is None or end is None:
+            if not self.size:
+                raise ValueError('The window of an empty series must be given.')
+            times = self._times if self._times is not None else self.timestamps(np.array([0, self.size - 1]))
+            start = times.min() if start is None else start
+            end = times.max() if end is None else end
+        start, end = np.datetime64(start, 'ns'), np.datetime64(end, 'ns')
+        if end < start:
+            raise ValueError('The end of the window must not precede its start.')
+
+        times, heights, highs, model = self.predictor.high_low(start, (end - start).astype(np.int64) / 3600e9)
+        shape = self.predictor.amplitudes.shape[:-1]
+        N = int(np.prod(shape))
+        select = highs == high
+        # candidates are the extrema and the two ends of the window, for every location
+        t = np.concatenate([np.repeat(np.array([start, end]), N), times[select]])
+        h = np.concatenate([self.at(np.array([start, end])).reshape(2 * N).astype(float), heights[select]])
+        m = np.concatenate([np.tile(np.arange(N), 2), model[select]])
+        order = np.lexsort((-h if high else h, m))
+        best = order[np.r_[True, m[order][1:] != m[order][:-1]]]
+        return t[best].reshape(shape)[()], h[best].reshape(shape)[()]
@@ -1,5 +1,6 @@
+from .cache import default_tile_cache
+from .planner import ReadPlan, chunk_shape
 from .resource import ResourceManager
-from bisect import bisect
 import os
 import numpy as np
 import pandas as pd
@@ -61,7 +62,43 @@ class Constituents:
         self.data = pd.DataFrame(columns=['amplitude', 'phase', 'speed'])
 
 
-    def get_components(self, loc, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False):
+    @staticmethod
+    def _model_name(model):
+        """Return the normalized (lower case) model name."""
+        model = model.lower()
+        if model == 'tpxo7_2':
+            model = 'tpxo7'
+        return model
+
+
+    @staticmethod
+    def _prepare_dataset(d):
+        """Normalize the coordinate dimensions of a model dataset and return its constituent names."""
+        # remove unnecessary data array dimensions if present (e.g. tpxo7.2)
+        if 'nx' in d.lat_z.dims:
+            d['lat_z'] = d.lat_z.sel(nx=0, drop=True)
+        if 'ny' in d.lon_z.dims:
+            d['lon_z'] = d.lon_z.sel(ny=0, drop=True)
+        # get the dataset constituent name array from data cube
+        return [x.tostring().decode('utf-8').strip().upper() for x in d.con.values]
+
+
+    @staticmethod
+    def _interpolate(plan, d, con, path, c, dtype=float):
+        """Interpolate the complex tide of a constituent at the planned points, reading through the tile cache.
+
+        The tide is complex128, or complex64 for a float32 dtype.
+        """
+        cache = default_tile_cache()
+        re = plan.interpolate(d.hRe, (con,), cache, (path, c, 'hRe'), dtype)
+        im = plan.interpolate(d.hIm, (con,), cache, (path, c, 'hIm'), dtype)
+        h = np.empty(re.shape, dtype=np.result_type(re.dtype, np.complex64))
+        h.real = re
+        h.imag = -im
+        return h
+
+
+    def get_components(self, loc, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False, level=0):
         """Query the a tide model database and return amplitude, phase and speed for a location.
 
         Currently written to query tpxo7, tpxo8, and tpxo9 tide models.
@@ -72,6 +109,8 @@ class Constituents:
             cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
             positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
                 [-180 180] (False, the default).
+            level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+                or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
 
         Returns:
             A dataframe of constituent information including amplitude (meters), phase (degrees) and
@@ -79,10 +118,7 @@ class Constituents:
                 
         """
 
-        # ensure lower case
-        model = model.lower()
-        if model == 'tpxo7_2':
-            model = 'tpxo7'
+        model = self._model_name(model)
 
         lat, lon = loc
         # check the phase of the longitude
@@ -94,38 +130,14 @@ class Constituents:
         if cons is None or not len(cons):
             cons = resources.available_constituents()
         # open the netcdf database(s)
-        for d in resources.get_datasets(cons):
-            # remove unnecessary data array dimensions if present (e.g. tpxo7.2)
-            if 'nx' in d.lat_z.dims:
-                d['lat_z'] = d.lat_z.sel(nx=0, drop=True)
-            if 'ny' in d.lon_z.dims:
-                d['lon_z'] = d.lon_z.sel(ny=0, drop=True)
-            # get the dataset constituent name array from data cube
-            nc_names = [x.tostring().decode('utf-8').strip().upper() for x in d.con.values]
+        for d in resources.get_datasets(cons, level):
+            nc_names = self._prepare_dataset(d)
             for c in set(cons) & set(nc_names):
-                # get constituent and bounding indices within the data cube
-                idx = {'con': nc_names.index(c)}
-                idx['top'] = bisect(d.lat_z[idx['con']], lat)
-                idx['right'] = bisect(d.lon_z[idx['con']], lon)
-                idx['bottom'] = idx['top'] - 1
-                idx['left'] = idx['right'] - 1
-                # get distance from the bottom left to the requested point
-                dx = (lon - d.lon_z.values[idx['con'], idx['left']]) / \
-                     (d.lon_z.values[idx['con'], idx['right']] - d.lon_z.values[idx['con'], idx['left']])
-                dy = (lat - d.lat_z.values[idx['con'], idx['bottom']]) / \
-                     (d.lat_z.values[idx['con'], idx['top']] - d.lat_z.values[idx['con'], idx['bottom']])
-                # calculate weights for bilinear spline
-                weights = np.array([
-                    (1. - dx) * (1. - dy),  # w00 :: bottom left
-                    (1. - dx) * dy,         # w01 :: bottom right
-                    dx * (1. - dy),         # w10 :: top left
-                    dx * dy                 # w11 :: top right
-                ]).reshape((2,2))
-                weights = weights / weights.sum()
-                # devise the slice to subset surrounding values
-                query = np.s_[idx['con'], idx['left']:idx['right']+1, idx['bottom']:idx['top']+1]
+                con = nc_names.index(c)
+                # plan the read of the bilinear stencil surrounding the requested point
+                plan = ReadPlan([lat], [lon], d.lat_z.values[con], d.lon_z.values[con], tile_shape=chunk_shape(d.hRe))
                 # calculate the weighted tide from real and imaginary components
-                h = np.complex((d.hRe.values[query] * weights).sum(), -(d.hIm.values[query] * weights).sum())
+                h = self._interpolate(plan, d, con, resources.constituent_path(c, level), c)[0]
                 # get the phase and amplitude
                 ph = np.angle(h, deg=True)
                 # place info into data table
@@ -138,4 +150,84 @@ class Constituents:
                     self.NOAA_SPEEDS[c]
                 ]
 
-        return self
\ No newline at end of file
+        return self
+
+
+    def get_batch_components(self, locs, model=ResourceManager.DEFAULT_RESOURCE, cons=[], positive_ph=False,
+            level=0, dtype=float):
+        """Query a tide model database and return amplitude, phase and speed for a batch of locations.
+
+        The interpolation stencils of all locations are read with a locality-aware ReadPlan, so scattered batches
+        result in a small number of near-sequential hyperslab reads per constituent. With dtype=float32 the stencils
+        are interpolated in float32 and the amplitudes and phases are float32, which halves the memory of large
+        batches (the model constants themselves are stored with about 7 significant digits).
+
+        Args:
+            locs (ndarray(float)): Array of shape (npoints, 2) of latitude [-90, 90] and longitude [-180 180] or
+                [0 360] of the requested points.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            positive_ph (bool, optional): Indicate if the returned phase should be all positive [0 360] (True) or
+                [-180 180] (False, the default).
+            level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+                or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+            dtype (type, optional): Precision of the interpolation and of the amplitudes and phases, float64 (the
+                default) or float32.
+
+        Returns:
+            A dataframe of constituent information including amplitude (meters), phase (degrees) and
+                speed (degrees/hour, UTC/GMT) indexed by point (position in locs) and constituent
+
+        """
+        model = self._model_name(model)
+        locs = np.asarray(locs, dtype=float).reshape((-1, 2))
+        lat = locs[:, 0]
+        # check the phase of the longitude
+        lon = np.where(locs[:, 1] < 0, locs[:, 1] + 360., locs[:, 1])
+        points = np.arange(len(locs))
+
+        resources = ResourceManager(model=model)
+        # if no constituents were requested, return all available
+        if cons is None or not len(cons):
+            cons = resources.available_constituents()
+        frames = []
+        # open the netcdf database(s)
+        for d in resources.get_datasets(cons, level):
+            nc_names = self._prepare_dataset(d)
+            plan = None
+            for c in sorted(set(cons) & set(nc_names)):
+                con = nc_names.index(c)
+                # constituents of a dataset share a grid, so the reads only need to be planned once
+                if plan is None:
+                    plan = ReadPlan(lat, lon, d.lat_z.values[con], d.lon_z.values[con], tile_shape=chunk_shape(d.hRe))
+                # calculate the weighted tide from real and imaginary components
+                h = self._interpolate(plan, d, con, resources.constituent_path(c, level), c, dtype)
+                # get the phase and amplitude
+                ph = np.angle(h, deg=True)
+                frames.append(pd.DataFrame({
+                    'amplitude': (np.absolute(h) * resources.get_units_multiplier()).astype(h.real.dtype),
+                    'phase': (ph + np.where(positive_ph & (ph < 0), 360., 0.)).astype(h.real.dtype),
+                    'speed': self.NOAA_SPEEDS[c],
+                }, index=pd.MultiIndex.from_arrays([points, [c] * len(points)], names=['point', 'constituent']),
+                    columns=['amplitude', 'phase', 'speed']))
+
+        self.data = pd.concat(frames).sort_index() if frames else pd.DataFrame(columns=['amplitude', 'phase', 'speed'])
+
+        return self
+
+
+    def harmonic_constants(self):
+        """Return the constituent names, amplitudes and phases of the current data as arrays.
+
+        Returns:
+            A tuple of the list of the K constituent names and the amplitude (meters) and phase (degrees) arrays,
+                of shape (K) for single point data or (N x K) for the N points of get_batch_components data.
+                Constituents missing at a point have a zero amplitude.
+
+        """
+        if isinstance(self.data.index, pd.MultiIndex):
+            amplitudes = self.data.amplitude.astype(float).unstack('constituent')
+            phases = self.data.phase.astype(float).unstack('constituent').reindex_like(amplitudes)
+            return list(amplitudes.columns), amplitudes.fillna(0.).values, phases.fillna(0.).values
+        return list(self.data.index.values), self.data.amplitude.values.astype(float), \
+            self.data.phase.values.astype(float)
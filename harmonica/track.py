@@ -0,0 +1,173 @@
+from . import kernels
+from .astronomy import datetime64
+from .cache import default_tile_cache
+from .nodal import NODAL_INTERVAL
+from .planner import ReadPlan, bilinear_stencils, chunk_shape
+from .reconstruction import BASIS_BYTES, _Arguments, _float_dtype
+from .resource import ResourceManager
+from .tidal_constituents import Constituents
+import numpy as np
+
+
+class TrackConstants(object):
+    """Harmonic constants along a track of samples, each with its own location.
+
+    The constants are not interpolated for every sample up front: the 2x2 stencils of the grid cells touched by the
+    track are read once per cell, and the samples keep the index of their cell and their bilinear weights. The
+    constants of a block of samples are interpolated on demand (see constants), so a track of millions of samples
+    only holds a few values per sample.
+    """
+
+    def __init__(self, constituents, groups, size):
+        """Create the constants of a track.
+
+        Args:
+            constituents (list(str)): Constituent names.
+            groups (list(tuple)): (columns, cell of each sample, (T x 4) weights, (cells x 4 x 2 columns) stencils
+                of the real and imaginary parts of the constants) of each model grid, where columns are the
+                positions of the grid's constituents.
+            size (int): Number of samples of the track.
+
+        """
+        self.constituents = list(constituents)
+        self.groups = groups
+        self.size = size
+
+
+    @classmethod
+    def extract(cls, lat, lon, model=ResourceManager.DEFAULT_RESOURCE, cons=[], level=0, dtype=float):
+        """Read the constants of the grid cells touched by a track from a tide model database.
+
+        Args:
+            lat (ndarray(float)): Latitude [-90, 90] of each sample.
+            lon (ndarray(float)): Longitude [-180 180] or [0 360] of each sample.
+            model (str, optional): Model name, defaults to 'tpxo9'.
+            cons (list(str), optional): List of constituents requested, defaults to all constituents if None or empty.
+            level (int, optional): Level of detail of the model grids, 0 (the default) for the full resolution grids
+                or n for the downsampled grids of ResourceManager.build_pyramid (faster, approximate).
+            dtype (type, optional): Precision of the stencils, float64 (the default) or float32, which halves their
+                memory and that of the interpolated coefficients.
+
+        Returns:
+            A TrackConstants.
+
+        """
+        model = Constituents._model_name(model)
+        dtype = _float_dtype(dtype)
+        lat = np.asarray(lat, dtype=float).ravel()
+        lon = np.asarray(lon, dtype=float).ravel()
+        if lat.shape != lon.shape:
+            raise ValueError('Latitudes and longitudes must have the same shape.')
+        # check the phase of the longitude
+        lon = np.where(lon < 0, lon + 360., lon)
+
+        resources = ResourceManager(model=model)
+        if cons is None or not len(cons):
+            cons = resources.available_constituents()
+        cache = default_tile_cache()
+        constituents = []
+        groups = []
+        for d in resources.get_datasets(cons, level):
+            nc_names = Constituents._prepare_dataset(d)
+            names = sorted(set(cons) & set(nc_names))
+            if not names:
+                continue
+            stencils = None
+            for c in names:
+                con = nc_names.index(c)
+                if stencils is None:
+                    # constituents of a dataset share a grid: locate the samples and plan the reads of their cells once
+                    lat_grid, lon_grid = d.lat_z.values[con], d.lon_z.values[con]
+                    left, bottom, weights = bilinear_stencils(lat, lon, lat_grid, lon_grid)
+                    cells, inverse = np.unique(left.astype(np.int64) * lat_grid.size + bottom, return_inverse=True)
+                    x, y = np.divmod(cells, lat_grid.size)
+                    plan = ReadPlan(lat_grid[y], lon_grid[x], lat_grid, lon_grid, tile_shape=chunk_shape(d.hRe))
+                    stencils = np.empty((cells.size, 4, 2 * len(names)), dtype=dtype)
+                path = resources.constituent_path(c, level)
+                i = names.index(c)
+                # the tide is hRe - i hIm, as in Constituents
+                stencils[:, :, i] = plan.read(d.hRe, (con,), cache, (path, c, 'hRe'), dtype).reshape((-1, 4))
+                stencils[:, :, len(names) + i] = -plan.read(d.hIm, (con,), cache, (path, c, 'hIm'), dtype).reshape(
+                    (-1, 4))
+            stencils *= resources.get_units_multiplier()
+            columns = np.arange(len(constituents), len(constituents) + len(names))
+            constituents.extend(names)
+            groups.append((columns, inverse.ravel(), weights.reshape((-1, 4)).astype(dtype), stencils))
+        return cls(constituents, groups, lat.size)
+
+
+    def coefficients(self, index=np.s_[:]):
+        """Interpolate the basis coefficients [A cos(g), A sin(g)] (see reconstruction.harmonic_coefficients) of a
+        block of samples.
+
+        Args:
+            index (slice or ndarray(int), optional): Samples of the block, defaults to all samples.
+
+        Returns:
+            An ndarray (rows x 2K) of the coefficients, in the precision of the stencils.
+
+        """
+        K = len(self.constituents)
+        coefficients = None
+        for columns, inverse, weights, stencils in self.groups:
+            if kernels.enabled():
+                cells = inverse[index]
+                values = kernels.stencil_interpolate(weights[index], stencils, cells,
+                    np.empty((cells.size, stencils.shape[2]), dtype=stencils.dtype))
+            else:
+                values = np.einsum('ij,ijk->ik', weights[index], stencils[inverse[index]])
+            if len(self.groups) == 1:
+                return values
+            if coefficients is None:
+                coefficients = np.zeros((values.shape[0], 2 * K), dtype=values.dtype)
+            coefficients[:, np.r_[columns, columns + K]] = values
+        return coefficients
+
+
+def reconstruct_track(track, times, nodal_interval=NODAL_INTERVAL, max_bytes=BASIS_BYTES, nodal_policy=None):
+    """Evaluate the water level of every sample of a track at its own location and time.
+
+    The samples are evaluated in blocks sized to respect max_bytes: the coefficients of a block are interpolated
+    from the stencils of its cells and combined with the cos/sin basis and node factors of its times in a single
+    element-wise pass, h = sum_k f_k (A_k cos(g_k) cos(V_k + u_k) + A_k sin(g_k) sin(V_k + u_k)). The phases are
+    evaluated in float64 and the basis, coefficients and water levels in the precision of the track's stencils.
+
+    Args:
+        track (TrackConstants): Constants of the track samples.
+        times (ndarray(datetime64)): Time of each sample, as datetime64 values, int64 nanoseconds since the Unix
+            epoch or datetime objects.
+        nodal_interval (float, optional): Hours over which the node factors are constant, defaults to 240.
+        max_bytes (int, optional): Memory budget of the intermediate arrays of a block, defaults to 64 MiB.
+        nodal_policy (str, optional): Node factor update policy, one of nodal.POLICIES, defaults to
+            config['nodal_policy'].
+
+    Returns:
+        An ndarray of the water level of each sample.
+
+    """
+    times = datetime64(times).ravel()
+    if times.size != track.size:
+        raise ValueError('Times must have one value per track sample.')
+    K = len(track.constituents)
+    dtype = track.groups[0][3].dtype if track.groups else np.dtype(float)
+    water_level = np.zeros(times.size, dtype=dtype)
+    if not K:
+        return water_level
+    arguments = _Arguments(track.constituents, times, nodal_interval, nodal_policy)
+    # phases, basis, coefficients and interpolated stencils per sample
+    rows = max(1, int(max_bytes // (K * (8 + 6 * dtype.itemsize))))
+    for index, arg, f in arguments.blocks(rows):
+        coefficients = track.coefficients(index)
+        if kernels.enabled():
+            if isinstance(index, slice):
+                kernels.track_sum(arg, f, coefficients, water_level[index])
+            else:
+                water_level[index] = kernels.track_sum(arg, f, coefficients, np.empty(arg.shape[0], dtype=dtype))
+            continue
+        coefficients[:, :K] *= f
+        coefficients[:, K:] *= f
+        basis = arguments.scratch.array('basis', (arg.shape[0], 2 * K), dtype)
+        np.cos(arg, out=basis[:, :K])
+        np.sin(arg, out=basis[:, K:])
+        water_level[index] = np.einsum('ij,ij->i', coefficients, basis)
+    return water_level
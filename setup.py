@@ -9,6 +9,7 @@ if version_dict['error']:
 
 install_requires = [
     'argparse',
+    'dask',
     'pytides',
     'netCDF4',
     'numpy',
@@ -20,7 +21,12 @@ extras_require = {
     'build' : [
         'setuptools',
     ],
-    'tests' : [],
+    'numba' : [
+        'numba',
+    ],
+    'tests' : [
+        'pytest',
+    ],
 }
 
 extras_require['all'] = sorted(set(sum(extras_require.values(), [])))
@@ -29,6 +35,7 @@ entry_points = [
     'harmonica = harmonica.cli.main:main',
     'harmonica-constituents = harmonica.cli.main_constituents:main',
     'harmonica-deconstruct = harmonica.cli.main_deconstruct:main',
+    'harmonica-detide = harmonica.cli.main_detide:main',
     'harmonica-reconstruct = harmonica.cli.main_reconstruct:main',
     'harmonica-resources = harmonica.cli.main_resources:main',
 ]
@@ -60,8 +67,9 @@ setup(
         'Natural Language :: English',
         'Topic :: Scientific/Engineering'
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
     ],
-    python_requires="!=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*"
+    python_requires=">=3.6"
 )
@@ -0,0 +1,63 @@
+from harmonica import config
+from harmonica.resource import ResourceManager
+import os
+import shutil
+import numpy as np
+import pytest
+import xarray as xr
+
+
+@pytest.fixture(scope='session')
+def cache_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('cache'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(monkeypatch, cache_dir):
+    """Run every test without the shared basis cache, so that every reconstruction evaluates its own path, and with
+    the generated tables in a temporary directory."""
+    monkeypatch.setitem(config, 'basis_cache_bytes', 0)
+    monkeypatch.setitem(config, 'cache_dir', cache_dir)
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory):
+    """Write synthetic, smoothly varying tpxo9 and tpxo7 models on a 2.5 x 2.5 degree grid into a data directory.
+
+    The constituents of a model are in a single file; the two models have different constituents and constants."""
+    data_dir = str(tmp_path_factory.mktemp('data'))
+    lon = np.arange(0., 360., 2.5)
+    lat = np.arange(-90., 90.1, 2.5)
+    x, y = np.meshgrid(np.deg2rad(lon), np.deg2rad(lat), indexing='ij')
+    for m, model in enumerate(('tpxo9', 'tpxo7')):
+        resources = ResourceManager(model)
+        constituents = resources.available_constituents()
+        path = os.path.join(data_dir, model, resources.model_atts['consts'][0][constituents[0]])
+        os.makedirs(os.path.dirname(path))
+        K = len(constituents)
+        h = np.array([(k + 1) / K * np.cos(y) * np.exp(1j * ((k % 3 + 1) * x + (m + 1) * y + k)) for k in range(K)])
+        xr.Dataset({
+            'con': (('nc', 'nct'), np.array([list(c.lower().ljust(4)) for c in constituents], dtype='S1')),
+            'lon_z': (('nc', 'nx'), np.tile(lon, (K, 1))),
+            'lat_z': (('nc', 'ny'), np.tile(lat, (K, 1))),
+            'hRe': (('nc', 'nx', 'ny'), h.real),
+            'hIm': (('nc', 'nx', 'ny'), -h.imag),
+        }).to_netcdf(path, engine='netcdf4')
+    return data_dir
+
+
+@pytest.fixture
+def tpxo9(monkeypatch, model_dir):
+    """Use the synthetic tpxo9 model as the model data."""
+    monkeypatch.setitem(config, 'data_dir', model_dir)
+    monkeypatch.setitem(config, 'pre_existing_data_dir', '')
+    return 'tpxo9'
+
+
+@pytest.fixture
+def tpxo9_copy(monkeypatch, model_dir, tmp_path):
+    """Use a copy of the synthetic tpxo9 model in a temporary data directory, where derived files can be written."""
+    shutil.copytree(os.path.join(model_dir, 'tpxo9'), os.path.join(str(tmp_path), 'tpxo9'))
+    monkeypatch.setitem(config, 'data_dir', str(tmp_path))
+    monkeypatch.setitem(config, 'pre_existing_data_dir', '')
+    return 'tpxo9'
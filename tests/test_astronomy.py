@@ -0,0 +1,36 @@
+from datetime import datetime
+from harmonica import astronomy
+from pytides.astro import astro
+import pytides.constituent as pycons
+import numpy as np
+
+NAMES = [c.name.upper() for c in pycons.noaa]
+
+
+def angle_difference(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180.) % 360. - 180.)
+
+
+def test_vuf_matches_pytides():
+    times = [datetime(1995, 7, 1), datetime(2020, 3, 4, 5), datetime(2041, 12, 31, 23, 30)]
+    V, u, f, speeds = astronomy.vuf(NAMES, np.array(times, dtype='datetime64[ns]'))
+    assert V.shape == u.shape == f.shape == speeds.shape == (len(NAMES), len(times))
+    for j, t in enumerate(times):
+        a = astro(t)
+        assert angle_difference(V[:, j], [c.V(a) for c in pycons.noaa]).max() < 1e-6
+        assert angle_difference(u[:, j], [c.u(a) for c in pycons.noaa]).max() < 1e-9
+        np.testing.assert_allclose(f[:, j], [c.f(a) for c in pycons.noaa], rtol=1e-12)
+        np.testing.assert_allclose(speeds[:, j], [c.speed(a) for c in pycons.noaa], rtol=1e-12)
+
+
+def test_vuf_matches_equilibrium_arguments():
+    times = np.array(['2010-01-01', '2010-01-01T06:30', '2030-08-15'], dtype='datetime64[ns]')
+    V, u, f, speeds = astronomy.vuf(NAMES, times)
+    node_f, node_u = astronomy.node_factors(NAMES, times)
+    np.testing.assert_array_equal(f, node_f)
+    np.testing.assert_array_equal(u, node_u)
+    for j, t in enumerate(times):
+        V0, speed = astronomy.equilibrium_arguments(NAMES, t)
+        assert angle_difference(V[:, j], V0).max() < 1e-9
+        np.testing.assert_array_equal(astronomy.speeds(NAMES, t), speed)
+        np.testing.assert_allclose(speeds[:, j], speed, rtol=1e-15)
@@ -0,0 +1,109 @@
+from harmonica import config
+from harmonica.cache import LRUCache, TileCache
+from harmonica.resource import ResourceManager
+from harmonica.tidal_constituents import Constituents
+import os
+import threading
+import numpy as np
+import xarray as xr
+
+
+class SlowGrid(object):
+    """Grid counting its reads, whose first read blocks until released."""
+
+    def __init__(self, values):
+        self.values = values
+        self.shape = values.shape
+        self.reads = 0
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+
+    def __getitem__(self, index):
+        self.reads += 1
+        self.reading.set()
+        self.release.wait(10.)
+        return self.values[index]
+
+
+def test_lru_eviction():
+    cache = LRUCache(3 * 800)
+    values = {key: np.full(100, float(i)) for i, key in enumerate('abcd')}
+    for key in 'abc':
+        cache.put(key, values[key])
+    assert cache.nbytes == 2400
+    assert cache.get('a') is values['a']
+    cache.put('d', values['d'])
+    # b is the least recently used value
+    assert 'b' not in cache and all(key in cache for key in 'acd')
+    assert cache.get('b') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 1, 'items': 3, 'nbytes': 2400, 'max_bytes': 2400}
+    # values larger than the budget are not cached
+    cache.put('e', np.zeros(400))
+    assert 'e' not in cache and len(cache) == 3
+    cache.resize(1600)
+    assert 'c' not in cache and cache.nbytes == 1600 and cache.evictions == 2
+
+
+def test_tile_eviction():
+    grid = np.arange(64 * 64, dtype=float).reshape((1, 64, 64))
+    cache = TileCache(3 * 16 * 16 * 8)
+    block = cache.block(grid, ('grid', 'M2', 'h'), (0,), np.s_[10:30], np.s_[0:10], (16, 16))
+    np.testing.assert_array_equal(block, grid[0, 10:30, 0:10])
+    assert len(cache) == 2 and cache.misses == 2
+    cache.block(grid, ('grid', 'M2', 'h'), (0,), np.s_[40:60], np.s_[0:10], (16, 16))
+    # the tiles (0, 0) and (1, 0) were read before (2, 0) and (3, 0)
+    assert cache.evictions == 1 and ('grid', 'M2', ('h', 0, 0)) not in cache
+    assert ('grid', 'M2', ('h', 3, 0)) in cache and cache.nbytes <= cache.max_bytes
+
+
+def test_pending_tiles():
+    # concurrent readers of a tile wait for the thread reading it instead of reading it again
+    grid = SlowGrid(np.random.default_rng(0).normal(size=(1, 64, 64)))
+    cache = TileCache(2**20)
+    blocks = [None, None]
+
+    def read(i):
+        blocks[i] = cache.block(grid, ('grid', 'M2', 'h'), (0,), np.s_[3:9], np.s_[5:30], (16, 16))
+    first = threading.Thread(target=read, args=(0,))
+    first.start()
+    assert grid.reading.wait(10.)
+    second = threading.Thread(target=read, args=(1,))
+    second.start()
+    second.join(0.2)
+    # the second reader waits for the pending tiles
+    assert second.is_alive()
+    grid.release.set()
+    first.join(10.)
+    second.join(10.)
+    assert grid.reads == 1
+    np.testing.assert_array_equal(blocks[0], grid.values[0, 3:9, 5:30])
+    np.testing.assert_array_equal(blocks[1], blocks[0])
+
+
+def test_data_directories(tpxo9, model_dir, tmp_path, monkeypatch):
+    # tiles of a model read from one data directory are not served for another one
+    resources = ResourceManager(tpxo9)
+    resource = resources.model_atts['consts'][0]['M2']
+    with xr.open_dataset(os.path.join(model_dir, tpxo9, resource), engine='netcdf4') as ds:
+        ds = ds.load()
+    for name in ('data', 'pre_existing'):
+        path = os.path.join(str(tmp_path), name, tpxo9, resource)
+        os.makedirs(os.path.dirname(path))
+        scaled = ds.copy()
+        scaled['hRe'] = ds.hRe * (2. if name == 'data' else 3.)
+        scaled['hIm'] = ds.hIm * (2. if name == 'data' else 3.)
+        scaled.to_netcdf(path, engine='netcdf4')
+    assert resources.constituent_path('M2') == os.path.abspath(os.path.join(model_dir, tpxo9, resource))
+
+    rng = np.random.default_rng(0)
+    locs = np.column_stack([rng.uniform(-60., 60., 100), rng.uniform(-180., 180., 100)])
+    monkeypatch.setitem(config, 'tile_cache_bytes', 2**24)
+    expected = Constituents().get_batch_components(locs, tpxo9, ['M2']).data.amplitude.values
+    monkeypatch.setitem(config, 'data_dir', os.path.join(str(tmp_path), 'data'))
+    amplitudes = Constituents().get_batch_components(locs, tpxo9, ['M2']).data.amplitude.values
+    np.testing.assert_allclose(amplitudes, 2. * expected, rtol=1e-12)
+    monkeypatch.setitem(config, 'pre_existing_data_dir', os.path.join(str(tmp_path), 'pre_existing'))
+    assert resources.constituent_path('M2') == os.path.join(str(tmp_path), 'pre_existing', tpxo9, resource)
+    amplitudes = Constituents().get_batch_components(locs, tpxo9, ['M2']).data.amplitude.values
+    np.testing.assert_allclose(amplitudes, 3. * expected, rtol=1e-12)
@@ -0,0 +1,22 @@
+from harmonica.cli import main_reconstruct
+from harmonica.harmonica import Tide
+from harmonica import reconstruction
+import io
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_reconstruct(tpxo9, capsys, stream):
+    main_reconstruct.main(['41.2', '-70.4', '-M', tpxo9, '-C', 'M2', 'K1', '-S', '2020-01-01', '-L', '200'] +
+        (['--stream'] if stream else []))
+    out, err = capsys.readouterr()
+    # the series is the only output on stdout
+    data = pd.read_csv(io.StringIO(out), sep='\t')
+    assert 'Complete.' in err
+    times = reconstruction.time_range('2020-01-01', 200 * 24.)
+    np.testing.assert_array_equal(pd.to_datetime(data.datetimes).values, times)
+    expected = Tide().reconstruct_tide((41.2, -70.4), times, tpxo9, ['M2', 'K1']).data.water_level.values
+    # the streamed chunks advance their equilibrium arguments from their own first time
+    np.testing.assert_allclose(data.water_level.values, expected, rtol=0., atol=1e-6 if stream else 1e-12)
@@ -0,0 +1,66 @@
+from harmonica import datums, reconstruction
+from harmonica.predictor import TidePredictor
+import numpy as np
+import pandas as pd
+import pytest
+
+CONSTITUENTS = ['M2', 'S2', 'N2', 'K1', 'O1', 'M4']
+START = np.datetime64('2020-01-01', 'ns')
+END = np.datetime64('2020-03-01', 'ns')
+
+
+@pytest.fixture
+def predictor():
+    # a mixed tide, with a diurnal inequality, and a diurnal one
+    return TidePredictor(CONSTITUENTS, [[1., 0.35, 0.2, 0.4, 0.3, 0.12], [0.1, 0.05, 0.02, 0.5, 0.4, 0.]],
+        [[10., 100., 200., -50., 300., 40.], [0., 30., 60., 90., 120., 0.]])
+
+
+def brute_force(predictor, chunk):
+    """Compute the datums from the extrema of water levels sampled every 30 s, in chunks of chunk hours."""
+    step = 30. / 3600.
+    rows = []
+    total = (END - START) / np.timedelta64(1, 'h')
+    for offset in np.arange(0., total, chunk):
+        water_level = predictor.predict(reconstruction.time_range(START + reconstruction._timedelta(offset),
+            min(chunk, total - offset), step))
+        y0, y1, y2 = water_level[:-2], water_level[1:-1], water_level[2:]
+        index, model = np.nonzero((y1 > y0) & (y1 >= y2) | (y1 < y0) & (y1 <= y2))
+        y0, y1, y2 = y0[index, model], y1[index, model], y2[index, model]
+        # height of the parabola through the samples around the extremum
+        heights = y1 - 0.125 * (y0 - y2)**2 / (y0 - 2. * y1 + y2)
+        rows.append(pd.DataFrame({'model': model, 'day': ((offset + (index + 1) * step) // datums.LUNAR_DAY),
+            'height': heights, 'high': y1 > y0}))
+    extrema = pd.concat(rows)
+    high = extrema[extrema.high].groupby('model')
+    low = extrema[~extrema.high].groupby('model')
+    mhw, mlw = high.height.mean().values, low.height.mean().values
+    return {
+        'MHHW': high.apply(lambda e: e.groupby('day').height.max().mean()).values,
+        'MHW': mhw,
+        'MTL': 0.5 * (mhw + mlw),
+        'MLW': mlw,
+        'MLLW': low.apply(lambda e: e.groupby('day').height.min().mean()).values,
+    }
+
+
+@pytest.mark.parametrize('days', [7, None])
+def test_brute_force(predictor, days):
+    # the periods searched at once span max_bytes // (128 N K) tidal days
+    max_bytes = 128 * 2 * len(CONSTITUENTS) * (days or datums.MAX_CHUNK_DAYS)
+    actual = datums.tidal_datums(predictor, START, END, max_bytes=max_bytes)
+    expected = brute_force(predictor, (days or datums.MAX_CHUNK_DAYS) * datums.LUNAR_DAY)
+    assert list(actual) == list(datums.DATUMS)
+    for name in datums.DATUMS:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=0., atol=1e-8)
+    # the higher high and lower low waters differ with the diurnal inequality
+    assert np.all(actual['MHHW'] > actual['MHW']) and np.all(actual['MLLW'] < actual['MLW'])
+
+
+def test_single_location(predictor):
+    single = TidePredictor(CONSTITUENTS, predictor.amplitudes[0], predictor.phases[0])
+    actual = datums.tidal_datums(single, START, END)
+    expected = datums.tidal_datums(predictor, START, END)
+    for name in datums.DATUMS:
+        assert isinstance(actual[name], float)
+        assert actual[name] == pytest.approx(expected[name][0], abs=1e-12)
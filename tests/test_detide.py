@@ -0,0 +1,85 @@
+from harmonica import detide, reconstruction
+from harmonica.cli import main_detide
+from harmonica.predictor import TidePredictor
+from harmonica.tidal_constituents import Constituents
+import io
+import numpy as np
+import pandas as pd
+import pytest
+
+LOC = (41.2, -70.4)
+CONS = ['M2', 'S2', 'K1', 'O1']
+
+
+@pytest.fixture
+def predictor(tpxo9):
+    return TidePredictor.from_constituents(Constituents().get_components(LOC, tpxo9, CONS))
+
+
+@pytest.fixture
+def times():
+    return reconstruction.time_range('2020-01-01', 20 * 24., 0.1)
+
+
+def residual(times):
+    """A non-tidal signal: a constant offset and a slow surge."""
+    hours = reconstruction.hours_since(times, '2020-01-01')[0]
+    return 0.1 + 0.3 * np.sin(2. * np.pi * hours / (5 * 24.))
+
+
+@pytest.fixture
+def signal(tmp_path, predictor, times):
+    path = str(tmp_path / 'signal.csv')
+    pd.DataFrame({
+        'Date Time': pd.to_datetime(times).strftime('%Y-%m-%d %H:%M:%S'),
+        'Water Level': predictor.predict(times) + residual(times),
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_detide(signal, predictor, times):
+    output = io.StringIO()
+    assert detide.detide(signal, predictor, output, ['Date Time', 'Water Level'], chunk_rows=1000) == times.size
+    data = pd.read_csv(io.StringIO(output.getvalue()), sep='\t')
+    assert list(data.columns) == detide.COLUMNS
+    np.testing.assert_array_equal(pd.to_datetime(data.datetimes).values, times)
+    # the chunks are predicted as the whole record
+    np.testing.assert_allclose(data.predicted, predictor.predict(times), rtol=0., atol=1e-12)
+    np.testing.assert_allclose(data.residual, residual(times), rtol=0., atol=1e-12)
+
+
+def test_uniform_chunks(monkeypatch, predictor, times):
+    calls = []
+    uniform = reconstruction._reconstruct_uniform
+    monkeypatch.setattr(reconstruction, '_reconstruct_uniform', lambda *args: calls.append(1) or uniform(*args))
+    observed = predictor.predict(times) + residual(times)
+    chunks = [(times[i:i + 1000], observed[i:i + 1000]) for i in range(0, times.size, 1000)]
+    residuals = pd.concat(detide.detide_stream(predictor, chunks))
+    # every chunk takes the uniform time step fast path
+    assert len(calls) == len(chunks) + 1
+    np.testing.assert_allclose(residuals.residual, residual(times), rtol=0., atol=1e-12)
+    # chunks with gaps are evaluated from the epoch of the record as well
+    keep = np.ones(times.size, dtype=bool)
+    keep[[5, 1500, 3001]] = False
+    residuals = pd.concat(detide.detide_stream(predictor, [(times[keep][:2000], observed[keep][:2000]),
+        (times[keep][2000:], observed[keep][2000:])]))
+    np.testing.assert_allclose(residuals.residual, residual(times)[keep], rtol=0., atol=1e-12)
+
+
+def test_errors(predictor, times):
+    with pytest.raises(ValueError):
+        list(detide.detide_stream(predictor, [(times, np.zeros(times.size - 1))]))
+    batch = TidePredictor(CONS, np.ones((2, len(CONS))), np.zeros((2, len(CONS))))
+    with pytest.raises(ValueError):
+        list(detide.detide_stream(batch, [(times, np.zeros(times.size))]))
+
+
+def test_cli(tpxo9, capsys, signal, times):
+    main_detide.main([signal, '--loc', str(LOC[0]), str(LOC[1]), '-M', tpxo9, '-C'] + CONS +
+        ['--columns', 'Date Time', 'Water Level', '--chunk_rows', '500'])
+    out, err = capsys.readouterr()
+    # the residuals are the only output on stdout
+    data = pd.read_csv(io.StringIO(out), sep='\t')
+    assert 'Complete.' in err
+    assert list(data.columns) == detide.COLUMNS and len(data) == times.size
+    np.testing.assert_allclose(data.residual, residual(times), rtol=0., atol=1e-12)
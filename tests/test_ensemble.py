@@ -0,0 +1,62 @@
+from harmonica import ensemble, reconstruction
+from harmonica.harmonica import Tide
+from harmonica.resource import ResourceManager
+import numpy as np
+import pytest
+
+MODELS = ['tpxo9', 'tpxo7']
+
+
+@pytest.fixture
+def models(tpxo9):
+    return MODELS
+
+
+@pytest.fixture
+def locs():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(-60., 60., 20), rng.uniform(-180., 180., 20)])
+
+
+@pytest.mark.parametrize('cons', [[], ['M2', 'K1', 'O1']])
+def test_members(models, locs, cons):
+    times = reconstruction.time_range('2020-01-01', 48.)
+    levels, mean, spread = ensemble.predict_ensemble(locs, times, models, cons)
+    assert levels.shape == (times.size, len(models), len(locs))
+    assert mean.shape == spread.shape == (times.size, len(locs))
+    # every member is the prediction of its model alone, on its own constituents
+    for m, model in enumerate(models):
+        expected = Tide().reconstruct_batch_tide(locs, times, model, cons).data.drop(columns='datetimes').values
+        np.testing.assert_allclose(levels[:, m], expected, rtol=0., atol=1e-12)
+    assert np.abs(levels[:, 0] - levels[:, 1]).max() > 0.1
+    np.testing.assert_allclose(mean, levels.mean(axis=1), rtol=0., atol=1e-15)
+    np.testing.assert_allclose(spread, 0.5 * np.abs(levels[:, 0] - levels[:, 1]), rtol=0., atol=1e-12)
+
+
+def test_union(models, locs):
+    # S1 and 2N2 are not constituents of tpxo7, whose amplitudes are zero
+    predictor = ensemble.ensemble_predictor(ensemble.extract(locs, models))
+    names = sorted(set(ResourceManager('tpxo9').available_constituents()) |
+        set(ResourceManager('tpxo7').available_constituents()))
+    assert predictor.constituents == names
+    N = len(locs)
+    for c in ('S1', '2N2'):
+        k = names.index(c)
+        assert np.all(predictor.amplitudes[N:, k] == 0.) and np.all(predictor.amplitudes[:N, k] > 0.)
+
+
+def test_ensemble_tide(models):
+    times = reconstruction.time_range('2020-01-01', 48.)
+    loc = (33.3, -141.7)
+    tide = Tide().reconstruct_ensemble_tide(loc, times, models)
+    assert list(tide.data.columns) == ['datetimes'] + models + ['mean', 'spread']
+    np.testing.assert_array_equal(tide.data.datetimes.values, times)
+    levels, mean, spread = ensemble.predict_ensemble([loc], times, models)
+    np.testing.assert_allclose(tide.data[models].values, levels[:, :, 0], rtol=0., atol=1e-12)
+    np.testing.assert_allclose(tide.data['mean'], mean[:, 0], rtol=0., atol=1e-12)
+    np.testing.assert_allclose(tide.data['spread'], spread[:, 0], rtol=0., atol=1e-12)
+
+
+def test_no_models(locs):
+    with pytest.raises(ValueError):
+        ensemble.extract(locs, [])
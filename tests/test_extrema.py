@@ -0,0 +1,51 @@
+from harmonica import config, reconstruction
+from harmonica.predictor import TidePredictor
+import numpy as np
+import pytest
+
+CONSTITUENTS = ['M2', 'S2', 'N2', 'K1', 'O1', 'M4', 'MS4']
+
+
+@pytest.fixture
+def predictor():
+    # a mixed tide with shallow water overtides, and a diurnal one
+    return TidePredictor(CONSTITUENTS, [[1., 0.35, 0.2, 0.4, 0.3, 0.12, 0.06], [0.1, 0.05, 0.02, 0.5, 0.4, 0., 0.]],
+        [[10., 100., 200., -50., 300., 40., 150.], [0., 30., 60., 90., 120., 0., 0.]])
+
+
+def dense_extrema(water_level, step):
+    """Locate the extrema of densely sampled water levels from the parabola through each local extremum sample."""
+    y0, y1, y2 = water_level[:-2], water_level[1:-1], water_level[2:]
+    index = np.flatnonzero((y1 > y0) & (y1 >= y2) | (y1 < y0) & (y1 <= y2))
+    y0, y1, y2 = y0[index], y1[index], y2[index]
+    curvature = y0 - 2. * y1 + y2
+    offset = 0.5 * (y0 - y2) / curvature
+    return (index + 1 + offset) * step, y1 - 0.25 * (y0 - y2) * offset, curvature < 0.
+
+
+@pytest.mark.parametrize('numba', [False, True])
+def test_dense_sampling(monkeypatch, predictor, numba):
+    monkeypatch.setitem(config, 'numba', numba)
+    start, hours = np.datetime64('2021-03-01', 'ns'), 30 * 24.
+    times, heights, highs, model = predictor.high_low(start, hours)
+    # the samples share the equilibrium arguments and node factors of the extrema search from the start
+    step = 10. / 3600.
+    dense = predictor.predict(reconstruction.time_range(start, hours, step))
+    for n in range(2):
+        select = model == n
+        expected_hours, expected_heights, expected_highs = dense_extrema(dense[:, n], step)
+        assert select.sum() == expected_hours.size > 50
+        np.testing.assert_array_equal(highs[select], expected_highs)
+        # highs and lows alternate
+        assert np.all(highs[select][1:] != highs[select][:-1])
+        hours_found = (times[select] - start) / np.timedelta64(1, 'h')
+        np.testing.assert_allclose(hours_found, expected_hours, rtol=0., atol=1. / 3600.)
+        np.testing.assert_allclose(heights[select], expected_heights, rtol=0., atol=1e-9)
+    # the heights are those of the reconstruction of the period at the extrema times
+    water_level = predictor.predict(np.r_[start, times])[1:]
+    np.testing.assert_allclose(heights, water_level[np.arange(times.size), model], rtol=0., atol=1e-9)
+
+
+def test_empty(predictor):
+    times, heights, highs, model = predictor.high_low('2021-03-01', 0.)
+    assert times.size == heights.size == highs.size == model.size == 0
@@ -0,0 +1,43 @@
+from harmonica import reconstruction
+from harmonica.field import tide_field
+from harmonica.harmonica import Tide
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('cons', [[], ['M2', 'K1', 'MF']])
+def test_point_reconstruction(tpxo9, cons):
+    times = reconstruction.time_range('2020-01-01', 24., 0.5)
+    field = tide_field((40., -75., 47.5, -67.), times, tpxo9, cons, chunks=(24, 2, 3))
+    assert field.dims == ('time', 'lat', 'lon') and field.shape == (48, 4, 4)
+    np.testing.assert_array_equal(field.lat, [40., 42.5, 45., 47.5])
+    np.testing.assert_array_equal(field.lon, [-75., -72.5, -70., -67.5])
+    values = field.values
+    # every time chunk is evaluated from its own first time
+    for start in range(0, times.size, 24):
+        chunk = times[start:start + 24]
+        for i, lat in enumerate(field.lat.values):
+            for j, lon in enumerate(field.lon.values):
+                expected = Tide().reconstruct_tide((lat, lon), chunk, tpxo9, cons).data.water_level.values
+                np.testing.assert_allclose(values[start:start + 24, i, j], expected, rtol=0., atol=1e-12)
+
+
+@pytest.mark.parametrize('west, east', [(170., -170.), (170., 190.), (-190., -170.)])
+def test_antimeridian(tpxo9, west, east):
+    times = reconstruction.time_range('2020-01-01', 6.)
+    field = tide_field((-5., west, 5., east), times, tpxo9, ['M2'])
+    expected_lon = np.arange(170., 190.1, 2.5)
+    # the longitudes are in the convention of the bounds
+    if west < 0 or east < 0:
+        expected_lon = np.where(expected_lon > 180., expected_lon - 360., expected_lon)
+    np.testing.assert_array_equal(field.lon, expected_lon)
+    reference = tide_field((-5., 170., 5., 190.), times, tpxo9, ['M2'])
+    np.testing.assert_array_equal(field.values, reference.values)
+
+
+def test_prime_meridian(tpxo9):
+    times = reconstruction.time_range('2020-01-01', 6.)
+    field = tide_field((-5., 355., 5., 5.), times, tpxo9, ['M2'])
+    np.testing.assert_array_equal(field.lon, [355., 357.5, 0., 2.5, 5.])
+    field = tide_field((-5., -5., 5., 5.), times, tpxo9, ['M2'])
+    np.testing.assert_array_equal(field.lon, [-5., -2.5, 0., 2.5, 5.])
@@ -0,0 +1,76 @@
+from harmonica import astronomy, reconstruction
+from harmonica.harmonica import Tide
+import numpy as np
+import pytest
+
+CONSTITUENTS = ['M2', 'S2', 'N2', 'K1', 'O1']
+AMPLITUDES = np.array([1., 0.3, 0.2, 0.4, 0.25])
+PHASES = np.array([10., 100., 200., -50., 300.])
+
+
+@pytest.fixture
+def signal():
+    times = reconstruction.time_range('2020-01-01', 60 * 24.)
+    return reconstruction.reconstruct(CONSTITUENTS, AMPLITUDES, PHASES, times), times
+
+
+@pytest.mark.parametrize('positive_ph', [False, True])
+def test_deconstruct_tide(signal, positive_ph):
+    water_level, times = signal
+    tide = Tide().deconstruct_tide(water_level, times, cons=CONSTITUENTS, positive_ph=positive_ph)
+    data = tide.constituents.data
+    assert list(data.index) == CONSTITUENTS
+    np.testing.assert_allclose(data['amplitude'].astype(float), AMPLITUDES, atol=1e-4)
+    phases = data['phase'].astype(float).values
+    assert np.all((phases >= 0.) & (phases < 360.)) if positive_ph else np.all(np.abs(phases) <= 180.)
+    assert np.abs((phases - PHASES + 180.) % 360. - 180.).max() < 0.01
+    np.testing.assert_allclose(data['speed'].astype(float), astronomy.speeds(CONSTITUENTS, times[0]), rtol=1e-12)
+
+
+def test_deconstruct_tide_all_constituents(signal):
+    water_level, times = signal
+    data = Tide().deconstruct_tide(water_level, times).constituents.data
+    assert set(CONSTITUENTS) <= set(data.index)
+    np.testing.assert_allclose(data.loc[CONSTITUENTS, 'amplitude'].astype(float), AMPLITUDES, atol=0.02)
+
+
+def test_reconstruct_batch_tide_float32(tpxo9):
+    rng = np.random.default_rng(0)
+    locs = np.column_stack([rng.uniform(-60., 60., 50), rng.uniform(-180., 180., 50)])
+    times = reconstruction.time_range('2020-01-01', 30 * 24.)
+    tide = Tide().reconstruct_batch_tide(locs, times, tpxo9)
+    expected = tide.data.drop(columns='datetimes').values.astype(float)
+    amplitudes = tide.constituents.harmonic_constants()[1].sum(axis=1)
+    data = Tide().reconstruct_batch_tide(locs, times, tpxo9, dtype=np.float32).data
+    assert data.shape == tide.data.shape
+    actual = data.drop(columns='datetimes')
+    assert all(actual.dtypes == np.float32)
+    assert (np.abs(actual.values - expected) / amplitudes).max() < 5e-7
+
+
+@pytest.mark.parametrize('cons', [[], ['M2'], ['M2', 'K1', 'MF', 'S2']])
+@pytest.mark.parametrize('offset', [None, 0.3])
+def test_reconstruct_batch_tide(tpxo9, cons, offset):
+    locs = [(41.2, -70.4), (-33.9, 151.3), (0., 0.), (60.1, 359.)]
+    times = reconstruction.time_range('2020-01-01', 10 * 24., 0.25)
+    data = Tide().reconstruct_batch_tide(locs, times, tpxo9, cons, offset=offset).data
+    assert list(data.columns) == ['datetimes'] + list(range(len(locs)))
+    np.testing.assert_array_equal(data.datetimes.values, times)
+    for i, loc in enumerate(locs):
+        expected = Tide().reconstruct_tide(loc, times, tpxo9, cons, offset=offset).data.water_level.values
+        np.testing.assert_allclose(data[i].values, expected, rtol=0., atol=1e-12)
+
+
+def test_reconstruct_tide_stream(tpxo9):
+    chunks = list(Tide().reconstruct_tide_stream((41.2, -70.4), '2020-01-01', 1000., 0.5, tpxo9, chunk_hours=240.))
+    assert [len(chunk) for chunk in chunks] == [480] * 4 + [80]
+    times = np.concatenate([chunk.datetimes.values for chunk in chunks])
+    np.testing.assert_array_equal(times, reconstruction.time_range('2020-01-01', 1000., 0.5))
+    # every chunk is a reconstruction of its own times
+    for chunk in chunks:
+        expected = Tide().reconstruct_tide((41.2, -70.4), chunk.datetimes.values, tpxo9).data.water_level.values
+        np.testing.assert_allclose(chunk.water_level.values, expected, rtol=0., atol=1e-12)
+    # and differs from the reconstruction of the whole series by the advance of the equilibrium arguments
+    expected = Tide().reconstruct_tide((41.2, -70.4), times, tpxo9).data.water_level.values
+    np.testing.assert_allclose(np.concatenate([chunk.water_level.values for chunk in chunks]), expected, rtol=0.,
+        atol=1e-6)
@@ -0,0 +1,135 @@
+from harmonica import config, extrema, kernels, reconstruction, track
+from harmonica.predictor import TidePredictor
+from harmonica.tidal_constituents import Constituents
+import harmonica
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pytest
+
+CONSTITUENTS = ['M2', 'S2', 'N2', 'K1', 'O1', 'M4']
+
+
+@pytest.fixture(params=[False, True], ids=['numpy', 'numba'])
+def numba(request, monkeypatch):
+    """Run a test with and without the compiled kernels."""
+    if request.param and kernels.numba is None:
+        pytest.skip('numba is not installed')
+    monkeypatch.setitem(config, 'numba', request.param)
+    return request.param
+
+
+def numpy(function, *args, **kwargs):
+    """Evaluate a function with the NumPy expressions."""
+    enabled = config['numba']
+    config['numba'] = False
+    try:
+        return function(*args, **kwargs)
+    finally:
+        config['numba'] = enabled
+
+
+@pytest.fixture
+def times():
+    # the times are not uniform, so the reconstructions do not take the uniform time step fast path
+    times = reconstruction.time_range('2020-01-01', 30 * 24.)
+    times[1] += np.timedelta64(1, 's')
+    return times
+
+
+@pytest.fixture
+def locs():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(-85., 85., 300), rng.uniform(-180., 180., 300)])
+
+
+def test_bilinear(tpxo9, numba, locs):
+    assert kernels.enabled() == numba
+    expected = numpy(Constituents().get_batch_components, locs, tpxo9).data
+    actual = Constituents().get_batch_components(locs, tpxo9).data
+    np.testing.assert_allclose(actual.amplitude, expected.amplitude, rtol=1e-12)
+    np.testing.assert_allclose(actual.phase, expected.phase, rtol=0., atol=1e-9)
+
+
+@pytest.mark.parametrize('policy', ['partition', 'sample'])
+@pytest.mark.parametrize('locations', [0, 3])
+def test_reconstruction(numba, times, policy, locations):
+    rng = np.random.default_rng(1)
+    shape = (locations, len(CONSTITUENTS)) if locations else (len(CONSTITUENTS),)
+    predictor = TidePredictor(CONSTITUENTS, rng.uniform(0., 1., shape), rng.uniform(0., 360., shape),
+        nodal_policy=policy)
+    np.testing.assert_allclose(predictor.predict(times), numpy(predictor.predict, times), rtol=0., atol=1e-12)
+    # unsorted times are evaluated by index arrays
+    shuffled = rng.permutation(times)
+    np.testing.assert_allclose(predictor.predict(shuffled), numpy(predictor.predict, shuffled), rtol=0., atol=1e-12)
+    basis = reconstruction.harmonic_basis(CONSTITUENTS, times, nodal_policy=policy)
+    np.testing.assert_allclose(basis, numpy(reconstruction.harmonic_basis, CONSTITUENTS, times, nodal_policy=policy),
+        rtol=0., atol=1e-14)
+
+
+def test_extrema(numba):
+    predictor = TidePredictor(CONSTITUENTS, [[1., 0.35, 0.2, 0.4, 0.3, 0.12], [0.1, 0.05, 0.02, 0.5, 0.4, 0.]],
+        [[10., 100., 200., -50., 300., 40.], [0., 30., 60., 90., 120., 0.]])
+    actual = predictor.high_low('2021-03-01', 30 * 24.)
+    expected = numpy(predictor.high_low, '2021-03-01', 30 * 24.)
+    for a, e in zip(actual[2:], expected[2:]):
+        np.testing.assert_array_equal(a, e)
+    # the refined times are within the tolerance of the search
+    np.testing.assert_allclose(actual[0].view(np.int64), expected[0].view(np.int64), rtol=0.,
+        atol=2. * extrema.TOLERANCE * 3600e9)
+    np.testing.assert_allclose(actual[1], expected[1], rtol=0., atol=1e-9)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_track(tpxo9, numba, times, dtype):
+    rng = np.random.default_rng(2)
+    lat = rng.uniform(-60., 60., times.size)
+    lon = rng.uniform(-180., 180., times.size)
+    constants = track.TrackConstants.extract(lat, lon, tpxo9, dtype=dtype)
+    expected = numpy(track.reconstruct_track, constants, times)
+    actual = track.reconstruct_track(constants, times)
+    assert actual.dtype == dtype
+    np.testing.assert_allclose(actual, expected, rtol=0., atol=1e-12 if dtype == np.float64 else 1e-5)
+    # unsorted times are evaluated by index arrays
+    order = rng.permutation(times.size)
+    np.testing.assert_allclose(track.reconstruct_track(constants, times[order]),
+        numpy(track.reconstruct_track, constants, times[order]), rtol=0.,
+        atol=1e-12 if dtype == np.float64 else 1e-5)
+
+
+def test_exit_after_threads(model_dir, cache_dir):
+    # a process whose threads predict (dask chunks, concurrent model reads) before its main thread runs the parallel
+    # kernels must still exit
+    script = textwrap.dedent("""
+        import sys
+        import threading
+        import numpy as np
+        from harmonica import config, ensemble, kernels, reconstruction
+        from harmonica.field import tide_field
+        from harmonica.predictor import TidePredictor
+
+        config.update({'data_dir': sys.argv[1], 'pre_existing_data_dir': '', 'cache_dir': sys.argv[2]})
+        assert kernels.enabled()
+        times = reconstruction.time_range('2020-01-01', 48.)
+        # the times are not uniform, so the predictions run the parallel kernels
+        times[1] += np.timedelta64(1, 's')
+        predictor = TidePredictor(['M2', 'S2', 'K1'], [1., 0.3, 0.4], [0., 10., 20.])
+        thread = threading.Thread(target=predictor.predict, args=(times,))
+        thread.start()
+        thread.join()
+        rng = np.random.default_rng(0)
+        locs = np.column_stack([rng.uniform(-60., 60., 100), rng.uniform(-180., 180., 100)])
+        levels, mean, spread = ensemble.predict_ensemble(locs, times, models=['tpxo9', 'tpxo9'])
+        assert levels.shape == (times.size, 2, 100)
+        field = tide_field((30., -80., 40., -70.), times, 'tpxo9', chunks=(8, 2, 2)).values
+        assert field.shape == (times.size, 5, 5)
+        predictor.predict(times)
+    """)
+    if not kernels.enabled():
+        pytest.skip('the compiled kernels are disabled')
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(harmonica.__file__))))
+    result = subprocess.run([sys.executable, '-c', script, model_dir, cache_dir], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
+    assert result.returncode == 0
@@ -0,0 +1,28 @@
+from harmonica import astronomy, config, nodal
+import os
+import numpy as np
+
+
+def test_cache_dir(monkeypatch, tmp_path):
+    assert nodal.cache_dir() == config['cache_dir']
+    monkeypatch.setitem(config, 'cache_dir', '')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert nodal.cache_dir() == os.path.join(str(tmp_path), 'harmonica')
+    monkeypatch.delenv('XDG_CACHE_HOME')
+    assert nodal.cache_dir() == os.path.join(os.path.expanduser('~'), '.cache', 'harmonica')
+
+
+def test_default_table_location():
+    table = nodal.default_table()
+    assert table.path == os.path.join(config['cache_dir'], 'nodal')
+    assert os.path.exists(os.path.join(table.path, 'meta.json'))
+    assert not os.path.abspath(table.path).startswith(os.path.dirname(os.path.abspath(nodal.__file__)))
+
+
+def test_lookup_matches_node_factors():
+    names = ['M2', 'K1', 'O1', 'MF', 'MS4', 'M1']
+    times = np.array(['1950-02-03T12:00', '2021-07-15T12:00', '2150-01-01'], dtype='datetime64[ns]')
+    f, u = nodal.default_table().lookup(names, astronomy._days(times), interpolate=False)
+    expected_f, expected_u = astronomy.node_factors(names, times)
+    np.testing.assert_allclose(f, expected_f.T, rtol=1e-12)
+    np.testing.assert_allclose(u, expected_u.T, atol=1e-9)
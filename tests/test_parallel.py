@@ -0,0 +1,100 @@
+from harmonica import config, kernels, parallel, reconstruction
+from harmonica.predictor import TidePredictor
+import harmonica
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def predictor():
+    return TidePredictor(['M2', 'S2', 'K1', 'O1'], [[1., 0.3, 0.4, 0.25], [0.5, 0.2, 0.1, 0.3]],
+        [[10., 100., -50., 300.], [0., 45., 90., 135.]])
+
+
+@pytest.fixture
+def times():
+    # unsorted, non-uniform times spanning several partitions
+    times = reconstruction.time_range('2020-01-01', 2 * 8766., 0.37)
+    return times[np.random.default_rng(0).permutation(times.size)[:20000]]
+
+
+@pytest.mark.parametrize('nodal_policy', ['partition', 'day'])
+def test_workers(monkeypatch, predictor, times, nodal_policy):
+    # the workers apply the configuration of the calling process
+    monkeypatch.setitem(config, 'nodal_policy', nodal_policy)
+    expected = parallel.predict_parallel(predictor, times, workers=1)
+    np.testing.assert_allclose(parallel.predict_parallel(predictor, times, workers=2), expected, rtol=0., atol=1e-12)
+
+
+def test_exit_after_kernels():
+    # a process running the parallel kernels before starting workers must still exit
+    script = textwrap.dedent("""
+        import numpy as np
+        from harmonica import kernels, parallel, reconstruction
+        from harmonica.predictor import TidePredictor
+
+        predictor = TidePredictor(['M2', 'S2', 'K1'], [1., 0.3, 0.4], [0., 10., 20.])
+        times = reconstruction.time_range('2020-01-01', 8766., 0.37)[::3]
+        times[1] += np.timedelta64(1, 's')
+        # the times are not uniform, so the prediction runs the parallel kernels
+        assert kernels.enabled()
+        predictor.predict(times)
+        water_level = parallel.predict_parallel(predictor, times, workers=2, partition_hours=480.)
+        expected = parallel.predict_parallel(predictor, times, workers=1, partition_hours=480.)
+        assert np.abs(water_level - expected).max() < 1e-12
+    """)
+    if not kernels.enabled():
+        pytest.skip('the compiled kernels are disabled')
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(harmonica.__file__))))
+    # the workers of a hung process may keep pipes open, so the output is not captured
+    result = subprocess.run([sys.executable, '-c', script], env=env, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, timeout=120)
+    assert result.returncode == 0
+
+
+def test_output(predictor, times):
+    expected = predictor.predict(times)
+    out = np.empty_like(expected)
+    assert predictor.predict(times, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+    with pytest.raises(ValueError):
+        predictor.predict(times, out=np.empty(expected.shape, dtype=np.float32))
+    with pytest.raises(ValueError):
+        parallel.predict_parallel(predictor, times, workers=1, out=np.empty(expected.shape[:1]))
+    with pytest.raises(ValueError):
+        parallel.predict_parallel(predictor, times, workers=1, out=np.empty(expected.shape, dtype=np.float32))
+
+
+def test_partitions(times):
+    indices = parallel.partitions(times, partition_hours=1000.)
+    # partitions are rounded up to whole node factor partitions and cover every time once
+    assert len(indices) == int(np.ceil((times.max() - times.min()) / np.timedelta64(1200, 'h')))
+    np.testing.assert_array_equal(np.sort(np.concatenate(indices)), np.arange(times.size))
+    sorted_times = np.sort(times)
+    indices = parallel.partitions(sorted_times, partition_hours=1000.)
+    assert all(isinstance(index, slice) for index in indices)
+    assert all((sorted_times[index] - sorted_times[index][0]).max() < np.timedelta64(1200, 'h') for index in indices)
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_workers_output(predictor, times, workers):
+    # sorted times are written into the output array in place
+    times = np.sort(times)
+    expected = parallel.predict_parallel(predictor, times, workers=1)
+    out = np.empty_like(expected)
+    assert parallel.predict_parallel(predictor, times, workers=workers, out=out) is out
+    np.testing.assert_allclose(out, expected, rtol=0., atol=1e-12)
+    # one location
+    single = TidePredictor(predictor.constituents, predictor.amplitudes[0], predictor.phases[0])
+    np.testing.assert_allclose(parallel.predict_parallel(single, times, workers=workers), expected[:, 0], rtol=0.,
+        atol=1e-12)
+
+
+def test_serial_fallback(monkeypatch, predictor, times):
+    expected = parallel.predict_parallel(predictor, times, workers=1)
+    monkeypatch.setattr(parallel, 'shared_memory', None)
+    np.testing.assert_array_equal(parallel.predict_parallel(predictor, times, workers=2), expected)
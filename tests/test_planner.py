@@ -0,0 +1,95 @@
+from bisect import bisect
+from harmonica.cache import TileCache
+from harmonica.planner import ReadPlan, morton_code
+import numpy as np
+import pytest
+
+LON = np.arange(0., 360., 0.5)
+LAT = np.arange(-90., 90.1, 0.5)
+
+
+@pytest.fixture
+def grid():
+    return np.random.default_rng(0).normal(size=(3, LON.size, LAT.size))
+
+
+def interpolate(grid, lat, lon):
+    """Interpolate one point as the extraction did before the read planner, from its own 2x2 stencil."""
+    top, right = bisect(LAT, lat), bisect(LON, lon)
+    dx = (lon - LON[right - 1]) / (LON[right] - LON[right - 1])
+    dy = (lat - LAT[top - 1]) / (LAT[top] - LAT[top - 1])
+    weights = np.array([(1. - dx) * (1. - dy), (1. - dx) * dy, dx * (1. - dy), dx * dy]).reshape((2, 2))
+    return (grid[right - 1:right + 1, top - 1:top + 1] * weights / weights.sum()).sum()
+
+
+def test_morton_code():
+    np.testing.assert_array_equal(morton_code([0, 1, 0, 1, 2, 0, 3], [0, 0, 1, 1, 0, 2, 3]), [0, 1, 2, 3, 4, 8, 15])
+    assert morton_code(2**20, 2**20) == 3 * 2**40
+
+
+def test_order():
+    # one point in each of the tiles (0, 0), (1, 0), (0, 1) and (1, 1), in reverse curve order
+    lat = LAT[[30, 30, 10, 10]] + 0.1
+    lon = LON[[30, 10, 30, 10]] + 0.1
+    plan = ReadPlan(lat, lon, LAT, LON, tile_shape=(20, 20), max_tiles=1)
+    np.testing.assert_array_equal(plan.order, [3, 2, 1, 0])
+    assert [idx.tolist() for _, _, idx in plan.reads] == [[3], [2], [1], [0]]
+    # points of a tile follow the curve of their cells
+    plan = ReadPlan(LAT[[5, 5, 4, 4]] + 0.1, LON[[5, 4, 5, 4]] + 0.1, LAT, LON, tile_shape=(20, 20))
+    np.testing.assert_array_equal(plan.order, [3, 2, 1, 0])
+
+
+def test_coalesce():
+    # two neighbouring tiles filled with points are read at once
+    rng = np.random.default_rng(0)
+    lat = np.r_[rng.uniform(LAT[0], LAT[19], 50), rng.uniform(LAT[0], LAT[19], 50)]
+    lon = np.r_[rng.uniform(LON[0], LON[19], 50), rng.uniform(LON[20], LON[39], 50)]
+    plan = ReadPlan(lat, lon, LAT, LON, tile_shape=(20, 20))
+    assert len(plan.reads) == 1
+    # distant or sparse groups are not merged
+    plan = ReadPlan(np.r_[lat, 45.1], np.r_[lon, 180.1], LAT, LON, tile_shape=(20, 20))
+    assert len(plan.reads) == 2
+    plan = ReadPlan(lat[[0, 99]], lon[[0, 99]], LAT, LON, tile_shape=(20, 20), min_fill=0.9)
+    assert len(plan.reads) == 2
+    # every point is read once, by a hyperslab containing its stencil
+    rng = np.random.default_rng(1)
+    plan = ReadPlan(rng.uniform(-80., 80., 1000), rng.uniform(0., 359., 1000), LAT, LON, tile_shape=(32, 32))
+    points = np.concatenate([idx for _, _, idx in plan.reads])
+    np.testing.assert_array_equal(np.sort(points), np.arange(1000))
+    for xs, ys, idx in plan.reads:
+        assert (plan.left[idx] >= xs.start).all() and (plan.left[idx] + 2 <= xs.stop).all()
+        assert (plan.bottom[idx] >= ys.start).all() and (plan.bottom[idx] + 2 <= ys.stop).all()
+        assert (xs.stop - xs.start) * (ys.stop - ys.start) <= 4 * 32 * 32
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_interpolate(grid, cached):
+    rng = np.random.default_rng(2)
+    lat = rng.uniform(-89., 89., 500)
+    lon = rng.uniform(0., 359., 500)
+    plan = ReadPlan(lat, lon, LAT, LON, tile_shape=(64, 64))
+    cache = TileCache(2**24) if cached else None
+    expected = [interpolate(grid[1], y, x) for y, x in zip(lat, lon)]
+    np.testing.assert_allclose(plan.interpolate(grid, (1,), cache, ('grid', 'M2', 'h')), expected, rtol=1e-12,
+        atol=1e-12)
+    if cached:
+        misses = cache.misses
+        assert len(cache) == misses
+        np.testing.assert_allclose(plan.interpolate(grid, (1,), cache, ('grid', 'M2', 'h')), expected, rtol=1e-12,
+            atol=1e-12)
+        assert cache.misses == misses
+
+
+def test_small_plan(grid):
+    # a single point does not load whole tiles into the cache, but uses those already cached
+    cache = TileCache(2**24)
+    plan = ReadPlan([10.2], [20.3], LAT, LON, tile_shape=(64, 64))
+    expected = interpolate(grid[0], 10.2, 20.3)
+    assert plan.interpolate(grid, (0,), cache, ('grid', 'M2', 'h'))[0] == pytest.approx(expected, abs=1e-12)
+    assert not len(cache)
+    rng = np.random.default_rng(3)
+    ReadPlan(rng.uniform(5., 15., 100), rng.uniform(15., 25., 100), LAT, LON, tile_shape=(64, 64)).read(grid, (0,),
+        cache, ('grid', 'M2', 'h'))
+    hits = cache.hits
+    assert plan.interpolate(grid, (0,), cache, ('grid', 'M2', 'h'))[0] == pytest.approx(expected, abs=1e-12)
+    assert cache.hits == hits + 1
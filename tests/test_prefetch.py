@@ -0,0 +1,62 @@
+from harmonica import config, prefetch
+from harmonica.cache import TileCache, default_tile_cache
+from harmonica.prefetch import Prefetcher
+from harmonica.resource import ResourceManager
+from harmonica.tidal_constituents import Constituents
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def locs():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(-60., 60., 200), rng.uniform(-180., 180., 200)])
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setitem(config, 'tile_cache_bytes', 2**24)
+    cache = default_tile_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_prefetch(tpxo9, locs, cache):
+    expected = Constituents().get_batch_components(locs, tpxo9, ['M2', 'K1']).data
+    cache.clear()
+    with Prefetcher(max_workers=2).prefetch(locs, tpxo9, ['M2', 'K1'], readahead=True) as prefetcher:
+        assert prefetcher.cache is cache
+    # the tiles of both variables of both constituents are cached
+    files = set(key[0] for key in cache._items)
+    assert files == {ResourceManager(tpxo9).constituent_path('M2')}
+    assert set((key[1], key[2][0]) for key in cache._items) == {('M2', 'hRe'), ('M2', 'hIm'), ('K1', 'hRe'),
+        ('K1', 'hIm')}
+    misses = cache.misses
+    data = Constituents().get_batch_components(locs, tpxo9, ['M2', 'K1']).data
+    assert cache.misses == misses and cache.hits
+    np.testing.assert_array_equal(data.values, expected.values)
+
+
+def test_concurrent_extraction(tpxo9, locs, cache):
+    # extraction running while the prefetch is in flight reads the same values
+    expected = Constituents().get_batch_components(locs, tpxo9).data
+    cache.clear()
+    with Prefetcher(max_workers=4).prefetch(locs, tpxo9):
+        data = Constituents().get_batch_components(locs, tpxo9).data
+    np.testing.assert_array_equal(data.values, expected.values)
+    assert len(cache) == 2 * len(ResourceManager(tpxo9).available_constituents())
+
+
+def test_errors(tpxo9, locs, cache, monkeypatch):
+    prefetcher = Prefetcher(cache=TileCache(2**20)).prefetch(locs, tpxo9, ['XX'])
+    with pytest.raises(ValueError):
+        prefetcher.wait()
+    prefetcher.shutdown()
+    monkeypatch.setitem(config, 'tile_cache_bytes', 0)
+    with pytest.raises(ValueError):
+        Prefetcher()
+
+
+def test_readahead():
+    assert prefetch.readahead(__file__) is hasattr(prefetch.os, 'posix_fadvise')
@@ -0,0 +1,202 @@
+from harmonica import config, reconstruction
+from harmonica.cache import default_basis_cache
+from harmonica.predictor import TidePredictor
+import numpy as np
+import pytest
+
+CONSTITUENTS = ['M2', 'S2', 'N2', 'K2', 'K1', 'O1', 'P1', 'Q1', 'M4', 'MF']
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    amplitudes = rng.uniform(0.01, 1., (2, len(CONSTITUENTS)))
+    phases = rng.uniform(0., 360., (2, len(CONSTITUENTS)))
+    return amplitudes, phases
+
+
+@pytest.fixture
+def uniform_calls(monkeypatch):
+    """Count the reconstructions evaluated by the phasor recurrence."""
+    calls = []
+    uniform = reconstruction._reconstruct_uniform
+
+    def spy(*args):
+        calls.append(args[3])
+        return uniform(*args)
+    monkeypatch.setattr(reconstruction, '_reconstruct_uniform', spy)
+    return calls
+
+
+def relative_error(actual, expected, amplitudes):
+    return np.abs(actual - expected).max() / amplitudes.sum(axis=-1).max()
+
+
+@pytest.mark.parametrize('anchor_interval', [reconstruction.ANCHOR_INTERVAL, 4096, 43200])
+def test_uniform_drift(model, uniform_calls, anchor_interval):
+    # 30 days of minutes: the recurrence drifts by about 1e-16 of the amplitudes per step from its anchor
+    amplitudes, phases = model
+    times = reconstruction.time_range('2015-01-01', 30 * 24., 1 / 60.)
+    direct = reconstruction.reconstruct(CONSTITUENTS, amplitudes[0], phases[0], times, anchor_interval=0)
+    assert not uniform_calls
+    fast = reconstruction.reconstruct(CONSTITUENTS, amplitudes[0], phases[0], times, anchor_interval=anchor_interval)
+    assert len(uniform_calls) == 1
+    assert relative_error(fast, direct, amplitudes[0]) < 1e-13 + anchor_interval * 1e-16
+
+
+@pytest.mark.parametrize('models', [1, 2])
+def test_uniform_long_series(model, uniform_calls, models):
+    # ten years of hours: the phases of both paths are rounded at about 1e-16 of hours * speed
+    amplitudes, phases = model
+    if models == 1:
+        amplitudes, phases = amplitudes[0], phases[0]
+    times = reconstruction.time_range('2015-01-01', 10 * 8766.)
+    direct = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, anchor_interval=0)
+    fast = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times)
+    assert len(uniform_calls) == 1
+    assert fast.shape == direct.shape
+    assert relative_error(fast, direct, amplitudes) < 1e-11
+
+
+def test_non_uniform_fallback(model, uniform_calls):
+    amplitudes, phases = model
+    times = reconstruction.time_range('2015-01-01', 2 * 8766.)
+    times[1000] += np.timedelta64(1, 's')
+    assert reconstruction._uniform_step(times) is None
+    assert reconstruction._uniform_step(times[::-1]) is None
+    direct = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, anchor_interval=0)
+    fallback = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times)
+    assert not uniform_calls
+    np.testing.assert_array_equal(fallback, direct)
+    basis = reconstruction.harmonic_basis(CONSTITUENTS, times)
+    expected = basis @ reconstruction.harmonic_coefficients(amplitudes, phases).T
+    assert relative_error(fallback, expected, amplitudes) < 1e-12
+
+
+@pytest.mark.parametrize('models', [1, 2])
+@pytest.mark.parametrize('anchor_interval', [0, reconstruction.ANCHOR_INTERVAL])
+def test_float32(model, models, anchor_interval):
+    amplitudes, phases = model
+    if models == 1:
+        amplitudes, phases = amplitudes[0], phases[0]
+    times = reconstruction.time_range('2015-01-01', 2 * 8766.)
+    expected = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, anchor_interval=anchor_interval)
+    actual = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, anchor_interval=anchor_interval,
+        dtype=np.float32)
+    assert actual.dtype == np.float32
+    assert relative_error(actual, expected, amplitudes) < 5e-7
+    basis = reconstruction.harmonic_basis(CONSTITUENTS, times[:100], dtype=np.float32)
+    assert basis.dtype == np.float32
+    with pytest.raises(ValueError):
+        reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, dtype=np.float16)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+@pytest.mark.parametrize('models', [1, 2])
+@pytest.mark.parametrize('uniform', [False, True])
+def test_output(model, dtype, models, uniform):
+    amplitudes, phases = model
+    if models == 1:
+        amplitudes, phases = amplitudes[0], phases[0]
+    times = reconstruction.time_range('2015-01-01', 1000., 0.5)
+    if not uniform:
+        times[7] += np.timedelta64(1, 's')
+    expected = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, dtype=dtype)
+    scratch = reconstruction.Scratch()
+    # contiguous buffers, reused with scratch buffers, and strided views
+    out = np.full(expected.shape, np.nan, dtype=dtype)
+    strided = np.full(expected.shape + (2,), np.nan, dtype=dtype)[..., 0]
+    for buffer in (out, out, strided):
+        actual = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, out=buffer, scratch=scratch,
+            dtype=dtype)
+        assert actual is buffer
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(strided, expected)
+    # the work buffers of a call do not alias its output
+    assert all(not np.shares_memory(b, out) for b in scratch._local.__dict__.values())
+
+
+def test_output_errors(model):
+    amplitudes, phases = model
+    times = reconstruction.time_range('2015-01-01', 100.)
+    for out in (np.empty(99), np.empty((100, 1)), np.empty((100, 2))):
+        with pytest.raises(ValueError):
+            reconstruction.reconstruct(CONSTITUENTS, amplitudes[0], phases[0], times, out=out)
+    for out, dtype in ((np.empty(100, dtype=np.float32), float), (np.empty(100), np.float32),
+            (np.empty(100, dtype=int), float), (np.empty(100, dtype=complex), float)):
+        with pytest.raises(ValueError):
+            reconstruction.reconstruct(CONSTITUENTS, amplitudes[0], phases[0], times, out=out, dtype=dtype)
+
+
+@pytest.fixture
+def basis_cache(monkeypatch):
+    monkeypatch.setitem(config, 'basis_cache_bytes', 2**24)
+    cache = default_basis_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_basis_cache(model, basis_cache, dtype):
+    amplitudes, phases = model
+    times = reconstruction.time_range('2015-01-01', 500.)
+    expected = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, dtype=dtype)
+    # the basis is built on the second request of the same times
+    assert not len(basis_cache) and basis_cache.misses == 1
+    second = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, dtype=dtype)
+    assert len(basis_cache) == 1 and basis_cache.misses == 2 and not basis_cache.hits
+    tolerance = 1e-12 if dtype == np.float64 else 5e-7
+    assert relative_error(second, expected, amplitudes) < tolerance
+    # further requests, of any model and with output arrays, are products with the cached basis
+    out = np.empty_like(expected)
+    assert reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times, out=out, dtype=dtype) is out
+    np.testing.assert_array_equal(out, second)
+    single = reconstruction.reconstruct(CONSTITUENTS, amplitudes[1], phases[1], times.copy(), dtype=dtype)
+    assert relative_error(single, expected[:, 1], amplitudes[1]) < tolerance
+    assert basis_cache.hits == 2 and len(basis_cache) == 1
+    # other times, constituents or precisions have their own basis
+    reconstruction.reconstruct(CONSTITUENTS[:3], amplitudes[:, :3], phases[:, :3], times, dtype=dtype)
+    reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times[1:], dtype=dtype)
+    assert basis_cache.hits == 2 and len(basis_cache) == 1
+
+
+def test_basis_cache_eviction(model, basis_cache, monkeypatch):
+    amplitudes, phases = model
+    first = reconstruction.time_range('2015-01-01', 500.)
+    second = reconstruction.time_range('2016-01-01', 500.)
+    nbytes = first.size * 2 * len(CONSTITUENTS) * 8
+    monkeypatch.setitem(config, 'basis_cache_bytes', int(1.5 * nbytes))
+    for times in (first, first, second, second):
+        reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, times)
+    assert len(basis_cache) == 1 and basis_cache.evictions == 1 and basis_cache.nbytes == nbytes
+    expected = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, first, anchor_interval=0)
+    # the evicted basis is requested again before it is rebuilt
+    hits = basis_cache.hits
+    actual = reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, first)
+    assert relative_error(actual, expected, amplitudes) < 1e-12 and basis_cache.hits == hits
+    # bases larger than the budget are never built
+    longer = reconstruction.time_range('2015-01-01', 1000.)
+    for _ in range(3):
+        reconstruction.reconstruct(CONSTITUENTS, amplitudes, phases, longer)
+    assert basis_cache.nbytes <= basis_cache.max_bytes and len(basis_cache) <= 1
+
+
+def test_basis_cache_aliasing(model, basis_cache):
+    amplitudes, phases = model
+    times = reconstruction.time_range('2015-01-01', 500.)
+    predictor = TidePredictor(CONSTITUENTS, amplitudes, phases)
+    expected = predictor.predict(times)
+    out = predictor.predict(times, out=np.empty_like(expected))
+    basis = next(iter(basis_cache._items.values()))
+    assert not basis.flags.writeable
+    cached = predictor.predict(times)
+    assert not np.shares_memory(cached, basis) and not np.shares_memory(out, basis)
+    # changing the results or the times of a call does not change the cached basis
+    cached[...] = np.nan
+    out[...] = np.nan
+    np.testing.assert_array_equal(predictor.predict(times), predictor.predict(times.copy()))
+    assert relative_error(predictor.predict(times), expected, amplitudes) < 1e-12
+    shifted = predictor.predict(times + np.timedelta64(1, 'h'))
+    times += np.timedelta64(1, 'h')
+    assert relative_error(predictor.predict(times), shifted, amplitudes) < 1e-12
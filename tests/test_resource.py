@@ -0,0 +1,104 @@
+from harmonica import config
+from harmonica.resource import ResourceManager
+from harmonica.tidal_constituents import Constituents
+import os
+import numpy as np
+import pytest
+import xarray as xr
+
+
+@pytest.fixture
+def locs():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(-85., 85., 300), rng.uniform(-180., 180., 300)])
+
+
+def test_pack_model(tpxo9_copy, locs, monkeypatch):
+    resources = ResourceManager(tpxo9_copy)
+    expected = Constituents().get_batch_components(locs, tpxo9_copy).data
+    stats = resources.pack_model(tile_shape=(64, 32))
+    resource = resources.model_atts['consts'][0]['M2']
+    assert list(stats) == [resource]
+    with xr.open_dataset(resources.packed_path(resource), engine='netcdf4') as ds:
+        assert ds.hRe.encoding['dtype'] == np.int16
+        assert tuple(ds.hRe.encoding['chunksizes']) == (1, 64, 32)
+        assert ds.hRe.encoding['scale_factor'] == pytest.approx(2. * stats[resource]['hRe_error'])
+
+    # the packed files are only read when requested
+    assert resources.constituent_path('M2') == os.path.join(config['data_dir'], tpxo9_copy, resource)
+    monkeypatch.setitem(config, 'packed', True)
+    assert resources.constituent_path('M2') == resources.packed_path(resource)
+    data = Constituents().get_batch_components(locs, tpxo9_copy).data
+    assert data.index.equals(expected.index)
+    # the amplitude error is bounded by the quantization error of the complex tide
+    bound = np.hypot(stats[resource]['hRe_error'], stats[resource]['hIm_error']) * resources.get_units_multiplier()
+    error = np.abs(data.amplitude.values - expected.amplitude.values)
+    assert 0. < error.max() <= bound * (1. + 1e-9)
+    h = data.amplitude.values * np.exp(1j * np.deg2rad(data.phase.values))
+    expected_h = expected.amplitude.values * np.exp(1j * np.deg2rad(expected.phase.values))
+    assert np.abs(h - expected_h).max() <= bound * (1. + 1e-9)
+
+
+def test_build_pyramid(tpxo9_copy):
+    resources = ResourceManager(tpxo9_copy)
+    resource = resources.model_atts['consts'][0]['M2']
+    path = os.path.join(config['data_dir'], tpxo9_copy, resource)
+    with xr.open_dataset(path, engine='netcdf4') as ds:
+        ds = ds.load()
+    # the first three columns are land
+    ds['hRe'][:, :3] = 0.
+    ds['hIm'][:, :3] = 0.
+    ds.to_netcdf(path, engine='netcdf4')
+    with pytest.raises(ValueError):
+        resources.get_datasets(['M2'], level=1)
+
+    assert resources.build_pyramid(levels=2) == {resource: [(144, 73), (72, 36), (36, 18)]}
+    for level in (1, 2):
+        n = 2 ** level
+        with xr.open_dataset(resources.pyramid_path(resource, level), engine='netcdf4') as coarse:
+            nx, ny = coarse.hRe.shape[-2:]
+            np.testing.assert_allclose(coarse.lon_z, ds.lon_z[:, :nx * n].values.reshape((-1, nx, n)).mean(axis=-1))
+            np.testing.assert_allclose(coarse.lat_z, ds.lat_z[:, :ny * n].values.reshape((-1, ny, n)).mean(axis=-1))
+            for var in ('hRe', 'hIm'):
+                blocks = ds[var][:, :nx * n, :ny * n].values.reshape((-1, nx, n, ny, n))
+                wet = ((ds.hRe != 0) | (ds.hIm != 0))[:, :nx * n, :ny * n].values.reshape(blocks.shape)
+                count = wet.sum(axis=(2, 4))
+                expected = np.where(count > 0, blocks.sum(axis=(2, 4)) / np.maximum(count, 1), 0.)
+                assert coarse[var].dtype == np.float32
+                np.testing.assert_allclose(coarse[var], expected, rtol=1e-6, atol=1e-7)
+            if level == 1:
+                # land blocks stay land, mixed blocks average their water cells
+                assert not coarse.hRe[:, 0].values.any()
+                np.testing.assert_allclose(coarse.hRe[:, 1], ds.hRe[:, 3, :ny * n].values.reshape((-1, ny, n)).mean(
+                    axis=-1), rtol=1e-6, atol=1e-7)
+
+
+def bilinear(ds, k, lat, lon):
+    """Interpolate the complex tide of a constituent of a dataset at a point."""
+    x = np.searchsorted(ds.lon_z[k].values, lon) - 1
+    y = np.searchsorted(ds.lat_z[k].values, lat) - 1
+    dx = (lon - ds.lon_z[k, x]) / (ds.lon_z[k, x + 1] - ds.lon_z[k, x])
+    dy = (lat - ds.lat_z[k, y]) / (ds.lat_z[k, y + 1] - ds.lat_z[k, y])
+    h = (ds.hRe[k, x:x + 2, y:y + 2] - 1j * ds.hIm[k, x:x + 2, y:y + 2]).values
+    return complex((h * np.outer([1. - dx, dx], [1. - dy, dy])).sum())
+
+
+@pytest.mark.parametrize('level', [0, 1, 2])
+def test_level(tpxo9_copy, level):
+    resources = ResourceManager(tpxo9_copy)
+    resources.build_pyramid(levels=2)
+    resource = resources.model_atts['consts'][0]['M2']
+    path = resources.pyramid_path(resource, level) if level else os.path.join(config['data_dir'], tpxo9_copy,
+        resource)
+    assert resources.constituent_path('M2', level) == path
+    names = resources.available_constituents()
+    loc = (33.3, -141.7)
+    data = Constituents().get_components(loc, tpxo9_copy, ['M2', 'S2'], level=level).data
+    batch = Constituents().get_batch_components([loc, (-10., 20.)], tpxo9_copy, ['M2', 'S2'], level=level).data
+    with xr.open_dataset(path, engine='netcdf4') as ds:
+        # the constituents of the file are ordered as available_constituents
+        for c in ('M2', 'S2'):
+            h = bilinear(ds, names.index(c), loc[0], loc[1] + 360.)
+            assert data.loc[c, 'amplitude'] == pytest.approx(abs(h), rel=1e-6)
+            assert data.loc[c, 'phase'] == pytest.approx(np.angle(h, deg=True), abs=1e-4)
+            assert batch.loc[(0, c), 'amplitude'] == pytest.approx(abs(h), rel=1e-6)
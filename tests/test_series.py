@@ -0,0 +1,47 @@
+from datetime import datetime
+from harmonica.predictor import TidePredictor
+from harmonica.series import TideSeries
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def series():
+    predictor = TidePredictor(['M2', 'S2', 'K1', 'O1'], [1., 0.3, 0.4, 0.25], [10., 100., -50., 300.])
+    return TideSeries.regular(predictor, '2020-01-01', 30 * 24., 1 / 60., block_size=1024)
+
+
+def test_positions(series):
+    # every block is predicted from its own first time
+    starts = range(0, len(series), series.block_size)
+    expected = np.concatenate([series.predictor.predict(series.timestamps(np.s_[start:start + series.block_size]))
+        for start in starts])
+    assert len(series) == expected.size == 30 * 24 * 60
+    np.testing.assert_allclose(series[:], expected, rtol=0., atol=1e-12)
+    np.testing.assert_allclose(series[5000:9000:7], expected[5000:9000:7], rtol=0., atol=1e-12)
+    positions = np.array([40000, 3, -1, 1025])
+    np.testing.assert_allclose(series[positions], expected[positions], rtol=0., atol=1e-12)
+    assert series[-1] == pytest.approx(expected[-1], abs=1e-12)
+    with pytest.raises(IndexError):
+        series[len(series)]
+    with pytest.raises(IndexError):
+        series[1.5]
+
+
+@pytest.mark.parametrize('key', ['2020-01-02T06:00', np.datetime64('2020-01-02T06:00'), datetime(2020, 1, 2, 6)])
+def test_timestamp(series, key):
+    expected = series.at(np.array(['2020-01-02T06:00'], dtype='datetime64[ns]'))[0]
+    value = series[key]
+    assert np.ndim(value) == 0
+    assert value == expected
+    # timestamps are predicted on their own, the node factors of the positions are those of their block
+    assert value == pytest.approx(series[30 * 60], abs=1e-4)
+
+
+def test_timestamps(series):
+    times = ['2020-01-02T06:00', '2020-01-02T06:00:30', '2020-01-03']
+    expected = series.at(np.array(times, dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(series[times], expected)
+    np.testing.assert_array_equal(series[np.array(times)], expected)
+    with pytest.raises(ValueError):
+        series['tomorrow']
@@ -0,0 +1,15 @@
+from harmonica.tidal_constituents import Constituents
+import numpy as np
+
+
+def test_batch_components_float32(tpxo9):
+    rng = np.random.default_rng(0)
+    locs = np.column_stack([rng.uniform(-60., 60., 50), rng.uniform(-180., 180., 50)])
+    expected = Constituents().get_batch_components(locs, tpxo9).data
+    actual = Constituents().get_batch_components(locs, tpxo9, dtype=np.float32).data
+    assert actual.amplitude.dtype == actual.phase.dtype == np.float32
+    assert actual.index.equals(expected.index)
+    # difference of the complex constants, relative to the largest amplitude
+    h = actual.amplitude.values * np.exp(1j * np.deg2rad(actual.phase.values))
+    expected_h = expected.amplitude.values * np.exp(1j * np.deg2rad(expected.phase.values))
+    assert np.abs(h - expected_h).max() / expected.amplitude.max() < 5e-7
@@ -0,0 +1,36 @@
+from harmonica import track
+from harmonica.harmonica import Tide
+import numpy as np
+import pytest
+
+
+def test_track_float32(tpxo9):
+    rng = np.random.default_rng(0)
+    n = 5000
+    lat = rng.uniform(-60., 60., n)
+    lon = rng.uniform(-180., 180., n)
+    times = np.datetime64('2020-01-01', 'ns') + np.sort(rng.integers(0, 30 * 86400, n)) * np.timedelta64(1, 's')
+    constants = track.TrackConstants.extract(lat, lon, tpxo9)
+    constants32 = track.TrackConstants.extract(lat, lon, tpxo9, dtype=np.float32)
+    assert constants32.coefficients(np.s_[:10]).dtype == np.float32
+    expected = track.reconstruct_track(constants, times)
+    actual = track.reconstruct_track(constants32, times)
+    assert actual.dtype == np.float32
+    amplitudes = np.hypot(*np.split(constants.coefficients(), 2, axis=1)).sum(axis=1)
+    assert (np.abs(actual - expected) / amplitudes).max() < 5e-7
+
+
+@pytest.mark.parametrize('cons', [[], ['M2', 'K1', 'MF']])
+def test_point_reconstruction(tpxo9, cons):
+    rng = np.random.default_rng(1)
+    n = 20
+    lat = rng.uniform(-60., 60., n)
+    lon = rng.uniform(-180., 180., n)
+    times = np.datetime64('2020-01-01', 'ns') + np.sort(rng.integers(0, 40 * 86400, n)) * np.timedelta64(1, 's')
+    data = Tide().reconstruct_track_tide(lat, lon, times, tpxo9, cons).data
+    assert list(data.columns) == ['datetimes', 'lat', 'lon', 'water_level']
+    np.testing.assert_array_equal(data.datetimes.values, times)
+    # the equilibrium arguments and node factors of the track are those of its first time
+    expected = [Tide().reconstruct_tide((y, x), np.r_[times[0], t], tpxo9, cons).data.water_level.values[1]
+        for y, x, t in zip(lat, lon, times)]
+    np.testing.assert_allclose(data.water_level.values, expected, rtol=0., atol=1e-12)